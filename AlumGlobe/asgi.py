@@ -10,7 +10,13 @@ https://docs.djangoproject.com/en/5.2/howto/deployment/asgi/
 import os
 
 from django.core.asgi import get_asgi_application
+from django.urls import get_resolver
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'AlumGlobe.settings')
 
 application = get_asgi_application()
+
+# Import the URLconf, and every view with it, now rather than on the first
+# request. Under gunicorn --preload this runs once in the master, and the
+# workers fork with it already loaded.
+get_resolver().url_patterns
@@ -2,10 +2,15 @@
 Django settings for AlumGlobe project.
 """
 
+import importlib.util
+import copy
+import json
 import os
+from urllib.parse import urlsplit
 from pathlib import Path
 from datetime import timedelta
 from dotenv import load_dotenv
+from corsheaders.defaults import default_headers
 
 # ---------------------------------------------------
 # Base directory and environment variables
@@ -45,18 +50,31 @@ INSTALLED_APPS = [
 # Middleware
 # ---------------------------------------------------
 MIDDLEWARE = [
+    'users.metrics.metrics_middleware',   # first, so it times everything below
     'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
 
     # Allow CORS for frontend-backend integration
     'corsheaders.middleware.CorsMiddleware',
 
     'django.middleware.common.CommonMiddleware',
+    'users.middleware.BrowserMiddleware',   # BROWSER_MIDDLEWARE, except on the API
+    'users.routers.replica_routing_middleware',   # sticky-after-write for replica reads
+]
+
+# Run in this order by users.middleware.BrowserMiddleware for the admin and
+# other pages, and skipped under API_FAST_PATH_PREFIXES: the API is bearer
+# token only (REST_FRAMEWORK has no session authentication).
+BROWSER_MIDDLEWARE = [
+    'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
+API_FAST_PATH_PREFIXES = ("/api/",)
+
+# The admin's checks look for these middleware in MIDDLEWARE itself
+SILENCED_SYSTEM_CHECKS = ["admin.E408", "admin.E409", "admin.E410", "security.W002", "security.W003"]
 
 ROOT_URLCONF = 'AlumGlobe.urls'
 
@@ -88,28 +106,217 @@ DATABASES = {
         'PASSWORD': os.getenv("DB_PASS", "Winter@88"),
         'HOST': os.getenv("DB_HOST", "localhost"),
         'PORT': os.getenv("DB_PORT", "5432"),
+        'CONN_HEALTH_CHECKS': True,
+        'OPTIONS': {},
     }
 }
 
+# Connection reuse. Each worker process gets its own psycopg pool, and every
+# connection is pinged on checkout. The pool is sized so that
+# WEB_CONCURRENCY (gunicorn's worker count) * DB_POOL_MAX_SIZE stays under
+# DB_MAX_CONNECTIONS. Without psycopg_pool, or with DB_POOL=False, each
+# worker instead keeps a persistent connection for DB_CONN_MAX_AGE seconds,
+# health-checked before reuse.
+WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", "1"))
+DB_MAX_CONNECTIONS = int(os.getenv("DB_MAX_CONNECTIONS", "90"))
+DB_POOL_ENABLED = os.getenv("DB_POOL", "True") == "True" and importlib.util.find_spec("psycopg_pool") is not None
+
+if DB_POOL_ENABLED:
+    # CONN_HEALTH_CHECKS makes Django pass ConnectionPool.check_connection
+    DATABASES['default']['OPTIONS']['pool'] = {
+        "min_size": int(os.getenv("DB_POOL_MIN_SIZE", "2")),
+        "max_size": int(os.getenv("DB_POOL_MAX_SIZE", "0")) or max(2, min(20, DB_MAX_CONNECTIONS // WEB_CONCURRENCY)),
+        "timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),   # seconds to wait for a free connection
+        "max_idle": 300,
+    }
+else:
+    DATABASES['default']['CONN_MAX_AGE'] = int(os.getenv("DB_CONN_MAX_AGE", "60"))
+
+# Read replicas, as DB_REPLICAS="host[:port][/name],...". Each becomes an
+# alias replica_1, replica_2, ... with the default's other settings. Reads
+# only use them where code opts in (users.routers.use_replica: admin
+# listings, read-only endpoints) and stay on the primary for a user for
+# REPLICA_STICKY_SECONDS after they write. Leave out the host to use a
+# second database on the primary's server, e.g. DB_REPLICAS=/alumglobe_replica.
+# Migrations only run on the primary, and under the test runner each replica
+# is a second connection to the primary's test database.
+DATABASE_REPLICAS = []
+for _number, _spec in enumerate(filter(None, os.getenv("DB_REPLICAS", "").split(",")), 1):
+    _url = urlsplit("//" + _spec.strip())
+    _replica = copy.deepcopy(DATABASES['default'])
+    _replica['HOST'] = _url.hostname or _replica['HOST']
+    _replica['PORT'] = str(_url.port or _replica['PORT'])
+    _replica['NAME'] = _url.path.strip("/") or _replica['NAME']
+    _replica['TEST'] = {'MIRROR': 'default'}
+    DATABASES[f"replica_{_number}"] = _replica
+    DATABASE_REPLICAS.append(f"replica_{_number}")
+
+DATABASE_ROUTERS = ["users.routers.ReplicaRouter"]
+REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+REPLICA_PIN_CACHE_ALIAS = os.getenv("REPLICA_PIN_CACHE_ALIAS") or None   # shared cache for pins across workers
+
 # ---------------------------------------------------
 # Authentication
 # ---------------------------------------------------
 AUTH_USER_MODEL = "users.CustomUser"
 
+# orjson renders and parses API JSON when installed (users.renderers)
+ORJSON_ENABLED = importlib.util.find_spec("orjson") is not None
+
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
+        "users.authentication.CachedJWTAuthentication",
     ),
     "DEFAULT_PERMISSION_CLASSES": (
         "rest_framework.permissions.IsAuthenticated",
     ),
+    "DEFAULT_RENDERER_CLASSES": (
+        "users.renderers.ORJSONRenderer" if ORJSON_ENABLED else "rest_framework.renderers.JSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ),
+    "DEFAULT_PARSER_CLASSES": (
+        "users.renderers.ORJSONParser" if ORJSON_ENABLED else "rest_framework.parsers.JSONParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
+    ),
 }
 
 SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=60),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=7),
-    "ROTATE_REFRESH_TOKENS": False,
-    "BLACKLIST_AFTER_ROTATION": True,
+    "ROTATE_REFRESH_TOKENS": True,
+    "BLACKLIST_AFTER_ROTATION": True,   # handled by users.revocation, not the token_blacklist app
+    "TOKEN_REFRESH_SERIALIZER": "users.serializers.RotatingTokenRefreshSerializer",
+}
+
+# Refresh tokens revoked by logout: per-process Bloom filter + exact set,
+# shared through the backend. Each worker pulls new revocations every
+# SYNC_INTERVAL seconds, so a logged-out refresh token can still be used on
+# other workers for up to that long. Rotated tokens are rejected at once
+# (see users.revocation).
+TOKEN_REVOCATION = {
+    "BACKEND": os.getenv("TOKEN_REVOCATION_BACKEND", "users.revocation.DatabaseBackend"),
+    "SYNC_INTERVAL": float(os.getenv("TOKEN_REVOCATION_SYNC_INTERVAL", "2")),   # seconds between pulls from the backend
+    "PRUNE_INTERVAL": 600,
+    "CAPACITY": 10000,
+}
+
+# Sliding-window limits on the unauthenticated auth endpoints, per scope
+# and per identity (client IP, email or known college code). Counters live in
+# process memory unless CACHE_ALIAS names a cache shared by all workers.
+RATE_LIMITS = {
+    "ENABLED": os.getenv("RATE_LIMITS_ENABLED", "True") == "True",
+    "CACHE_ALIAS": os.getenv("RATE_LIMITS_CACHE_ALIAS") or None,
+    "RULES": {
+        "login": {"ip": "60/m", "email": "10/m"},
+        "register": {"ip": "30/h", "email": "5/h", "college": "300/h"},
+        "social": {"ip": "60/m", "college": "600/m"},
+    },
+}
+
+# Register and social login accept an Idempotency-Key header. The first
+# response for a key is replayed to retries with the same body for TTL
+# seconds, from a per-process table of at most MAX_KEYS entries or from
+# CACHE_ALIAS shared by all workers. A retry that arrives while the first
+# request is still running waits up to WAIT seconds for its result.
+IDEMPOTENCY = {
+    "ENABLED": os.getenv("IDEMPOTENCY_ENABLED", "True") == "True",
+    "CACHE_ALIAS": os.getenv("IDEMPOTENCY_CACHE_ALIAS") or None,
+    "TTL": int(os.getenv("IDEMPOTENCY_TTL", "3600")),
+    "MAX_KEYS": int(os.getenv("IDEMPOTENCY_MAX_KEYS", "10000")),
+    "WAIT": float(os.getenv("IDEMPOTENCY_WAIT", "10")),
+}
+
+# ---------------------------------------------------
+# Social login
+# ---------------------------------------------------
+GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
+GOOGLE_CERTS_URL = os.getenv("GOOGLE_CERTS_URL", "https://www.googleapis.com/oauth2/v1/certs")
+
+LINKEDIN_API_URL = os.getenv("LINKEDIN_API_URL", "https://api.linkedin.com")
+LINKEDIN_TIMEOUT = float(os.getenv("LINKEDIN_TIMEOUT", "5"))  # shared deadline for profile + email
+
+# ---------------------------------------------------
+# Password hashing
+# ---------------------------------------------------
+# Algorithm and work factor for new hashes, from
+# `manage.py calibrate_password_hasher`. Hashes made with other parameters
+# or algorithms still verify and are rehashed on the next login.
+PASSWORD_HASHING = {
+    "ALGORITHM": os.getenv("PASSWORD_HASH_ALGORITHM", "pbkdf2_sha256"),   # pbkdf2_sha256, scrypt or argon2 (needs argon2-cffi)
+    "PARAMS": json.loads(os.getenv("PASSWORD_HASH_PARAMS") or "{}"),
+}
+
+_CALIBRATED_HASHERS = {
+    "pbkdf2_sha256": "users.hashers.CalibratedPBKDF2PasswordHasher",
+    "scrypt": "users.hashers.CalibratedScryptPasswordHasher",
+    "argon2": "users.hashers.CalibratedArgon2PasswordHasher",
+}
+PASSWORD_HASHERS = [
+    _CALIBRATED_HASHERS[PASSWORD_HASHING["ALGORITHM"]],   # first entry hashes new passwords
+    *(path for name, path in _CALIBRATED_HASHERS.items() if name != PASSWORD_HASHING["ALGORITHM"]),
+    "django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher",
+    "django.contrib.auth.hashers.BCryptSHA256PasswordHasher",
+]
+
+# ---------------------------------------------------
+# Async auth (ASGI)
+# ---------------------------------------------------
+# Route register/login/social login to users.async_views; set under ASGI
+# (see Procfile). PASSWORD_HASH_WORKERS bounds concurrent password hashes
+# per process and defaults to the CPU count.
+ASYNC_AUTH_VIEWS = os.getenv("ASYNC_AUTH_VIEWS", "False") == "True"
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", "0")) or None
+
+# ---------------------------------------------------
+# Admin
+# ---------------------------------------------------
+# Estimated counts and a typed college filter on the user changelist
+USERS_ADMIN_HIGH_VOLUME = os.getenv("USERS_ADMIN_HIGH_VOLUME", "True") == "True"
+
+# ---------------------------------------------------
+# Bulk approvals
+# ---------------------------------------------------
+# Jobs run on a background thread after the request commits; anything
+# interrupted by a restart is resumed by `manage.py process_approval_jobs`.
+APPROVAL_JOBS_ASYNC = os.getenv("APPROVAL_JOBS_ASYNC", "True") == "True"
+APPROVAL_BATCH_SIZE = int(os.getenv("APPROVAL_BATCH_SIZE", "500"))
+
+# ---------------------------------------------------
+# Caching
+# ---------------------------------------------------
+# Alias in CACHES shared by all workers (e.g. Redis). When set, College cache
+# invalidations propagate to every process; otherwise each process relies on
+# its own post_save/post_delete signals.
+COLLEGE_CACHE_ALIAS = os.getenv("COLLEGE_CACHE_ALIAS") or None
+# Without that alias, seconds before a worker reloads Colleges changed by another
+# (per-college logout, roster uploads)
+COLLEGE_CACHE_TTL = int(os.getenv("COLLEGE_CACHE_TTL", "30"))
+
+# Seconds a worker trusts its cached (auth_version, is_active) for a JWT user,
+# and an optional shared alias that makes version bumps visible at once.
+USER_CACHE_TTL = int(os.getenv("USER_CACHE_TTL", "30"))
+USER_CACHE_ALIAS = os.getenv("USER_CACHE_ALIAS") or None
+
+# ---------------------------------------------------
+# Metrics
+# ---------------------------------------------------
+# Per-view histograms of wall, database, outbound HTTP and hashing time,
+# served at /metrics (Bearer METRICS_TOKEN; without a token only when
+# DEBUG is on). Workers of one host share counters through METRICS_DIR.
+# SLOW_REQUEST_MS logs slower requests with their queries, for
+# SLOW_REQUEST_SAMPLE_RATE of requests.
+# METRICS_BUDGETS checks requests against users/budgets.py: "log", "raise"
+# or empty (the default) to skip.
+METRICS = {
+    "ENABLED": os.getenv("METRICS_ENABLED", "True") == "True",
+    "SERVER_TIMING": os.getenv("METRICS_SERVER_TIMING", str(DEBUG)) == "True",
+    "TOKEN": os.getenv("METRICS_TOKEN") or None,
+    "DIR": os.getenv("METRICS_DIR") or None,
+    "FLUSH_INTERVAL": 5,
+    "SLOW_REQUEST_MS": int(os.getenv("SLOW_REQUEST_MS", "0")) or None,
+    "SLOW_REQUEST_SAMPLE_RATE": float(os.getenv("SLOW_REQUEST_SAMPLE_RATE", "1")),
+    "BUDGETS": os.getenv("METRICS_BUDGETS") or None,
 }
 
 # ---------------------------------------------------
@@ -153,16 +360,8 @@ CORS_ALLOWED_ORIGINS = [
 ]
 
 CORS_ALLOW_CREDENTIALS = True
+CORS_ALLOW_HEADERS = (*default_headers, "idempotency-key")
 
 CSRF_TRUSTED_ORIGINS = [
     "https://sih-frontend-xdhl.onrender.com",
 ]
-
-# ---------------------------------------------------
-# VALID college domains
-# ---------------------------------------------------
-VALID_COLLEGE_DOMAINS = [
-    "glbitm.ac.in",
-    "iitd.ac.in",
-    "iiit.ac.in",
-]
@@ -16,8 +16,11 @@ Including another URLconf
 """
 from django.contrib import admin
 from django.urls import path,include
+from users.metrics import metrics_view
 
 urlpatterns = [
     path('admin/', admin.site.urls),
      path('api/auth/', include('users.urls')),
+    path('api/', include('users.api_urls')),
+    path('metrics', metrics_view, name='metrics'),
 ]
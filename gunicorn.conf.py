@@ -0,0 +1,18 @@
+"""
+gunicorn settings, read from the working directory. The command line
+(Procfile) still picks the app, worker class and --preload.
+"""
+
+import threading
+
+
+def post_worker_init(worker):
+    # The worker has loaded the app (or inherited it from a --preload master).
+    # Fetch Google's signing certificates here, in the worker, and on a thread
+    # of their own so the worker starts serving at once.
+    from django.conf import settings
+
+    if getattr(settings, "GOOGLE_CLIENT_ID", None):
+        from users.google_auth import warm_google_verifier
+
+        threading.Thread(target=warm_google_verifier, name="warm-google-certs", daemon=True).start()
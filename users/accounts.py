@@ -0,0 +1,103 @@
+"""
+Account logic shared by the DRF auth views (views.py) and their async
+counterparts (async_views.py). Functions return (payload, status) so each
+view can wrap it in its own response type.
+"""
+
+from django.db import IntegrityError
+from rest_framework import status
+
+from .colleges import get_college_by_code, get_college_for_email, email_matches_college
+from .identity import create_user, link_provider, resolve_user, social_username
+from .models import CustomUser
+from .rosters import approve_from_roster, roll_number_taken
+from .serializers import get_tokens_for_user
+
+
+def registration_payload(user):
+    if user.is_approved:
+        return {
+            "message": "Registration successful. You can log in now.",
+            "user_id": user.id,
+            "tokens": get_tokens_for_user(user)
+        }, status.HTTP_201_CREATED
+    return {
+        "message": "Registration successful. Please wait for admin approval before logging in.",
+        "user_id": user.id
+    }, status.HTTP_201_CREATED
+
+
+def login_payload(user):
+    if not user.is_approved:
+        return {"detail": "Your account is pending admin approval."}, status.HTTP_403_FORBIDDEN
+    return {
+        "user": {
+            "id": user.id,
+            "username": user.username,
+            "email": user.email,
+            "role": user.role,
+            "college": user.college.code if user.college else None,
+            "roll_number": getattr(user, "roll_number", None)
+        },
+        "tokens": get_tokens_for_user(user)
+    }, status.HTTP_200_OK
+
+
+def social_login(provider_field, provider_id, email, role, college_code=None, roll_number=None,
+                 first_name=None, last_name=None, fallback_username=None):
+    """
+    Find the user by provider id or email (one query), creating them if
+    neither matches. `provider_field` is "google_sub" or "linkedin_id".
+    """
+    user = resolve_user(provider_field, provider_id, email)
+
+    if user is None:
+        user = CustomUser(
+            username=social_username(email, provider_field, provider_id, fallback_username),
+            email=email, role=role,
+        )
+        setattr(user, provider_field, provider_id)
+        user.first_name = first_name or ''
+        user.last_name = last_name or ''
+
+        college = get_college_by_code(college_code) if college_code else get_college_for_email(email)
+        if college:
+            user.college = college
+            user.verified = email_matches_college(email, college)
+
+        if role in ["student", "alumni"]:
+            user.roll_number = str(roll_number or "").strip() or None
+            user.is_approved = False
+            user.is_active = False
+            approve_from_roster(user)
+        elif role == "admin":
+            if not user.college or not user.college.domain or not email.endswith(f"@{user.college.domain}"):
+                return {"detail": "Admins must register with official college email."}, status.HTTP_400_BAD_REQUEST
+            user.verified = True
+            user.is_approved = True
+
+        user.set_unusable_password()
+        try:
+            user, _ = create_user(user, provider_field)
+        except IntegrityError:
+            if roll_number_taken(user):
+                return {"roll_number": ["This roll number is already registered."]}, status.HTTP_400_BAD_REQUEST
+            raise
+    else:
+        link_provider(user, provider_field, provider_id)
+
+    if not user.is_approved:
+        return {"message": "Account created. Please wait for admin approval."}, status.HTTP_200_OK
+
+    tokens = get_tokens_for_user(user)
+    return {"user": {"id": user.id, "email": user.email, "role": user.role}, "tokens": tokens}, status.HTTP_200_OK
+
+
+def linkedin_identity(p_json, e_json):
+    """(linkedin_id, first_name, last_name, email) from the two LinkedIn responses."""
+    email = None
+    try:
+        email = e_json['elements'][0]['handle~']['emailAddress']
+    except (KeyError, IndexError, TypeError):
+        pass
+    return p_json.get('id'), p_json.get('localizedFirstName'), p_json.get('localizedLastName'), email
@@ -1,16 +1,144 @@
-from django.contrib import admin
+import re
+
+from django import forms
+from django.conf import settings
+from django.contrib import admin, messages
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import F
+from django.shortcuts import redirect
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils.functional import cached_property
 from .models import CustomUser, College
+from .importer import import_uploaded_file
+from .authentication import invalidate_users
+from .routers import use_replica
+
+
+def high_volume_mode():
+    return getattr(settings, "USERS_ADMIN_HIGH_VOLUME", True)
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Counts exactly up to `exact_limit` rows with a bounded subquery; past
+    that PostgreSQL's planner estimate is used instead of COUNT(*) over the
+    whole filtered table. Other databases fall back to an exact count.
+    """
+    exact_limit = 10000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list.order_by()
+        bounded = queryset[:self.exact_limit].count()
+        if bounded < self.exact_limit:
+            return bounded
+        if connections[queryset.db].vendor != "postgresql":
+            return queryset.count()
+        sql, params = queryset.query.sql_with_params()
+        with connections[queryset.db].cursor() as cursor:
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+        return max(int(plan[0]["Plan"]["Plan Rows"]), bounded)
+
+
+class CollegeCodeFilter(admin.SimpleListFilter):
+    """
+    Text filter with autocomplete for the college, so the sidebar never loads
+    every College. Accepts a code or the "Name (code)" autocomplete label.
+    """
+    title = "college"
+    parameter_name = "college_code"
+    template = "admin/users/college_filter.html"
+
+    def lookups(self, request, model_admin):
+        return ()
+
+    def has_output(self):
+        return True
+
+    def queryset(self, request, queryset):
+        value = (self.value() or "").strip()
+        if not value:
+            return queryset
+        match = re.search(r"\(([^()]+)\)$", value)
+        return queryset.filter(college__code=match.group(1) if match else value)
+
+    def choices(self, changelist):
+        params = {k: v for k, v in changelist.params.items() if k not in (self.parameter_name, "p")}
+        yield {
+            "parameter_name": self.parameter_name,
+            "value": self.value() or "",
+            "params": params.items(),
+            "clear_query_string": changelist.get_query_string(remove=[self.parameter_name, "p"]),
+            "autocomplete_url": reverse("admin:autocomplete")
+            + "?app_label=users&model_name=customuser&field_name=college",
+        }
+
+
+class ReplicaChangelistMixin:
+    """
+    Changelist GETs read from a replica, unless the admin wrote in the last
+    few seconds (see users.routers). Actions (POSTs) read from the primary.
+    """
+
+    def changelist_view(self, request, extra_context=None):
+        if request.method != "GET":
+            return super().changelist_view(request, extra_context)
+        with use_replica(request):
+            response = super().changelist_view(request, extra_context)
+            if hasattr(response, "render"):
+                # The result list is queried while the template renders
+                response.render()
+        return response
+
+
+class AlumniImportForm(forms.Form):
+    roster = forms.FileField(help_text="CSV with a header row, or NDJSON (.ndjson/.jsonl).")
+    college = forms.ModelChoiceField(queryset=College.objects.all())
+    pending = forms.BooleanField(required=False, help_text="Leave imported users waiting for approval.")
+
 
 @admin.register(CustomUser)
-class CustomUserAdmin(admin.ModelAdmin):
+class CustomUserAdmin(ReplicaChangelistMixin, admin.ModelAdmin):
     list_display = ('username', 'email', 'role', 'college', 'is_approved')
     list_filter = ('role', 'college', 'is_approved')
+    list_select_related = ('college',)
     search_fields = ('username', 'email')
+    autocomplete_fields = ('college',)
     actions = ['approve_users']
+    change_list_template = 'admin/users/customuser/change_list.html'
+
+    # High-volume mode: no full COUNT(*) and no full College list in the sidebar
+    def get_list_filter(self, request):
+        if high_volume_mode():
+            return ('role', CollegeCodeFilter, 'is_approved')
+        return self.list_filter
+
+    def get_paginator(self, request, queryset, per_page, orphans=0, allow_empty_first_page=True):
+        paginator_class = EstimatedCountPaginator if high_volume_mode() else self.paginator
+        return paginator_class(queryset, per_page, orphans, allow_empty_first_page)
+
+    @property
+    def show_full_result_count(self):
+        return not high_volume_mode()
 
-    # Bulk approve action
+    # Bulk approve action, in keyset batches as approval jobs run (see approvals.py)
     def approve_users(self, request, queryset):
-        queryset.update(is_approved=True, is_active=True)
+        batch_size = getattr(settings, "APPROVAL_BATCH_SIZE", 500)
+        pending = queryset.filter(is_approved=False).order_by('id').values_list('id', flat=True)
+        approved, last_id = 0, 0
+        while True:
+            ids = list(pending.filter(id__gt=last_id)[:batch_size])
+            if not ids:
+                break
+            approved += CustomUser.objects.filter(id__in=ids, is_approved=False).update(
+                is_approved=True, is_active=True, auth_version=F('auth_version') + 1,
+            )
+            invalidate_users(*ids)
+            last_id = ids[-1]
+        self.message_user(request, f"Approved {approved} users.", messages.SUCCESS)
     approve_users.short_description = "Approve selected users"
 
     # College admin only sees their college users
@@ -19,8 +147,48 @@ class CustomUserAdmin(admin.ModelAdmin):
         if request.user.role == 'admin' and request.user.college:
             return qs.filter(college=request.user.college)
         return qs
+
+    def get_urls(self):
+        urls = [
+            path('import/', self.admin_site.admin_view(self.import_view), name='users_customuser_import'),
+        ]
+        return urls + super().get_urls()
+
+    # Roster upload; large files should go through `manage.py import_alumni`
+    def import_view(self, request):
+        if not self.has_add_permission(request):
+            return redirect('admin:users_customuser_changelist')
+
+        form = AlumniImportForm(request.POST or None, request.FILES or None)
+        # College admins can only import into their own college
+        if request.user.role == 'admin' and request.user.college:
+            form.fields['college'].queryset = College.objects.filter(pk=request.user.college.pk)
+
+        if request.method == 'POST' and form.is_valid():
+            result, rejects = import_uploaded_file(
+                form.cleaned_data['roster'], form.cleaned_data['college'],
+                approve=not form.cleaned_data['pending'],
+            )
+            self.message_user(
+                request,
+                f"Imported {result.created} users, rejected {result.rejected} "
+                f"({result.rows_per_second:.0f} rows/sec).",
+                messages.SUCCESS if not result.rejected else messages.WARNING,
+            )
+            for line in rejects[:20]:
+                self.message_user(request, line, messages.ERROR)
+            return redirect('admin:users_customuser_changelist')
+
+        context = {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': 'Import alumni',
+            'form': form,
+        }
+        return TemplateResponse(request, 'admin/users/customuser/import_alumni.html', context)
+
 @admin.register(College)
-class CollegeAdmin(admin.ModelAdmin):
+class CollegeAdmin(ReplicaChangelistMixin, admin.ModelAdmin):
     list_display = ('name', 'code', 'domain')
     search_fields = ('name', 'code')
 
@@ -0,0 +1,15 @@
+from django.urls import path
+from .views import (
+    PendingApprovalsView, BulkApproveView, ApprovalJobView, CollegeSessionsRevokeView, DirectoryView,
+    UserExportView, RosterUploadView,
+)
+
+urlpatterns = [
+    path('approvals/pending/', PendingApprovalsView.as_view(), name='pending-approvals'),
+    path('approvals/bulk/', BulkApproveView.as_view(), name='bulk-approve'),
+    path('approvals/jobs/<int:pk>/', ApprovalJobView.as_view(), name='approval-job'),
+    path('college/roster/', RosterUploadView.as_view(), name='roster-upload'),
+    path('directory/', DirectoryView.as_view(), name='directory'),
+    path('college/users/export.<str:fmt>', UserExportView.as_view(), name='export-users'),
+    path('college/sessions/revoke/', CollegeSessionsRevokeView.as_view(), name='revoke-college-sessions'),
+]
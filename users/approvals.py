@@ -0,0 +1,110 @@
+"""
+Pending-approval queue for college admins.
+
+Listing uses keyset pagination on id (backed by users_pending_approval_idx)
+so every page costs the same no matter how deep the queue is. Bulk approval
+is recorded as an ApprovalJob and applied in fixed-size batches, each in
+its own short transaction, so no request holds locks on thousands of rows.
+"""
+
+import logging
+import threading
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+from django.db.models import F, Max
+
+from .authentication import invalidate_users
+from .models import ApprovalJob, CustomUser
+
+logger = logging.getLogger(__name__)
+
+PENDING_ROLES = ("student", "alumni")
+
+
+def pending_users(college):
+    return CustomUser.objects.filter(college=college, is_approved=False, role__in=PENDING_ROLES)
+
+
+def keyset_page(queryset, after=None, limit=50):
+    """
+    One page of `queryset` ordered by id, starting after id `after`.
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    """
+    if after:
+        queryset = queryset.filter(id__gt=after)
+    rows = list(queryset.order_by("id")[:limit + 1])
+    if len(rows) > limit:
+        return rows[:limit], rows[limit - 1].id
+    return rows, None
+
+
+def create_approval_job(college, requested_by, user_ids=None):
+    """Record a bulk approval for `college` and schedule it once the transaction commits."""
+    queryset = pending_users(college)
+    if user_ids is not None:
+        queryset = queryset.filter(id__in=user_ids)
+    max_user_id = queryset.aggregate(max_id=Max("id"))["max_id"] or 0
+    job = ApprovalJob.objects.create(
+        college=college,
+        requested_by=requested_by,
+        user_ids=sorted(set(user_ids)) if user_ids is not None else None,
+        max_user_id=max_user_id,
+        total=queryset.count(),
+    )
+    transaction.on_commit(lambda: dispatch_approval_job(job.pk))
+    return job
+
+
+def dispatch_approval_job(job_id):
+    if getattr(settings, "APPROVAL_JOBS_ASYNC", True):
+        threading.Thread(target=_run_in_thread, args=(job_id,), daemon=True).start()
+    else:
+        run_approval_job(job_id)
+
+
+def _run_in_thread(job_id):
+    try:
+        run_approval_job(job_id)
+    finally:
+        close_old_connections()
+
+
+def run_approval_job(job_id, batch_size=None):
+    """Apply a queued or interrupted job, resuming after its last batch."""
+    batch_size = batch_size or getattr(settings, "APPROVAL_BATCH_SIZE", 500)
+    job = ApprovalJob.objects.get(pk=job_id)
+    if job.status == "done":
+        return job
+    job.status = "running"
+    job.save(update_fields=["status", "updated_at"])
+
+    queryset = pending_users(job.college_id).filter(id__lte=job.max_user_id)
+    if job.user_ids is not None:
+        queryset = queryset.filter(id__in=job.user_ids)
+
+    try:
+        while True:
+            with transaction.atomic():
+                ids = list(
+                    queryset.filter(id__gt=job.last_user_id).order_by("id").values_list("id", flat=True)[:batch_size]
+                )
+                if not ids:
+                    break
+                approved = CustomUser.objects.filter(id__in=ids, is_approved=False).update(
+                    is_approved=True, is_active=True, auth_version=F("auth_version") + 1,
+                )
+                job.last_user_id = ids[-1]
+                job.approved += approved
+                job.save(update_fields=["last_user_id", "approved", "updated_at"])
+            invalidate_users(*ids)
+    except Exception as e:
+        logger.exception("Approval job %s failed", job.pk)
+        job.status = "failed"
+        job.error = str(e)
+        job.save(update_fields=["status", "error", "updated_at"])
+        return job
+
+    job.status = "done"
+    job.save(update_fields=["status", "updated_at"])
+    return job
@@ -0,0 +1,193 @@
+"""
+Async versions of the register, login and social login views for ASGI
+deployments (`ASYNC_AUTH_VIEWS = True`).
+
+Password hashing runs on the bounded pool in hashing.py and provider
+calls go through httpx, so one worker keeps accepting requests while
+logins are hashing or waiting on Google/LinkedIn. ORM work runs through
+`sync_to_async`. The request and response bodies match the DRF views,
+and so do the rate limits, checked before any other work. The provider
+modules are imported on first use, off the event loop.
+"""
+
+import importlib
+import json
+import math
+import sys
+
+from asgiref.sync import sync_to_async
+from django.http import JsonResponse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
+from rest_framework import serializers, status
+from rest_framework.settings import api_settings
+
+from .accounts import registration_payload, login_payload, social_login, linkedin_identity
+from .hashing import acheck_password, amake_password
+from .models import CustomUser
+from .ratelimit import get_rate_limiter, request_identities, client_ip
+from .serializers import RegisterSerializer, LoginCredentialsSerializer
+
+
+class ParseError(Exception):
+    pass
+
+
+async def load_provider(name):
+    """users.<name>; the first call imports it in a thread, as it takes ~100 ms."""
+    module = sys.modules.get(f"{__package__}.{name}")
+    if module is None:
+        module = await sync_to_async(importlib.import_module, thread_sensitive=False)(f".{name}", __package__)
+    return module
+
+
+def parse_body(request):
+    """The request's JSON or form fields as a dict, like DRF's request.data."""
+    if request.content_type != "application/json":
+        return request.POST.dict()
+    try:
+        data = json.loads(request.body or b"{}")
+    except ValueError as e:
+        raise ParseError(f"JSON parse error - {e}")
+    if not isinstance(data, dict):
+        raise ParseError("Expected a JSON object.")
+    return data
+
+
+def error(detail, code=status.HTTP_400_BAD_REQUEST):
+    return JsonResponse(detail, status=code, safe=False)
+
+
+def invalid(message):
+    return error({api_settings.NON_FIELD_ERRORS_KEY: [message]})
+
+
+def throttled(wait):
+    response = error(
+        {"detail": f"Request was throttled. Expected available in {math.ceil(wait)} seconds."},
+        status.HTTP_429_TOO_MANY_REQUESTS,
+    )
+    response["Retry-After"] = str(math.ceil(wait))
+    return response
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncAuthView(View):
+    """
+    Unauthenticated JSON POST endpoint. Subclasses define
+    `async handle(request, data)`, which gets the parsed body.
+    """
+    http_method_names = ["post", "options"]
+    throttle_scope = None
+
+    async def post(self, request):
+        try:
+            data = parse_body(request)
+        except ParseError as e:
+            return error({"detail": str(e)})
+
+        if data.get("college_code"):
+            # Checking the college code may load the College cache
+            identities = await sync_to_async(request_identities)(client_ip(request), data)
+        else:
+            identities = request_identities(client_ip(request), data)
+        wait = get_rate_limiter().check(self.throttle_scope, **identities)
+        if wait:
+            return throttled(wait)
+        return await self.handle(request, data)
+
+
+# ---------------- Register ----------------
+class AsyncRegisterView(AsyncAuthView):
+    throttle_scope = "register"
+
+    async def handle(self, request, data):
+        serializer = RegisterSerializer(data=data)
+        if not await sync_to_async(serializer.is_valid)():
+            return error(serializer.errors)
+
+        password_hash = await amake_password(serializer.validated_data['password'])
+
+        def save():
+            return registration_payload(serializer.save(password_hash=password_hash))
+
+        try:
+            payload, code = await sync_to_async(save)()
+        except serializers.ValidationError as e:
+            return error(e.detail)
+        return JsonResponse(payload, status=code)
+
+
+# ---------------- Login ----------------
+class AsyncLoginView(AsyncAuthView):
+    throttle_scope = "login"
+
+    async def handle(self, request, data):
+        serializer = LoginCredentialsSerializer(data=data)
+        if not serializer.is_valid():
+            return error(serializer.errors)
+
+        user = await CustomUser.objects.select_related('college').filter(
+            email=serializer.validated_data['email']
+        ).afirst()
+        if user is None or not await acheck_password(user, serializer.validated_data['password']):
+            return invalid("Invalid credentials.")
+
+        # Block login until approved
+        if not user.is_active or not user.is_approved:
+            return invalid("Your account is pending admin approval.")
+
+        payload, code = login_payload(user)
+        return JsonResponse(payload, status=code)
+
+
+# ---------------- Google Auth ----------------
+class AsyncGoogleAuthView(AsyncAuthView):
+    throttle_scope = "social"
+
+    async def handle(self, request, data):
+        token = data.get('id_token')
+        if not token:
+            return error({"detail": "No id_token provided"})
+
+        google_auth = await load_provider("google_auth")
+        try:
+            idinfo = await google_auth.averify_google_id_token(token)
+            email = idinfo.get('email')
+            payload, code = await sync_to_async(social_login)(
+                'google_sub', idinfo.get('sub'), email, data.get('role'),
+                data.get('college_code'), data.get('roll_number'),
+                first_name=idinfo.get('name') or email.split('@')[0],
+            )
+        except ValueError as e:
+            return error({"detail": "Invalid token", "error": str(e)})
+        return JsonResponse(payload, status=code)
+
+
+# ---------------- LinkedIn Auth ----------------
+class AsyncLinkedInAuthView(AsyncAuthView):
+    throttle_scope = "social"
+
+    async def handle(self, request, data):
+        access_token = data.get('access_token')
+        if not access_token:
+            return error({"detail": "No access_token provided"})
+
+        linkedin = await load_provider("linkedin")
+        try:
+            p_resp, e_resp = await linkedin.get_linkedin_client().afetch_profile_and_email(access_token)
+            if p_resp.status_code != 200:
+                return error({"detail": "LinkedIn profile fetch failed", "status": p_resp.status_code, "text": p_resp.text})
+
+            linkedin_id, first_name, last_name, email = linkedin_identity(p_resp.json(), e_resp.json())
+            payload, code = await sync_to_async(social_login)(
+                'linkedin_id', linkedin_id, email, data.get('role'),
+                data.get('college_code'), data.get('roll_number'),
+                first_name=first_name, last_name=last_name, fallback_username=f"li_{linkedin_id}",
+            )
+        except linkedin.LinkedInUnavailable as e:
+            return error({"detail": "LinkedIn unavailable", "error": str(e)}, status.HTTP_503_SERVICE_UNAVAILABLE)
+        except Exception as e:
+            return error({"detail": "LinkedIn error", "error": str(e)})
+        return JsonResponse(payload, status=code)
@@ -0,0 +1,159 @@
+"""
+JWT authentication that builds request.user from token claims.
+
+`get_tokens_for_user` puts role, college code, approval state and the
+user's `auth_version` into every token. Authenticating a request then only
+needs the user's current (auth_version, is_active), which is kept in a
+short-TTL per-process cache and fetched with a narrow primary-key query on
+a miss. A token whose version differs (role, college or approval changed
+since it was issued) is rejected without loading the row.
+
+The request.user built from claims has every other field deferred: reading
+one (e.g. `email`) loads the row on first access, as with `.only()`.
+
+Set `USER_CACHE_ALIAS` to a shared cache to make version bumps visible to
+every worker immediately instead of after the local TTL.
+"""
+
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from django.contrib.auth import get_user_model
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.settings import api_settings
+
+from .colleges import get_college_by_code, college_sessions_revoked
+from .models import CustomUser
+from .revocation import is_token_revoked
+
+VERSION_KEY = "users:auth-version:{}"
+
+
+class UserVersionCache:
+    def __init__(self):
+        self._entries = {}   # user id -> ((auth_version, is_active), expires_at)
+        self._lock = threading.Lock()
+
+    @property
+    def ttl(self):
+        return getattr(settings, "USER_CACHE_TTL", 30)
+
+    @property
+    def shared(self):
+        alias = getattr(settings, "USER_CACHE_ALIAS", None)
+        return caches[alias] if alias else None
+
+    def get(self, user_id):
+        """(auth_version, is_active) for the user, or None if they don't exist."""
+        shared = self.shared
+        if shared is not None:
+            state = shared.get(VERSION_KEY.format(user_id))
+            if state is None:
+                state = self._load(user_id)
+                if state is not None:
+                    shared.set(VERSION_KEY.format(user_id), state, timeout=self.ttl * 10)
+            return state
+
+        entry = self._entries.get(user_id)
+        if entry is not None and entry[1] > time.monotonic():
+            return entry[0]
+        state = self._load(user_id)
+        if state is not None:
+            with self._lock:
+                self._entries[user_id] = (state, time.monotonic() + self.ttl)
+        return state
+
+    def _load(self, user_id):
+        rows = list(CustomUser.objects.filter(pk=user_id).values_list("auth_version", "is_active"))
+        return tuple(rows[0]) if rows else None
+
+    def invalidate(self, *user_ids):
+        with self._lock:
+            for user_id in user_ids:
+                self._entries.pop(user_id, None)
+        shared = self.shared
+        if shared is not None:
+            shared.delete_many([VERSION_KEY.format(user_id) for user_id in user_ids])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+user_versions = UserVersionCache()
+
+
+def invalidate_users(*user_ids):
+    user_versions.invalidate(*user_ids)
+
+
+def token_user_id(token):
+    # simplejwt stores the id as a string
+    return CustomUser._meta.pk.to_python(token[api_settings.USER_ID_CLAIM])
+
+
+def user_from_claims(token, auth_version, is_active):
+    college = get_college_by_code(token.get("college"))
+    loaded = {
+        "id": token_user_id(token),
+        "role": token.get("role"),
+        "college_id": college.pk if college else None,
+        "is_approved": token.get("approved", False),
+        "is_active": is_active,
+        "auth_version": auth_version,
+    }
+    # from_db expects values in concrete field order
+    names = [f.attname for f in CustomUser._meta.concrete_fields if f.attname in loaded]
+    return CustomUser.from_db("default", names, [loaded[name] for name in names])
+
+
+class CachedJWTAuthentication(JWTAuthentication):
+    def get_user(self, validated_token):
+        if "ver" not in validated_token:
+            # Issued before claims were added
+            return super().get_user(validated_token)
+
+        state = user_versions.get(token_user_id(validated_token))
+        if state is None:
+            raise AuthenticationFailed("User not found", code="user_not_found")
+
+        auth_version, is_active = state
+        if validated_token["ver"] != auth_version:
+            raise AuthenticationFailed("Token is out of date, please log in again.", code="token_stale")
+        if api_settings.CHECK_USER_IS_ACTIVE and not is_active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        if college_sessions_revoked(validated_token.get("college"), validated_token.get("iat", 0)):
+            raise AuthenticationFailed("Session has been revoked, please log in again.", code="token_revoked")
+
+        user = user_from_claims(validated_token, auth_version, is_active)
+        if user.college_id is None and validated_token.get("college"):
+            # College renamed or removed since the token was issued
+            return super().get_user(validated_token)
+        return user
+
+
+def validate_refresh_token(token):
+    """
+    Reject revoked, stale or college-revoked refresh tokens. Warm, this is a
+    Bloom probe plus two dict lookups; legacy tokens without `ver` fall back
+    to loading the user.
+    """
+    if is_token_revoked(token):
+        raise AuthenticationFailed("Token has been revoked.", code="token_revoked")
+
+    if "ver" in token:
+        state = user_versions.get(token_user_id(token))
+        if state is None or not state[1]:
+            raise AuthenticationFailed("No active account found for the given token.", code="no_active_account")
+        if token["ver"] != state[0]:
+            raise AuthenticationFailed("Token is out of date, please log in again.", code="token_stale")
+    else:
+        user = get_user_model().objects.filter(pk=token_user_id(token)).first()
+        if not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed("No active account found for the given token.", code="no_active_account")
+
+    if college_sessions_revoked(token.get("college"), token.get("iat", 0)):
+        raise AuthenticationFailed("Session has been revoked, please log in again.", code="token_revoked")
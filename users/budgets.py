@@ -0,0 +1,52 @@
+"""
+Query-count and latency budgets per URL name.
+
+`ms` covers the request's own work: wall time minus password hashing and
+waits on Google/LinkedIn. Those two are set by PASSWORD_HASHING and by the
+providers, not by the view.
+
+The metrics middleware checks each request against its view's budget when
+METRICS["BUDGETS"] is set (METRICS_BUDGETS; off by default). With "log" it
+logs a warning that includes the request's SQL. With "raise" it raises
+BudgetExceeded, which the endpoint tests use. Each URL name in
+users/urls.py must have a budget.
+
+Budgets are for warm workers. A request that loads the College cache or a
+roster into memory calls metrics.cold_path() and isn't checked.
+"""
+
+from typing import NamedTuple
+
+
+class Budget(NamedTuple):
+    queries: int
+    ms: float
+
+
+# Worst path on a warm worker. Counts include the revocation store's
+# periodic sync and user-version lookups on a cache miss.
+BUDGETS = {
+    "register": Budget(queries=5, ms=100),        # username and email checks, insert (in a savepoint, as below)
+    "login": Budget(queries=2, ms=100),           # user with college, rehash on outdated hasher
+    "token-refresh": Budget(queries=5, ms=100),   # sync, user version, advance the family (insert in a savepoint)
+    "logout": Budget(queries=2, ms=100),          # sync, revoke
+    "logout-all": Budget(queries=2, ms=100),      # user version, bump it
+    "google-auth": Budget(queries=4, ms=100),     # one lookup, insert (in a savepoint inside a transaction)
+    "linkedin-auth": Budget(queries=4, ms=100),
+    "directory": Budget(queries=2, ms=20),        # user version, one page
+}
+
+
+class BudgetExceeded(Exception):
+    pass
+
+
+def violation(view, query_count, ms, queries=None):
+    """A description of how `view` went over budget, with its SQL, or None."""
+    budget = BUDGETS.get(view)
+    if budget is None or (query_count <= budget.queries and ms <= budget.ms):
+        return None
+    lines = [f"{view} used {query_count} queries (budget {budget.queries}) "
+             f"and {ms:.1f} ms (budget {budget.ms:g} ms)"]
+    lines += [f"  {sql}" for sql, _ in queries or ()]
+    return "\n".join(lines)
@@ -0,0 +1,151 @@
+"""
+Per-process cache of College rows.
+
+The College table is tiny and almost never changes, so every process keeps
+all rows in memory, keyed by code and by email domain. Email domains are
+matched against the domain map suffix by suffix, longest first, so
+`cs.iitd.ac.in` resolves to the college that owns `iitd.ac.in` with one
+dict probe per label and no query. post_save and
+post_delete signals (see signals.py) drop the snapshot and it is reloaded
+with a single query on next use.
+
+Signals only reach the process that made the change. Without a shared
+cache, every other process reloads once its snapshot is
+`COLLEGE_CACHE_TTL` seconds old. A per-college logout or a roster upload
+therefore takes effect everywhere within that time.
+
+Set `COLLEGE_CACHE_ALIAS` to a shared cache (e.g. Redis or Memcached in
+CACHES) to keep every worker consistent at once: invalidation then also
+bumps a generation key there, and each process reloads when it sees a
+new one.
+"""
+
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+
+from .metrics import cold_path
+from .models import College
+
+GENERATION_KEY = "users:college-cache:generation"
+
+
+class CollegeCache:
+    def __init__(self):
+        self._snapshot = None   # (by_code, by_domain)
+        self._generation = None
+        self._epoch = 0         # bumped by invalidate() so a racing load can't store stale rows
+        self._expires_at = 0.0  # monotonic time after which, without a shared cache, rows are reloaded
+        self._lock = threading.Lock()
+
+    @property
+    def ttl(self):
+        return getattr(settings, "COLLEGE_CACHE_TTL", 30)
+
+    @property
+    def shared(self):
+        alias = getattr(settings, "COLLEGE_CACHE_ALIAS", None)
+        return caches[alias] if alias else None
+
+    def _shared_generation(self, shared):
+        return shared.get_or_set(GENERATION_KEY, lambda: uuid.uuid4().hex, timeout=None)
+
+    def _current(self):
+        shared = self.shared
+        generation = self._shared_generation(shared) if shared is not None else None
+        snapshot = self._snapshot
+        stale = shared is None and time.monotonic() >= self._expires_at
+        if snapshot is None or generation != self._generation or stale:
+            snapshot = self._load(generation)
+        return snapshot
+
+    def _load(self, generation):
+        cold_path()
+        epoch = self._epoch
+        colleges = list(College.objects.all())
+        snapshot = (
+            {college.code: college for college in colleges},
+            {college.domain.lower(): college for college in colleges if college.domain},
+        )
+        with self._lock:
+            if epoch == self._epoch:
+                self._snapshot = snapshot
+                self._generation = generation
+                self._expires_at = time.monotonic() + self.ttl
+        return snapshot
+
+    def by_code(self, code):
+        return self._current()[0].get(code)
+
+    def by_domain(self, domain):
+        return self._current()[1].get(domain.lower())
+
+    def by_email_domain(self, domain):
+        """The college owning `domain` or its closest parent domain."""
+        by_domain = self._current()[1]
+        domain = domain.lower().rstrip(".")
+        start = 0
+        while start < len(domain):
+            college = by_domain.get(domain[start:])
+            if college is not None:
+                return college
+            start = domain.find(".", start) + 1
+            if start == 0:
+                break
+        return None
+
+    def all(self):
+        return list(self._current()[0].values())
+
+    def invalidate(self):
+        with self._lock:
+            self._epoch += 1
+            self._snapshot = None
+        shared = self.shared
+        if shared is not None:
+            shared.set(GENERATION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+college_cache = CollegeCache()
+
+
+def get_college_by_code(code):
+    """The College with this code, or None."""
+    if not code:
+        return None
+    return college_cache.by_code(code)
+
+
+def get_college_by_domain(domain):
+    """The College whose official domain is exactly `domain`, or None."""
+    if not domain:
+        return None
+    return college_cache.by_domain(domain)
+
+
+def get_college_for_email(email):
+    """The College whose domain (or a parent of it) matches the email, or None."""
+    if not email or "@" not in email:
+        return None
+    return college_cache.by_email_domain(email.rpartition("@")[2])
+
+
+def email_matches_college(email, college):
+    """True if the email belongs to the college's official domain or a subdomain of it."""
+    return college is not None and college.domain is not None and get_college_for_email(email) == college
+
+
+def college_sessions_revoked(code, issued_at):
+    """True if the college logged out every session after a token issued at `issued_at` (unix time)."""
+    college = get_college_by_code(code)
+    if college is None or college.sessions_revoked_at is None:
+        return False
+    # iat has one-second resolution; tokens from the revocation's own second survive
+    return issued_at < int(college.sessions_revoked_at.timestamp())
+
+
+def invalidate_college_cache():
+    college_cache.invalidate()
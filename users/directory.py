@@ -0,0 +1,120 @@
+"""
+Alumni directory: the approved alumni of one college, searched by name,
+roll number and LinkedIn presence, in name order.
+
+Rows are sorted on DIRECTORY_NAME, a lowercased "first last username", and
+then id. Pages use a keyset cursor on that pair, so every page costs the
+same however far the client scrolls. Browsing walks
+users_directory_name_idx in order.
+
+Each word of `q` must start a word of the name, and each word of `roll` a
+word of the roll number. On PostgreSQL, once a search has a word of
+FULL_TEXT_MIN_LENGTH characters, that is a prefix full-text query,
+`ada:* & lov:*`, against DIRECTORY_SEARCH or DIRECTORY_ROLL_SEARCH, served
+by the GIN indexes users_directory_search_idx and users_directory_roll_idx.
+Full-text search is core PostgreSQL, so unlike pg_trgm it needs no
+extension installed. The GIN indexes span every college, and a one or two
+letter prefix matches a good share of all users, so shorter searches are
+LIKE patterns instead: those match densely, and an index-only walk of the
+college's name index finds a page of them after a few thousand entries.
+Other databases (SQLite, for local testing) always use the LIKE patterns.
+
+The planner underestimates how few of a college's rows a full-text search
+matches, and would rather walk the name index for the first page than sort
+the matches. A full-text search therefore sorts on `directory_order`, the
+same name in a form no index provides.
+"""
+
+import base64
+import json
+import re
+
+from django.contrib.postgres.search import SearchQuery
+from django.db import connections
+from django.db.models import Q, Value
+from django.db.models.functions import Concat, Upper
+
+from .models import DIRECTORY_MEMBERS, DIRECTORY_NAME, DIRECTORY_ROLL_SEARCH, DIRECTORY_SEARCH, CustomUser
+
+FIELDS = ("id", "username", "first_name", "last_name", "roll_number", "linkedin_url")
+MAX_TERMS = 5
+MAX_TERM_LENGTH = 50
+FULL_TEXT_MIN_LENGTH = 3
+# directory_name, but not as users_directory_name_idx has it
+SORTED = Concat("directory_name", Value(""))
+
+
+def directory_users(college_id):
+    return CustomUser.objects.filter(DIRECTORY_MEMBERS, college_id=college_id).annotate(directory_name=DIRECTORY_NAME)
+
+
+def words(text):
+    """Search terms as the full-text parser splits them: letters and digits, lowercased."""
+    return [word[:MAX_TERM_LENGTH] for word in re.findall(r"[^\W_]+", (text or "").lower())[:MAX_TERMS]]
+
+
+def full_text(queryset, terms):
+    return connections[queryset.db].vendor == "postgresql" and max(map(len, terms)) >= FULL_TEXT_MIN_LENGTH
+
+
+def search(queryset, q=None, roll=None, linkedin=None):
+    """Narrow `directory_users()` by name words, roll number words and whether they list LinkedIn."""
+    names, rolls = words(q), words(roll)
+    if names and full_text(queryset, names):
+        query = SearchQuery(" & ".join(f"{word}:*" for word in names), search_type="raw", config="simple")
+        queryset = queryset.alias(directory_search=DIRECTORY_SEARCH, directory_order=SORTED).filter(
+            directory_search=query,
+        )
+    else:
+        for word in names:
+            queryset = queryset.filter(Q(directory_name__startswith=word) | Q(directory_name__contains=f" {word}"))
+    if rolls and full_text(queryset, rolls):
+        query = SearchQuery(" & ".join(f"{word}:*" for word in rolls), search_type="raw", config="simple")
+        queryset = queryset.alias(roll_search=DIRECTORY_ROLL_SEARCH, directory_order=SORTED).filter(
+            roll_search=query,
+        )
+    elif rolls:
+        queryset = queryset.alias(roll=Upper("roll_number")).filter(roll__startswith=roll.strip().upper())
+    if linkedin is not None:
+        listed = Q(linkedin_url__gt="") | Q(linkedin_id__isnull=False)
+        queryset = queryset.filter(listed if linkedin else ~listed)
+    return queryset
+
+
+def page_query(queryset, cursor=None, limit=20):
+    """`queryset` in name order after `cursor`, as dicts, with one row more than `limit`."""
+    if cursor is not None:
+        name, last_id = cursor
+        # name >= x bounds the index scan; the exclude only sorts out ties
+        queryset = queryset.filter(directory_name__gte=name).exclude(directory_name=name, id__lte=last_id)
+    order = "directory_order" if "directory_order" in queryset.query.annotations else "directory_name"
+    return queryset.order_by(order, "id").values(*FIELDS, "directory_name")[:limit + 1]
+
+
+def directory_page(queryset, cursor=None, limit=20):
+    """
+    One page of `queryset` in name order, after `cursor`. Returns (rows as
+    dicts of FIELDS, next_cursor); next_cursor is None on the last page.
+    """
+    rows = list(page_query(queryset, cursor, limit))
+    if len(rows) > limit:
+        last = rows[limit - 1]
+        return rows[:limit], encode_cursor(last["directory_name"], last["id"])
+    return rows, None
+
+
+def encode_cursor(name, last_id):
+    return base64.urlsafe_b64encode(json.dumps([name, last_id]).encode()).decode().rstrip("=")
+
+
+def decode_cursor(value):
+    """(name, id) from `encode_cursor`, None for no cursor; ValueError if it was tampered with."""
+    if not value:
+        return None
+    try:
+        name, last_id = json.loads(base64.urlsafe_b64decode(value + "=" * (-len(value) % 4)))
+    except (TypeError, ValueError) as e:
+        raise ValueError("Invalid cursor.") from e
+    if not isinstance(name, str) or not isinstance(last_id, int):
+        raise ValueError("Invalid cursor.")
+    return name, last_id
@@ -0,0 +1,100 @@
+"""
+Streaming exports of a college's users, as NDJSON or CSV.
+
+Rows are read as tuples with `values_list(...).iterator(chunk_size=...)`,
+which is a server-side cursor on PostgreSQL, and are encoded as they
+arrive. Memory therefore stays flat however many users a college has.
+Lines are sent a chunk at a time rather than one write per row.
+
+The export runs in one transaction, so it reads a single snapshot. Inside
+a transaction the cursor doesn't need WITH HOLD. A WITH HOLD cursor would
+make PostgreSQL build the whole result before it sent the first row.
+Rows come in no particular order: sorting a large college would cost the
+same up-front wait.
+
+Under ASGI, Django reads a sync iterator to the end before it sends the
+first byte. The endpoint therefore serves `aexport_lines` there, which
+fetches one chunk at a time.
+
+Used by the college admins' export endpoint and `manage.py export_users`.
+"""
+
+import csv
+import io
+import json
+
+from asgiref.sync import sync_to_async
+from django.db import transaction
+
+from .importer import chunked
+from .models import CustomUser
+
+FIELDS = (
+    "id", "username", "email", "first_name", "last_name", "role", "roll_number",
+    "phone", "linkedin_url", "is_approved", "is_active", "date_joined",
+)
+CONTENT_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+CHUNK_SIZE = 2000
+
+
+def export_users(college_id, role=None, approved=None):
+    """Rows of FIELDS for `college_id`'s users, optionally one role and approval state."""
+    queryset = CustomUser.objects.filter(college_id=college_id)
+    if role:
+        queryset = queryset.filter(role=role)
+    if approved is not None:
+        queryset = queryset.filter(is_approved=approved)
+    return queryset.values_list(*FIELDS)
+
+
+def _iso(row):
+    # date_joined, the only datetime, is last
+    return (*row[:-1], row[-1].isoformat())
+
+
+def _csv(rows):
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(map(_iso, rows))
+    return buffer.getvalue()
+
+
+def _ndjson(rows):
+    return "".join(json.dumps(dict(zip(FIELDS, _iso(row)))) + "\n" for row in rows)
+
+
+def _csv_header():
+    buffer = io.StringIO()
+    csv.writer(buffer).writerow(FIELDS)
+    return buffer.getvalue()
+
+
+ENCODERS = {"csv": _csv, "ndjson": _ndjson}
+
+
+def export_lines(queryset, fmt, chunk_size=CHUNK_SIZE):
+    """
+    Yield `queryset` (from `export_users`) as `fmt` text, `chunk_size` rows
+    per string; CSV starts with a header row.
+    """
+    encode = ENCODERS[fmt]
+    if fmt == "csv":
+        yield _csv_header()
+    with transaction.atomic(using=queryset.db):
+        for rows in chunked(queryset.iterator(chunk_size=chunk_size), chunk_size):
+            yield encode(rows)
+
+
+async def aexport_lines(queryset, fmt, chunk_size=CHUNK_SIZE):
+    """
+    `export_lines` as an async iterator. Every chunk is read on the same
+    thread (thread-sensitive sync_to_async), which keeps the transaction
+    and its cursor valid.
+    """
+    lines = export_lines(queryset, fmt, chunk_size)
+    fetch = sync_to_async(next)
+    try:
+        while (text := await fetch(lines, None)) is not None:
+            yield text
+    finally:
+        # Ends the transaction, also when the client goes away mid-export
+        await sync_to_async(lines.close)()
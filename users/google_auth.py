@@ -0,0 +1,262 @@
+"""
+Process-wide Google ID token verification.
+
+`id_token.verify_oauth2_token` downloads Google's signing certificates on
+every call. The verifier below keeps them in memory for as long as Google's
+Cache-Control max-age allows, fetches them over a pooled keep-alive session
+and refreshes them in the background shortly before they expire, so a warm
+process never waits on the certificate endpoint. `averify` does the same
+from async views, fetching cold certificates with httpx.
+
+gunicorn.conf.py calls `warm_google_verifier` in each new worker, so the
+first sign-in doesn't wait on a cold fetch either.
+"""
+
+import asyncio
+import logging
+import re
+import threading
+import time
+
+import httpx
+import requests as http_requests
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from google.auth import transport
+from google.oauth2 import id_token
+
+from .http import build_session, get_async_client
+from .metrics import timed
+
+logger = logging.getLogger(__name__)
+
+GOOGLE_CERTS_URL = "https://www.googleapis.com/oauth2/v1/certs"
+GOOGLE_ISSUERS = ("accounts.google.com", "https://accounts.google.com")
+
+_MAX_AGE_RE = re.compile(r"max-age=(\d+)")
+
+
+def cache_lifetime(headers, default):
+    """Seconds a response may be cached for, from Cache-Control and Age."""
+    match = _MAX_AGE_RE.search(headers.get("Cache-Control", ""))
+    if not match:
+        return default
+    try:
+        age = int(headers.get("Age", 0))
+    except ValueError:
+        age = 0
+    return max(int(match.group(1)) - age, 0)
+
+
+class _CachedResponse(transport.Response):
+    def __init__(self, response):
+        self._status = response.status_code
+        self._headers = dict(response.headers)
+        self._data = response.content
+
+    @property
+    def status(self):
+        return self._status
+
+    @property
+    def headers(self):
+        return self._headers
+
+    @property
+    def data(self):
+        return self._data
+
+
+class CachedCertsRequest(transport.Request):
+    """
+    google-auth transport that serves GET responses from memory.
+
+    Entries live for the max-age Google sends. `refresh_margin` seconds
+    before an entry expires a daemon timer fetches it again, so lookups keep
+    hitting the cache. A failed refresh keeps serving the old certificates
+    and retries after `retry_interval` seconds.
+    """
+
+    def __init__(self, session=None, timeout=10, default_ttl=300,
+                 refresh_margin=60, retry_interval=30):
+        self.session = session or build_session()
+        self.timeout = timeout
+        self.default_ttl = default_ttl
+        self.refresh_margin = refresh_margin
+        self.retry_interval = retry_interval
+        self.fetch_count = 0
+        self._cache = {}    # url -> (response, expires_at)
+        self._timers = {}
+        self._inflight = {}  # url -> async fetch shared by concurrent coroutines
+        self._lock = threading.Lock()
+
+    def __call__(self, url, method="GET", body=None, headers=None, timeout=None, **kwargs):
+        if method != "GET" or body is not None:
+            with timed("http"):
+                response = self.session.request(method, url, data=body, headers=headers,
+                                                timeout=timeout or self.timeout, **kwargs)
+            return _CachedResponse(response)
+
+        entry = self._cache.get(url)
+        if entry and time.monotonic() < entry[1]:
+            return entry[0]
+
+        with timed("http"), self._lock:
+            # Another thread may have fetched it while we waited
+            entry = self._cache.get(url)
+            if entry and time.monotonic() < entry[1]:
+                return entry[0]
+            return self._fetch(url, timeout)
+
+    def is_fresh(self, url):
+        entry = self._cache.get(url)
+        return bool(entry) and time.monotonic() < entry[1]
+
+    def _fetch(self, url, timeout=None):
+        return self._store(url, self.session.get(url, timeout=timeout or self.timeout))
+
+    async def afetch(self, url):
+        """Make sure `url` is cached, without blocking the event loop."""
+        if self.is_fresh(url):
+            return
+        task = self._inflight.get(url)
+        if task is None or task.get_loop() is not asyncio.get_running_loop():
+            task = asyncio.ensure_future(self._afetch(url))
+            self._inflight[url] = task
+            task.add_done_callback(lambda _: self._inflight.pop(url, None))
+        with timed("http"):
+            await asyncio.shield(task)
+
+    async def _afetch(self, url):
+        # No self._lock here: a background refresh may hold it for a whole request
+        self._store(url, await get_async_client().get(url, timeout=self.timeout))
+
+    def _store(self, url, response):
+        self.fetch_count += 1
+        cached = _CachedResponse(response)
+        if response.status_code != 200:
+            return cached
+
+        ttl = cache_lifetime(response.headers, self.default_ttl)
+        self._cache[url] = (cached, time.monotonic() + ttl)
+        self._schedule_refresh(url, max(ttl - self.refresh_margin, 1))
+        return cached
+
+    def _schedule_refresh(self, url, delay):
+        old = self._timers.pop(url, None)
+        if old is not None:
+            old.cancel()
+        timer = threading.Timer(delay, self._background_refresh, args=(url,))
+        timer.daemon = True
+        self._timers[url] = timer
+        timer.start()
+
+    def _background_refresh(self, url):
+        with self._lock:
+            try:
+                response = self._fetch(url)
+                failed = response.status != 200
+            except http_requests.RequestException:
+                failed = True
+            if failed:
+                self._extend(url)
+
+    def _extend(self, url):
+        """Keep serving stale certificates while the endpoint is failing."""
+        entry = self._cache.get(url)
+        if entry:
+            self._cache[url] = (entry[0], max(entry[1], time.monotonic() + self.retry_interval))
+        self._schedule_refresh(url, self.retry_interval)
+
+    def warm(self, url):
+        """Populate the cache ahead of the first request."""
+        self(url)
+
+    def close(self):
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+        self._cache.clear()
+
+
+class GoogleTokenVerifier:
+    """Verifies Google OAuth2 ID tokens against cached signing certificates."""
+
+    def __init__(self, audience=None, certs_url=GOOGLE_CERTS_URL, request=None,
+                 clock_skew_in_seconds=0):
+        self.audience = audience
+        self.certs_url = certs_url
+        self.request = request or CachedCertsRequest()
+        self.clock_skew_in_seconds = clock_skew_in_seconds
+
+    def verify(self, token):
+        """
+        Same contract as `id_token.verify_oauth2_token`, except an unknown
+        issuer raises ValueError like every other verification failure.
+        """
+        idinfo = id_token.verify_token(
+            token,
+            self.request,
+            audience=self.audience,
+            certs_url=self.certs_url,
+            clock_skew_in_seconds=self.clock_skew_in_seconds,
+        )
+        if idinfo.get("iss") not in GOOGLE_ISSUERS:
+            raise ValueError(f"Wrong issuer. 'iss' should be one of {GOOGLE_ISSUERS} but got '{idinfo.get('iss')}'")
+        return idinfo
+
+    async def averify(self, token):
+        try:
+            await self.request.afetch(self.certs_url)
+        except httpx.HTTPError as e:
+            raise ValueError(f"Could not fetch certificates at {self.certs_url}: {e}") from e
+        if self.request.is_fresh(self.certs_url):
+            return self.verify(token)   # cached certs: CPU only
+        return await sync_to_async(self.verify, thread_sensitive=False)(token)
+
+
+_verifier = None
+_verifier_lock = threading.Lock()
+
+
+def get_google_verifier():
+    """The per-process verifier, created on first use."""
+    global _verifier
+    if _verifier is None:
+        with _verifier_lock:
+            if _verifier is None:
+                _verifier = GoogleTokenVerifier(
+                    audience=getattr(settings, "GOOGLE_CLIENT_ID", None),
+                    certs_url=getattr(settings, "GOOGLE_CERTS_URL", GOOGLE_CERTS_URL),
+                )
+    return _verifier
+
+
+def reset_google_verifier():
+    global _verifier
+    with _verifier_lock:
+        if _verifier is not None:
+            _verifier.request.close()
+        _verifier = None
+
+
+def warm_google_verifier():
+    """
+    Fetch the signing certificates before the first sign-in needs them.
+    Call it once in each worker after fork, not in a --preload master: the
+    refresh timer it starts doesn't survive a fork. A failure is logged and
+    the first sign-in fetches the certificates itself.
+    """
+    verifier = get_google_verifier()
+    try:
+        verifier.request.warm(verifier.certs_url)
+    except http_requests.RequestException:
+        logger.warning("Could not prefetch Google certificates from %s", verifier.certs_url, exc_info=True)
+
+
+def verify_google_id_token(token):
+    return get_google_verifier().verify(token)
+
+
+async def averify_google_id_token(token):
+    return await get_google_verifier().averify(token)
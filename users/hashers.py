@@ -0,0 +1,184 @@
+"""
+Password hashers whose work factor is calibrated for the deploying machine.
+
+`manage.py calibrate_password_hasher` measures this machine and prints a
+PASSWORD_HASH_ALGORITHM / PASSWORD_HASH_PARAMS pair that lands a single
+hash near a latency budget. The preferred hasher reads those parameters
+from settings.PASSWORD_HASHING, and every hash records its own parameters.
+When the configuration changes, a hash made under the old parameters is
+reported by `must_update` and rehashed on the user's next successful login
+by both the sync (`user.check_password`) and async (`acheck_password`)
+login paths.
+
+Calibration is a deploy step, not something done at startup: workers that
+calibrated independently would disagree and keep rehashing each other's
+hashes.
+"""
+
+import base64
+import hashlib
+import time
+
+from django.conf import settings
+from django.contrib.auth.hashers import Argon2PasswordHasher, PBKDF2PasswordHasher, ScryptPasswordHasher
+from django.utils.crypto import get_random_string
+
+from .metrics import timed
+
+
+class CalibratedHasherMixin:
+    """
+    Reads the work factor from PASSWORD_HASHING["PARAMS"] when this is the
+    configured algorithm; otherwise keeps Django's defaults. `params` pins
+    explicit values, for benchmarks.
+    """
+    param_names = ()
+
+    def __init__(self, params=None):
+        self._params = params
+
+    def _param(self, name):
+        if self._params is not None:
+            return self._params.get(name, getattr(super(), name))
+        conf = getattr(settings, "PASSWORD_HASHING", {})
+        if conf.get("ALGORITHM") == self.algorithm:
+            return conf.get("PARAMS", {}).get(name, getattr(super(), name))
+        return getattr(super(), name)
+
+    def current_params(self):
+        return {name: getattr(self, name) for name in self.param_names}
+
+    def encode(self, password, salt, *args, **kwargs):
+        with timed("hash"):
+            return super().encode(password, salt, *args, **kwargs)
+
+    def verify(self, password, encoded):
+        with timed("hash"):
+            return super().verify(password, encoded)
+
+
+class CalibratedPBKDF2PasswordHasher(CalibratedHasherMixin, PBKDF2PasswordHasher):
+    param_names = ("iterations",)
+
+    @property
+    def iterations(self):
+        return self._param("iterations")
+
+
+class CalibratedScryptPasswordHasher(CalibratedHasherMixin, ScryptPasswordHasher):
+    """Memory-hard: each hash needs about 128 * work_factor * block_size bytes."""
+    param_names = ("work_factor", "block_size", "parallelism")
+
+    @property
+    def work_factor(self):
+        return self._param("work_factor")
+
+    @property
+    def block_size(self):
+        return self._param("block_size")
+
+    @property
+    def parallelism(self):
+        return self._param("parallelism")
+
+    def encode(self, password, salt, n=None, r=None, p=None):
+        # Same as Django's, with maxmem sized for the parameters being used:
+        # OpenSSL's 32 MiB default rejects larger calibrated work factors.
+        self._check_encode_args(password, salt)
+        n = n or self.work_factor
+        r = r or self.block_size
+        p = p or self.parallelism
+        with timed("hash"):
+            hash_ = hashlib.scrypt(
+                password.encode(), salt=salt.encode(), n=n, r=r, p=p,
+                maxmem=scrypt_memory(n, r, p) * 2 + 128 * r * p, dklen=64,
+            )
+        hash_ = base64.b64encode(hash_).decode("ascii").strip()
+        return "%s$%d$%s$%d$%d$%s" % (self.algorithm, n, salt, r, p, hash_)
+
+
+class CalibratedArgon2PasswordHasher(CalibratedHasherMixin, Argon2PasswordHasher):
+    """Argon2id; needs argon2-cffi. memory_cost is in KiB."""
+    param_names = ("time_cost", "memory_cost", "parallelism")
+
+    @property
+    def time_cost(self):
+        return self._param("time_cost")
+
+    @property
+    def memory_cost(self):
+        return self._param("memory_cost")
+
+    @property
+    def parallelism(self):
+        return self._param("parallelism")
+
+
+HASHERS = {
+    "pbkdf2_sha256": CalibratedPBKDF2PasswordHasher,
+    "scrypt": CalibratedScryptPasswordHasher,
+    "argon2": CalibratedArgon2PasswordHasher,
+}
+
+
+def scrypt_memory(n, r, p):
+    """Approximate bytes scrypt allocates: its n * r block table dominates."""
+    return 128 * r * n
+
+
+def hasher_memory(algorithm, params):
+    if algorithm == "scrypt":
+        return scrypt_memory(params["work_factor"], params["block_size"], params["parallelism"])
+    if algorithm == "argon2":
+        return params["memory_cost"] * 1024
+    return 0
+
+
+def measure(hasher, rounds=3):
+    """Median seconds for one hash with `hasher`."""
+    password, salt = "calibration-password", get_random_string(22)
+    timings = []
+    for _ in range(rounds):
+        started = time.perf_counter()
+        hasher.encode(password, salt)
+        timings.append(time.perf_counter() - started)
+    return sorted(timings)[len(timings) // 2]
+
+
+def calibrate(algorithm, target, max_memory=64 * 1024 * 1024):
+    """
+    Parameters that make one `algorithm` hash take about `target` seconds
+    on this machine, using at most `max_memory` bytes per hash.
+
+    PBKDF2 scales its iterations. scrypt doubles its work factor (memory)
+    while that stays under budget, then raises parallelism, which adds time
+    but not memory. Argon2 uses the memory budget and scales time_cost.
+    """
+    hasher_class = HASHERS[algorithm]
+
+    if algorithm == "pbkdf2_sha256":
+        probe = 100_000
+        per_iteration = measure(hasher_class({"iterations": probe})) / probe
+        return {"iterations": max(10_000, int(round(target / per_iteration, -4)))}
+
+    if algorithm == "scrypt":
+        params = {"work_factor": 2 ** 12, "block_size": 8, "parallelism": 1}
+        elapsed = measure(hasher_class(params))
+        while True:
+            doubled = dict(params, work_factor=params["work_factor"] * 2)
+            if elapsed * 2 > target or hasher_memory("scrypt", doubled) > max_memory:
+                break
+            params, elapsed = doubled, measure(hasher_class(doubled))
+        params["parallelism"] = max(1, int(target / elapsed))
+        return params
+
+    if algorithm == "argon2":
+        params = {"time_cost": 1, "memory_cost": max_memory // 1024, "parallelism": 1}
+        elapsed = measure(hasher_class(params))
+        while elapsed > target and params["memory_cost"] > 8 * 1024:
+            params["memory_cost"] //= 2
+            elapsed = measure(hasher_class(params))
+        params["time_cost"] = max(1, int(target / elapsed))
+        return params
+
+    raise ValueError(f"Unknown algorithm {algorithm!r}; expected one of {', '.join(HASHERS)}")
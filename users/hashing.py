@@ -0,0 +1,64 @@
+"""
+Password hashing off the event loop.
+
+PBKDF2 (and Argon2/scrypt) hold a CPU core for hundreds of milliseconds.
+The async auth views run them on a bounded thread pool: hashlib releases
+the GIL while hashing, so up to `PASSWORD_HASH_WORKERS` hashes proceed in
+parallel while the loop keeps serving other requests. Django's own
+`acheck_password` goes through `sync_to_async`, which serializes every
+hash in the process onto a single thread.
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+
+from .metrics import timed
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def get_hash_executor():
+    """The per-process hashing pool, created on first use."""
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                workers = getattr(settings, "PASSWORD_HASH_WORKERS", None) or os.cpu_count() or 1
+                _executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password-hash")
+    return _executor
+
+
+def reset_hash_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False)
+        _executor = None
+
+
+async def _run(func, *args):
+    with timed("hash"):
+        return await asyncio.get_running_loop().run_in_executor(get_hash_executor(), func, *args)
+
+
+async def amake_password(raw_password):
+    return await _run(make_password, raw_password)
+
+
+async def acheck_password(user, raw_password):
+    """
+    `user.check_password` without blocking the loop. Like the sync version,
+    a correct password stored with an outdated hasher is rehashed and saved.
+    """
+    outdated = []
+    valid = await _run(check_password, raw_password, user.password, outdated.append)
+    if valid and outdated:
+        user.password = await amake_password(raw_password)
+        await user.asave(update_fields=["password"])
+    return valid
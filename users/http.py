@@ -0,0 +1,35 @@
+"""
+Shared outbound HTTP helpers for the social login providers.
+"""
+
+import asyncio
+import weakref
+
+import httpx
+import requests as http_requests
+from requests.adapters import HTTPAdapter
+
+
+def build_session(pool_size=10):
+    """A requests session with a keep-alive connection pool."""
+    session = http_requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+# httpx connections belong to the loop that opened them
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def get_async_client(pool_size=100):
+    """A keep-alive httpx client for the running event loop."""
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = httpx.AsyncClient(limits=httpx.Limits(
+            max_connections=pool_size, max_keepalive_connections=pool_size,
+        ))
+        _async_clients[loop] = client
+    return client
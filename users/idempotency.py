@@ -0,0 +1,281 @@
+"""
+Idempotency keys for the sign-up endpoints.
+
+A client that may retry a POST sends an `Idempotency-Key` header, for
+example a UUID. The first response for that key and path is stored. A
+retry with the same key and the same body gets that response back with
+`Idempotent-Replayed: true`. The view doesn't run again, so a replay costs
+no queries, password hashing or provider calls. Responses are stored
+whatever their status, except 429 and 5xx, which the client should be able
+to retry.
+
+- A retry that arrives while the first request is still running waits up
+  to IDEMPOTENCY["WAIT"] seconds for its response. After that it gets 409.
+- Reusing a key with a different body gets 422.
+
+Stored responses contain tokens. They are kept for IDEMPOTENCY["TTL"]
+seconds, in a bounded per-process table, or in IDEMPOTENCY["CACHE_ALIAS"]
+when that names a cache shared by every worker.
+"""
+
+import functools
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core.cache import caches
+from django.http import HttpResponse, JsonResponse
+
+HEADER = "HTTP_IDEMPOTENCY_KEY"
+MAX_KEY_LENGTH = 255
+IN_FLIGHT_TTL = 60   # seconds a crashed worker's claim blocks its key
+
+OWNER, REPLAY, MISMATCH, IN_FLIGHT = "owner", "replay", "mismatch", "in-flight"
+
+
+class Entry:
+    """A key's body fingerprint and stored response; `response` is None while in flight."""
+    __slots__ = ("fingerprint", "response", "expires", "done")
+
+    def __init__(self, fingerprint, response=None, expires=0.0):
+        self.fingerprint = fingerprint
+        self.response = response   # (status, content, content type)
+        self.expires = expires
+        self.done = None
+
+
+# ---------------- Backends ----------------
+class MemoryBackend:
+    """
+    Per-process entries, oldest first. Past `max_keys` the oldest are
+    dropped; every entry has the same TTL, so those expire first anyway.
+    """
+
+    def __init__(self, max_keys=10000):
+        self.max_keys = max_keys
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def reserve(self, key, fingerprint, ttl):
+        """The live entry for `key` and False, or a new in-flight entry and True."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires > now:
+                return entry, False
+            entry = Entry(fingerprint, expires=now + ttl)
+            entry.done = threading.Event()
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_keys:
+                self._entries.popitem(last=False)
+        return entry, True
+
+    def complete(self, key, entry, response, ttl):
+        with self._lock:
+            entry.response = response
+            entry.expires = time.monotonic() + ttl
+            if key in self._entries:
+                self._entries.move_to_end(key)
+        entry.done.set()
+
+    def release(self, key, entry):
+        with self._lock:
+            if self._entries.get(key) is entry:
+                del self._entries[key]
+        entry.done.set()
+
+    def wait(self, key, entry, timeout):
+        entry.done.wait(timeout)
+
+
+class CacheBackend:
+    """Entries in a Django cache shared by every worker; waiting polls it."""
+    poll_interval = 0.05
+
+    def __init__(self, alias):
+        self.cache = caches[alias]
+
+    def _key(self, key):
+        return f"users:idempotency:{hashlib.blake2b(key.encode(), digest_size=16).hexdigest()}"
+
+    def reserve(self, key, fingerprint, ttl):
+        cache_key = self._key(key)
+        for _ in range(2):
+            if self.cache.add(cache_key, (fingerprint, None), timeout=ttl):
+                return Entry(fingerprint), True
+            stored = self.cache.get(cache_key)
+            if stored is not None:
+                return Entry(*stored), False
+            # Expired or released between add() and get()
+        return Entry(fingerprint), True
+
+    def complete(self, key, entry, response, ttl):
+        self.cache.set(self._key(key), (entry.fingerprint, response), timeout=ttl)
+
+    def release(self, key, entry):
+        self.cache.delete(self._key(key))
+
+    def wait(self, key, entry, timeout):
+        cache_key = self._key(key)
+        deadline = time.monotonic() + timeout
+        while time.monotonic() < deadline:
+            stored = self.cache.get(cache_key)
+            if stored is None or stored[1] is not None:
+                return
+            time.sleep(self.poll_interval)
+
+
+# ---------------- Store ----------------
+class IdempotencyStore:
+    def __init__(self, backend, ttl=3600, wait=10.0):
+        self.backend = backend
+        self.ttl = ttl
+        self.wait = wait
+
+    def acquire(self, key, fingerprint, block=True):
+        """
+        (OWNER, entry) when this request should run the view, (REPLAY,
+        response), (MISMATCH, None), or (IN_FLIGHT, None) when another
+        request with the key is still running after `wait` seconds, or at
+        once when not `block`.
+        """
+        deadline = time.monotonic() + self.wait
+        while True:
+            entry, created = self.backend.reserve(key, fingerprint, IN_FLIGHT_TTL)
+            if created:
+                return OWNER, entry
+            if entry.fingerprint != fingerprint:
+                return MISMATCH, None
+            if entry.response is not None:
+                return REPLAY, entry.response
+            remaining = deadline - time.monotonic()
+            if not block or remaining <= 0:
+                return IN_FLIGHT, None
+            # Then look again: the owner either stored a response or gave up the key
+            self.backend.wait(key, entry, remaining)
+
+    def finish(self, key, entry, response):
+        """Store `response` for replays, or free the key when it shouldn't be replayed."""
+        if response is None or response.status_code == 429 or response.status_code >= 500:
+            self.backend.release(key, entry)
+            return
+        if hasattr(response, "render") and not response.is_rendered:
+            response.render()
+        stored = (response.status_code, bytes(response.content), response.get("Content-Type"))
+        self.backend.complete(key, entry, stored, self.ttl)
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_idempotency_store():
+    """The per-process store configured by settings.IDEMPOTENCY, or None when disabled."""
+    global _store
+    conf = getattr(settings, "IDEMPOTENCY", {})
+    if not conf.get("ENABLED", True):
+        return None
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                alias = conf.get("CACHE_ALIAS")
+                backend = CacheBackend(alias) if alias else MemoryBackend(conf.get("MAX_KEYS", 10000))
+                _store = IdempotencyStore(backend, ttl=conf.get("TTL", 3600), wait=conf.get("WAIT", 10.0))
+    return _store
+
+
+def reset_idempotency_store():
+    global _store
+    with _store_lock:
+        _store = None
+
+
+# ---------------- View decorator ----------------
+def fingerprint(request):
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (request.method, request.path, request.content_type or ""):
+        digest.update(part.encode() + b"\0")
+    digest.update(request.body)
+    return digest.hexdigest()
+
+
+def replay(stored):
+    status, content, content_type = stored
+    response = HttpResponse(content, status=status, content_type=content_type)
+    response["Idempotent-Replayed"] = "true"
+    return response
+
+
+def claim(request):
+    """(store, key, fingerprint) for a POST carrying a usable key, or a response to send instead."""
+    key = request.META.get(HEADER)
+    store = get_idempotency_store() if key and request.method == "POST" else None
+    if store is None:
+        return None
+    if len(key) > MAX_KEY_LENGTH:
+        return JsonResponse({"detail": f"Idempotency-Key must be at most {MAX_KEY_LENGTH} characters."}, status=400)
+    return store, f"{request.path}:{key}", fingerprint(request)
+
+
+def outcome(state, value):
+    if state == REPLAY:
+        return replay(value)
+    if state == MISMATCH:
+        return JsonResponse(
+            {"detail": "This Idempotency-Key was already used with a different request body."}, status=422,
+        )
+    response = JsonResponse(
+        {"detail": "A request with this Idempotency-Key is still in progress."}, status=409,
+    )
+    response["Retry-After"] = "1"
+    return response
+
+
+def idempotent(view):
+    """Honour `Idempotency-Key` on POSTs to `view`, a sync or async view function."""
+    if iscoroutinefunction(view):
+        async def wrapper(request, *args, **kwargs):
+            claimed = claim(request)
+            if claimed is None:
+                return await view(request, *args, **kwargs)
+            if not isinstance(claimed, tuple):
+                return claimed
+            store, key, digest = claimed
+            # The store may be a network cache: every call runs off the event loop
+            state, value = await sync_to_async(store.acquire, thread_sensitive=False)(key, digest, block=False)
+            if state == IN_FLIGHT:
+                # Wait in a thread of its own; the owner may be a request on this loop
+                state, value = await sync_to_async(store.acquire, thread_sensitive=False)(key, digest)
+            if state != OWNER:
+                return outcome(state, value)
+            response = None
+            try:
+                response = await view(request, *args, **kwargs)
+            finally:
+                await sync_to_async(store.finish, thread_sensitive=False)(key, value, response)
+            return response
+
+        markcoroutinefunction(wrapper)
+    else:
+        def wrapper(request, *args, **kwargs):
+            claimed = claim(request)
+            if claimed is None:
+                return view(request, *args, **kwargs)
+            if not isinstance(claimed, tuple):
+                return claimed
+            store, key, digest = claimed
+            state, value = store.acquire(key, digest)
+            if state != OWNER:
+                return outcome(state, value)
+            response = None
+            try:
+                response = view(request, *args, **kwargs)
+            finally:
+                store.finish(key, value, response)
+            return response
+
+    return functools.wraps(view)(wrapper)
@@ -0,0 +1,81 @@
+"""
+Identity resolution for social login.
+
+`resolve_user` finds the account for a provider id or an email in a single
+query. When both match different rows, the provider id wins.
+
+`create_user` inserts a new account with upsert semantics. If a concurrent
+first login for the same identity got there first, the INSERT hits a
+unique constraint (email or provider id), and the winner's row is returned
+instead. `link_provider` attaches a provider id to an account found by
+email, using a conditional UPDATE, so two racing links can't overwrite
+each other.
+
+Usernames for social accounts are the email's local part plus a short
+digest of the provider id. Provider ids are unique, so the username is
+too, without checking for it first or retrying.
+"""
+
+import base64
+import hashlib
+import re
+
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from .models import CustomUser
+
+PROVIDER_FIELDS = ("google_sub", "linkedin_id")
+
+
+def resolve_user(provider_field, provider_id, email):
+    """The user with this provider id, else the one with this email, else None."""
+    assert provider_field in PROVIDER_FIELDS
+    match = Q()
+    if provider_id:
+        match |= Q(**{provider_field: provider_id})
+    if email:
+        match |= Q(email=email)
+    if not match:
+        return None
+
+    users = list(CustomUser.objects.select_related('college').filter(match)[:2])
+    for user in users:
+        if provider_id and getattr(user, provider_field) == provider_id:
+            return user
+    return users[0] if users else None
+
+
+def link_provider(user, provider_field, provider_id):
+    """Record `provider_id` on `user` unless they already have one for this provider."""
+    if provider_id and not getattr(user, provider_field):
+        linked = CustomUser.objects.filter(pk=user.pk, **{f"{provider_field}__isnull": True}).update(
+            **{provider_field: provider_id}
+        )
+        if linked:
+            setattr(user, provider_field, provider_id)
+    return user
+
+
+def create_user(user, provider_field):
+    """
+    Save the new, unsaved `user`, or return the account a concurrent login
+    created for the same identity. Returns (user, created).
+    """
+    try:
+        with transaction.atomic():
+            user.save()
+        return user, True
+    except IntegrityError:
+        existing = resolve_user(provider_field, getattr(user, provider_field), user.email)
+        if existing is None:
+            raise
+        return link_provider(existing, provider_field, getattr(user, provider_field)), False
+
+
+def social_username(email, provider_field, provider_id, fallback=None):
+    """e.g. "ada.lovelace-k3v9q2"; the suffix is derived from the provider id."""
+    base = email.split('@')[0] if email else (fallback or "user")
+    base = re.sub(r"[^\w.+-]", "", base)[:140] or "user"
+    digest = hashlib.blake2b(f"{provider_field}:{provider_id}".encode(), digest_size=5).digest()
+    return f"{base}-{base64.b32encode(digest).decode().lower()}"
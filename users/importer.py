@@ -0,0 +1,288 @@
+"""
+Bulk alumni import from CSV or NDJSON rosters.
+
+Rows are streamed in chunks. Each chunk is validated against the College
+cache, its passwords are hashed in a process pool and it is inserted with
+`bulk_create` inside its own transaction. Rejected rows go to a reject
+writer and a checkpoint file records how many rows have been committed, so
+a crashed import can be resumed where it stopped.
+
+Used by `manage.py import_alumni` and the "Import alumni" admin page.
+"""
+
+import csv
+import io
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+
+import django
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models.functions import Lower
+
+from .colleges import email_matches_college, get_college_by_code, get_college_for_email
+from .models import CustomUser, ROLE_CHOICES
+
+IMPORT_ROLES = {"student", "alumni"}
+ROLE_NAMES = dict(ROLE_CHOICES)
+CHECKED_LENGTHS = ("username", "email", "first_name", "last_name", "phone", "roll_number", "linkedin_url")
+
+
+def detect_format(name):
+    return "ndjson" if name.endswith((".ndjson", ".jsonl")) else "csv"
+
+
+class UnreadableRow:
+    """An NDJSON line that isn't a JSON object; rejected like any other bad row."""
+
+    def __init__(self, text, error):
+        self.text = text
+        self.error = error
+
+
+def read_rows(stream, fmt):
+    """Yield roster rows as dicts from a text stream, or UnreadableRow for lines that aren't one."""
+    if fmt == "csv":
+        yield from csv.DictReader(stream)
+    else:
+        for line in stream:
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as e:
+                yield UnreadableRow(line.rstrip("\n"), f"Invalid JSON: {e}")
+                continue
+            yield row if isinstance(row, dict) else UnreadableRow(line.rstrip("\n"), "Row is not a JSON object.")
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _roll_key(user):
+    return (user.college_id, user.roll_number.lower())
+
+
+def _init_worker():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "AlumGlobe.settings")
+    django.setup()
+
+
+def _hash_passwords(passwords):
+    return [make_password(password) for password in passwords]
+
+
+class ImportResult:
+    def __init__(self):
+        self.created = 0
+        self.rejected = 0
+        self.skipped = 0   # rows already committed by a previous run
+        self.seconds = 0.0
+
+    @property
+    def rows_per_second(self):
+        return (self.created + self.rejected) / self.seconds if self.seconds else 0.0
+
+
+class RowError(Exception):
+    pass
+
+
+def _text(row, field):
+    """The stripped text of `field`; numbers are accepted as text, lists and objects are not."""
+    value = row.get(field)
+    if value is None:
+        return ""
+    if isinstance(value, (dict, list)):
+        raise RowError(f"{field} must be text.")
+    return str(value).strip()
+
+
+class AlumniImporter:
+    """
+    `college` is used for rows without a college_code; otherwise the code
+    (or failing that, the email domain) picks the college. Rows without a
+    password get an unusable one. Imported users are approved unless
+    `approve` is False, since the roster comes from the college itself.
+    """
+
+    def __init__(self, college=None, batch_size=1000, workers=0, approve=True,
+                 reject_writer=None, checkpoint_path=None):
+        self.college = college
+        self.batch_size = batch_size
+        self.workers = workers
+        self.approve = approve
+        self.reject_writer = reject_writer
+        self.checkpoint_path = checkpoint_path
+
+    # ---------------- checkpoints ----------------
+    def _read_checkpoint(self):
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path) as f:
+                return json.load(f)["rows_done"]
+        return 0
+
+    def _write_checkpoint(self, rows_done):
+        if not self.checkpoint_path:
+            return
+        tmp = f"{self.checkpoint_path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"rows_done": rows_done}, f)
+        os.replace(tmp, self.checkpoint_path)
+
+    # ---------------- rows ----------------
+    def _build_user(self, row):
+        if isinstance(row, UnreadableRow):
+            raise RowError(row.error)
+        email = _text(row, "email").lower()
+        try:
+            validate_email(email)
+        except ValidationError:
+            raise RowError("Invalid email.")
+
+        role = (_text(row, "role") or "alumni").lower()
+        if role not in IMPORT_ROLES:
+            raise RowError(f"Role must be one of: {', '.join(sorted(IMPORT_ROLES))}.")
+
+        roll_number = _text(row, "roll_number")
+        if not roll_number:
+            raise RowError(f"Roll number is required for {ROLE_NAMES[role]}.")
+
+        code = _text(row, "college_code")
+        if code:
+            college = get_college_by_code(code)
+            if college is None:
+                raise RowError("Invalid college code.")
+        else:
+            college = self.college or get_college_for_email(email)
+            if college is None:
+                raise RowError("College code is required.")
+        if self.college is not None and college != self.college:
+            raise RowError(f"Row belongs to {college.code}, not {self.college.code}.")
+
+        user = CustomUser(
+            username=_text(row, "username") or email,
+            email=email,
+            first_name=_text(row, "first_name"),
+            last_name=_text(row, "last_name"),
+            phone=_text(row, "phone") or None,
+            linkedin_url=_text(row, "linkedin_url") or None,
+            role=role,
+            college=college,
+            roll_number=roll_number,
+            verified=email_matches_college(email, college),
+            is_approved=self.approve,
+            is_active=self.approve,
+        )
+        # One over-long value would fail the whole batch's INSERT
+        for field in CHECKED_LENGTHS:
+            value = getattr(user, field)
+            if value and len(value) > CustomUser._meta.get_field(field).max_length:
+                raise RowError(f"{field} is longer than {CustomUser._meta.get_field(field).max_length} characters.")
+        return user, _text(row, "password") or None
+
+    def _reject(self, result, row_number, row, error):
+        result.rejected += 1
+        if self.reject_writer is not None:
+            data = row.text if isinstance(row, UnreadableRow) else row
+            self.reject_writer.write(json.dumps({"row": row_number, "error": error, "data": data}) + "\n")
+
+    def _prepare_chunk(self, chunk, start, result, seen):
+        users, passwords = [], []
+        for offset, row in enumerate(chunk):
+            try:
+                user, password = self._build_user(row)
+                if user.email in seen or user.username in seen:
+                    raise RowError("Duplicate email or username in file.")
+                if _roll_key(user) in seen:
+                    raise RowError("Duplicate roll number in file.")
+            except RowError as e:
+                self._reject(result, start + offset, row, str(e))
+                continue
+            seen.update((user.email, user.username, _roll_key(user)))
+            users.append((start + offset, row, user))
+            passwords.append(password)
+
+        # Three queries per chunk find rows that already exist
+        emails = [u.email for _, _, u in users]
+        usernames = [u.username for _, _, u in users]
+        taken = set(CustomUser.objects.filter(email__in=emails).values_list("email", flat=True))
+        taken |= set(CustomUser.objects.filter(username__in=usernames).values_list("username", flat=True))
+        # Roll numbers are unique per college, ignoring case (users_unique_college_roll_number)
+        rolls = [_roll_key(u) for _, _, u in users]
+        taken |= set(CustomUser.objects.annotate(roll=Lower("roll_number")).filter(
+            roll_number__gt="", college__in={college for college, _ in rolls}, roll__in={roll for _, roll in rolls},
+        ).values_list("college_id", "roll"))
+        kept, kept_passwords = [], []
+        for (row_number, row, user), password in zip(users, passwords):
+            if user.email in taken or user.username in taken:
+                self._reject(result, row_number, row, "A user with that email or username already exists.")
+            elif _roll_key(user) in taken:
+                self._reject(result, row_number, row, "A user with that roll number already exists in the college.")
+            else:
+                kept.append(user)
+                kept_passwords.append(password)
+        return kept, kept_passwords
+
+    def _hash(self, pool, passwords):
+        indexes = [i for i, password in enumerate(passwords) if password]
+        hashed = [make_password(None) for _ in passwords]
+        if not indexes:
+            return hashed
+        plain = [passwords[i] for i in indexes]
+        if pool is None:
+            results = _hash_passwords(plain)
+        else:
+            size = max(1, len(plain) // (self.workers * 4))
+            results = [h for part in pool.map(_hash_passwords, chunked(plain, size)) for h in part]
+        for i, password_hash in zip(indexes, results):
+            hashed[i] = password_hash
+        return hashed
+
+    def run(self, rows, progress=None):
+        result = ImportResult()
+        rows_done = self._read_checkpoint()
+        result.skipped = rows_done
+        rows = islice(rows, rows_done, None)
+        seen = set()
+        pool = ProcessPoolExecutor(self.workers, initializer=_init_worker) if self.workers > 1 else None
+        started = time.perf_counter()
+        try:
+            for chunk in chunked(rows, self.batch_size):
+                users, passwords = self._prepare_chunk(chunk, rows_done + 1, result, seen)
+                for user, password_hash in zip(users, self._hash(pool, passwords)):
+                    user.password = password_hash
+                with transaction.atomic():
+                    CustomUser.objects.bulk_create(users, batch_size=self.batch_size)
+                rows_done += len(chunk)
+                result.created += len(users)
+                self._write_checkpoint(rows_done)
+                result.seconds = time.perf_counter() - started
+                if progress:
+                    progress(rows_done, result)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+            if self.reject_writer is not None:
+                self.reject_writer.flush()
+        result.seconds = time.perf_counter() - started
+        if self.checkpoint_path and os.path.exists(self.checkpoint_path):
+            os.remove(self.checkpoint_path)
+        return result
+
+
+def import_uploaded_file(uploaded, college, approve=True, batch_size=1000):
+    """Import an admin upload; returns (ImportResult, reject lines)."""
+    rejects = io.StringIO()
+    stream = io.TextIOWrapper(uploaded.file, encoding="utf-8-sig", newline="")
+    importer = AlumniImporter(college=college, batch_size=batch_size, approve=approve, reject_writer=rejects)
+    result = importer.run(read_rows(stream, detect_format(uploaded.name)))
+    return result, rejects.getvalue().splitlines()
@@ -0,0 +1,207 @@
+"""
+LinkedIn API client used by LinkedInAuthView.
+
+The profile and email lookups run concurrently over a shared keep-alive
+session and must both finish within one deadline. A circuit breaker stops
+calling LinkedIn for a while after repeated failures, so a degraded
+LinkedIn fails fast instead of tying up workers. Async views use
+`afetch_profile_and_email`, which does the same over httpx.
+"""
+
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import httpx
+import requests as http_requests
+from django.conf import settings
+
+from .http import build_session, get_async_client
+from .metrics import timed
+
+LINKEDIN_API_URL = "https://api.linkedin.com"
+PROFILE_PATH = "/v2/me"
+EMAIL_PATH = "/v2/emailAddress?q=members&projection=(elements*(handle~))"
+
+
+class LinkedInError(Exception):
+    pass
+
+
+class LinkedInUnavailable(LinkedInError):
+    """LinkedIn timed out, errored or the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Opens after `failure_threshold` consecutive failures and rejects calls
+    for `reset_timeout` seconds. After that a single trial call is let
+    through; its outcome closes the breaker or opens it again. A trial that
+    ends without an outcome (the client went away) is released, and the
+    next call gets a new one.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_running = False
+        self._lock = threading.Lock()
+
+    @property
+    def is_open(self):
+        return self.opened_at is not None
+
+    def allow(self):
+        with self._lock:
+            if self.opened_at is None:
+                return True
+            if time.monotonic() - self.opened_at < self.reset_timeout or self._trial_running:
+                return False
+            self._trial_running = True
+            return True
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_running = False
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            self._trial_running = False
+            if self.opened_at is not None or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+    def release(self):
+        with self._lock:
+            self._trial_running = False
+
+
+class LinkedInClient:
+    def __init__(self, base_url=LINKEDIN_API_URL, timeout=5.0, session=None,
+                 breaker=None, max_workers=16):
+        self.base_url = base_url.rstrip("/")
+        self.timeout = timeout
+        self.session = session or build_session(pool_size=max_workers)
+        self.breaker = breaker or CircuitBreaker()
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="linkedin")
+
+    def _get(self, path, headers, deadline):
+        # Socket timeouts end at the deadline, so a call given up on doesn't
+        # keep its pool thread and connection for another full timeout
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise http_requests.Timeout(f"LinkedIn did not respond within {self.timeout}s.")
+        return self.session.get(self.base_url + path, headers=headers, timeout=remaining)
+
+    def fetch_profile_and_email(self, access_token):
+        """
+        Fetch /v2/me and /v2/emailAddress concurrently.
+
+        Returns the two `requests` responses. Raises LinkedInUnavailable if
+        the breaker is open, the deadline passes or LinkedIn answers 5xx.
+        """
+        if not self.breaker.allow():
+            raise LinkedInUnavailable("LinkedIn is temporarily unavailable.")
+        # Only LinkedIn's errors and timeouts count as failures. Anything else
+        # still ends a half-open trial, which would otherwise keep the breaker
+        # shut for good
+        try:
+            responses = self._fetch(access_token)
+        except LinkedInUnavailable:
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            self.breaker.release()
+            raise
+        self.breaker.record_success()
+        return responses
+
+    def _fetch(self, access_token):
+        headers = {"Authorization": f"Bearer {access_token}"}
+        deadline = time.monotonic() + self.timeout
+        futures = [
+            self.executor.submit(self._get, PROFILE_PATH, headers, deadline),
+            self.executor.submit(self._get, EMAIL_PATH, headers, deadline),
+        ]
+        with timed("http"):
+            done, pending = wait(futures, timeout=self.timeout)
+        if pending:
+            for future in pending:
+                future.cancel()
+            raise LinkedInUnavailable(f"LinkedIn did not respond within {self.timeout}s.")
+
+        try:
+            p_resp, e_resp = (future.result() for future in futures)
+        except http_requests.RequestException as e:
+            raise LinkedInUnavailable(str(e)) from e
+        return self._check(p_resp, e_resp)
+
+    async def afetch_profile_and_email(self, access_token):
+        """Async `fetch_profile_and_email`; returns two httpx responses."""
+        if not self.breaker.allow():
+            raise LinkedInUnavailable("LinkedIn is temporarily unavailable.")
+        # As above. A client disconnect (CancelledError) says nothing about LinkedIn
+        try:
+            responses = await self._afetch(access_token)
+        except LinkedInUnavailable:
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            self.breaker.release()
+            raise
+        self.breaker.record_success()
+        return responses
+
+    async def _afetch(self, access_token):
+        client = get_async_client()
+        headers = {"Authorization": f"Bearer {access_token}"}
+        try:
+            with timed("http"):
+                p_resp, e_resp = await asyncio.wait_for(
+                    asyncio.gather(
+                        client.get(self.base_url + PROFILE_PATH, headers=headers, timeout=self.timeout),
+                        client.get(self.base_url + EMAIL_PATH, headers=headers, timeout=self.timeout),
+                    ),
+                    timeout=self.timeout,
+                )
+        except asyncio.TimeoutError:
+            raise LinkedInUnavailable(f"LinkedIn did not respond within {self.timeout}s.")
+        except httpx.HTTPError as e:
+            raise LinkedInUnavailable(str(e)) from e
+        return self._check(p_resp, e_resp)
+
+    def _check(self, p_resp, e_resp):
+        if p_resp.status_code >= 500 or e_resp.status_code >= 500:
+            raise LinkedInUnavailable(f"LinkedIn returned {max(p_resp.status_code, e_resp.status_code)}.")
+        return p_resp, e_resp
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_linkedin_client():
+    """The per-process client, created on first use."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = LinkedInClient(
+                    base_url=getattr(settings, "LINKEDIN_API_URL", LINKEDIN_API_URL),
+                    timeout=getattr(settings, "LINKEDIN_TIMEOUT", 5.0),
+                )
+    return _client
+
+
+def reset_linkedin_client():
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.executor.shutdown(wait=False)
+            _client.session.close()
+        _client = None
@@ -0,0 +1,314 @@
+"""
+Helpers for the load-testing management commands: start the project under
+gunicorn in a subprocess, fire concurrent requests at it with httpx,
+summarise latencies, and stand in locally for Google and LinkedIn.
+`generate_dataset` fills the database with synthetic colleges and users.
+"""
+
+import asyncio
+import contextlib
+import datetime
+import json
+import os
+import random
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+from cryptography import x509
+from cryptography.hazmat.primitives import hashes, serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from cryptography.x509.oid import NameOID
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from google.auth import crypt, jwt
+
+from .models import College, CustomUser
+
+WSGI = ["AlumGlobe.wsgi:application", "--worker-class", "sync"]
+ASGI = ["AlumGlobe.asgi:application", "--worker-class", "uvicorn_worker.UvicornWorker"]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_ready(port, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"http://127.0.0.1:{port}/admin/login/", timeout=1)
+            return
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Server on port {port} did not start within {timeout}s")
+
+
+@contextlib.contextmanager
+def run_server(app_args, env=None, workers=1):
+    """
+    Run one gunicorn server for the project and yield its base URL. `env`
+    overrides environment variables, and therefore settings, for the server.
+    """
+    port = free_port()
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", *app_args, "--workers", str(workers), "--timeout", "300",
+         "--bind", f"127.0.0.1:{port}", "--chdir", str(settings.BASE_DIR)],
+        env=dict(os.environ, RATE_LIMITS_ENABLED="False", **(env or {})),
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_until_ready(port)
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        process.terminate()
+        process.wait()
+
+
+class Stats:
+    def __init__(self, latencies, elapsed, errors):
+        latencies = sorted(latencies)
+        self.requests = len(latencies)
+        self.rate = len(latencies) / elapsed
+        self.p50 = statistics.median(latencies)
+        self.p95 = percentile(latencies, 0.95)
+        self.p99 = percentile(latencies, 0.99)
+        self.errors = errors
+        self.queries = None   # per request, when read from the server's /metrics
+
+    def as_dict(self):
+        return {
+            "requests": self.requests, "rate": round(self.rate, 1), "p50_ms": round(self.p50, 2),
+            "p95_ms": round(self.p95, 2), "p99_ms": round(self.p99, 2), "errors": self.errors,
+            "queries_per_request": None if self.queries is None else round(self.queries, 2),
+        }
+
+
+def percentile(ordered, fraction):
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+async def load(url, concurrency, total, method="POST", body=None, headers=None):
+    """
+    Send `total` requests from `concurrency` clients; latencies are in ms.
+    `body` may be a callable taking the request's index, for unique payloads.
+    """
+    latencies, errors, sent = [], 0, 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(timeout=300, limits=limits) as client:
+        async def worker():
+            nonlocal errors, sent
+            while sent < total:
+                index, sent = sent, sent + 1
+                payload = body(index) if callable(body) else body
+                started = time.perf_counter()
+                response = await client.request(method, url, json=payload, headers=headers)
+                latencies.append((time.perf_counter() - started) * 1000)
+                errors += response.status_code >= 400
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    return Stats(latencies, elapsed, errors)
+
+
+def run_load(*args, **kwargs):
+    return asyncio.run(load(*args, **kwargs))
+
+
+def json_stand_in(bodies, latency=0, headers=None):
+    """
+    A local HTTP server answering GETs with `bodies[path]` as JSON after
+    `latency` seconds. A callable body is called with the request headers.
+    Call `.shutdown()` when done.
+    """
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def do_GET(self):
+            time.sleep(latency)
+            body = bodies[self.path.split("?")[0]]
+            payload = json.dumps(body(self.headers) if callable(body) else body).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+class GoogleSigner:
+    """A throwaway RSA key and certificate that signs Google-shaped ID tokens."""
+
+    key_id = "test-key"
+
+    def __init__(self):
+        key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        name = x509.Name([x509.NameAttribute(NameOID.COMMON_NAME, "test")])
+        now = datetime.datetime.now(datetime.timezone.utc)
+        cert = (
+            x509.CertificateBuilder()
+            .subject_name(name).issuer_name(name)
+            .public_key(key.public_key())
+            .serial_number(x509.random_serial_number())
+            .not_valid_before(now - datetime.timedelta(days=1))
+            .not_valid_after(now + datetime.timedelta(days=1))
+            .sign(key, hashes.SHA256())
+        )
+        pem_key = key.private_bytes(
+            serialization.Encoding.PEM,
+            serialization.PrivateFormat.TraditionalOpenSSL,
+            serialization.NoEncryption(),
+        )
+        self.signer = crypt.RSASigner.from_string(pem_key, self.key_id)
+        self.certs = {self.key_id: cert.public_bytes(serialization.Encoding.PEM).decode()}
+
+    def token(self, audience, sub="1234567890", email="student@example.com", **claims):
+        now = int(time.time())
+        payload = {
+            "iss": "https://accounts.google.com", "aud": audience, "sub": sub,
+            "email": email, "iat": now, "exp": now + 3600,
+        }
+        payload.update(claims)
+        return jwt.encode(self.signer, payload).decode()
+
+
+def google_stand_in(signer, latency=0):
+    """Serves `signer`'s certificates at /oauth2/v1/certs, cacheable for an hour."""
+    return json_stand_in(
+        {"/oauth2/v1/certs": signer.certs}, latency, headers={"Cache-Control": "public, max-age=3600"},
+    )
+
+
+def linkedin_stand_in(people, latency=0):
+    """
+    Answers /v2/me and /v2/emailAddress for the bearer token, which is the
+    LinkedIn id of one of `people` ({linkedin_id: email}).
+    """
+    def member(headers):
+        return headers.get("Authorization", "").removeprefix("Bearer ")
+
+    return json_stand_in({
+        "/v2/me": lambda headers: {
+            "id": member(headers), "localizedFirstName": "Bench", "localizedLastName": member(headers),
+        },
+        "/v2/emailAddress": lambda headers: {
+            "elements": [{"handle~": {"emailAddress": people.get(member(headers))}}],
+        },
+    }, latency)
+
+
+def scrape_queries(base_url, token):
+    """{view: (total queries, requests)} from the server's /metrics."""
+    text = httpx.get(base_url + "/metrics", headers={"Authorization": f"Bearer {token}"}).text
+    totals = {}
+    for kind, view, value in re.findall(r'^alumglobe_db_queries_(sum|count)\{view="([^"]*)"\} (\S+)$', text, re.M):
+        queries, requests = totals.get(view, (0, 0))
+        totals[view] = (queries + float(value), requests) if kind == "sum" else (queries, requests + float(value))
+    return totals
+
+
+# ---------------- Synthetic data ----------------
+BENCH_DOMAIN = "bench.invalid"
+
+
+class Dataset:
+    def __init__(self, colleges, logins, google, linkedin):
+        self.colleges = colleges   # {code: email domain}
+        self.logins = logins       # emails of approved users with the bench password
+        self.google = google       # {google_sub: email}
+        self.linkedin = linkedin   # {linkedin_id: email}
+
+
+def generate_dataset(colleges, users, password, seed=0, batch_size=1000):
+    """
+    Create `colleges` colleges and `users` users under *.bench.invalid.
+
+    Per college there is one admin; the rest are 65% students and 35%
+    alumni, of whom 70% (students) and 85% (alumni) are approved. One user
+    in ten has a Google account and one in ten LinkedIn. Every user gets
+    the same password hash, computed once.
+    """
+    rng = random.Random(seed)
+    delete_dataset()
+    created = College.objects.bulk_create(
+        College(name=f"Bench College {n}", code=f"9{n:05d}", domain=f"c{n}.{BENCH_DOMAIN}")
+        for n in range(colleges)
+    )
+    password_hash = make_password(password)
+
+    rows, logins, google, linkedin = [], [], {}, {}
+    for n in range(users):
+        college = created[n % colleges]
+        email = f"user{n}@{college.domain}"
+        if n < colleges:
+            role, approved = "admin", True
+        else:
+            role = "student" if rng.random() < 0.65 else "alumni"
+            approved = rng.random() < (0.70 if role == "student" else 0.85)
+        user = CustomUser(
+            username=f"bench{n}", email=email, role=role, college=college, password=password_hash,
+            roll_number=None if role == "admin" else f"R{n}", is_approved=approved, is_active=approved,
+            verified=approved,
+        )
+        if rng.random() < 0.1:
+            user.google_sub = f"bench-g{n}"
+            google[user.google_sub] = email
+        if rng.random() < 0.1:
+            user.linkedin_id = f"bench-li{n}"
+            linkedin[user.linkedin_id] = email
+        if approved:
+            logins.append(email)
+        rows.append(user)
+        if len(rows) >= batch_size:
+            CustomUser.objects.bulk_create(rows)
+            rows = []
+    CustomUser.objects.bulk_create(rows)
+    return Dataset({college.code: college.domain for college in created}, logins, google, linkedin)
+
+
+def delete_dataset():
+    CustomUser.objects.filter(email__endswith=f".{BENCH_DOMAIN}").delete()
+    College.objects.filter(domain__endswith=f".{BENCH_DOMAIN}").delete()
+
+
+# ---------------- Baselines ----------------
+def compare(results, baseline, tolerance=0.2):
+    """
+    Regressions in `results` against `baseline` (both as written by
+    bench_auth): throughput or p95 worse by more than `tolerance`, or more
+    queries per request.
+    """
+    regressions = []
+    for name, current in results["profiles"].items():
+        before = baseline.get("profiles", {}).get(name)
+        if before is None:
+            continue
+        if current["rate"] < before["rate"] * (1 - tolerance):
+            regressions.append(f"{name}: {current['rate']} req/s, baseline {before['rate']}")
+        if current["p95_ms"] > before["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {current['p95_ms']} ms, baseline {before['p95_ms']}")
+        if (current["queries_per_request"] or 0) > (before["queries_per_request"] or 0) + 0.5:
+            regressions.append(
+                f"{name}: {current['queries_per_request']} queries/request, baseline {before['queries_per_request']}"
+            )
+    return regressions
@@ -0,0 +1,114 @@
+import json
+import logging
+import time
+from contextlib import ExitStack
+from unittest import mock
+
+from django.conf import settings
+from django.core.handlers.wsgi import WSGIHandler
+from django.core.management.base import BaseCommand
+from django.test import RequestFactory, override_settings
+from django.test.client import FakePayload
+from rest_framework import serializers
+from rest_framework.parsers import FormParser, JSONParser, MultiPartParser
+from rest_framework.renderers import BrowsableAPIRenderer, JSONRenderer
+from rest_framework.views import APIView
+
+from users.ratelimit import reset_rate_limiter
+from users.serializers import LoginCredentialsSerializer, PrecompiledSerializer
+
+# Requests that reach the view and answer without queries, password
+# hashing or provider calls: what's left is the per-request overhead.
+REQUESTS = {
+    "login, invalid body": ("/api/auth/login/", {"email": "not-an-email", "password": "x"}),
+    "logout, bad token": ("/api/auth/logout/", {"refresh": "not-a-token"}),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures per-request overhead on the token endpoints through the full WSGI "
+        "handler, before (every middleware, stdlib JSON, deep-copied serializer "
+        "fields) and after (BrowserMiddleware skipped, orjson, precompiled fields)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=5000, help="Per endpoint and configuration.")
+
+    def handle(self, *args, **options):
+        n = options["requests"]
+        results = {}
+        for config in ("before", "after"):
+            with self.configure(config):
+                reset_rate_limiter()
+                handler = WSGIHandler()   # loads MIDDLEWARE as configured
+                for name, (path, body) in REQUESTS.items():
+                    results[name, config] = self.time_requests(handler, path, body, n)
+            reset_rate_limiter()
+
+        self.stdout.write(f"{'request':<24}{'before µs':>12}{'after µs':>12}{'saved':>8}")
+        for name in REQUESTS:
+            before, after = results[name, "before"], results[name, "after"]
+            self.stdout.write(f"{name:<24}{before:>12.1f}{after:>12.1f}{1 - after / before:>8.0%}")
+
+        payload = {
+            "user": {"id": 1, "username": "ada", "email": "ada@example.com", "role": "alumni",
+                     "college": "101", "roll_number": "CS-001"},
+            "tokens": {"refresh": "r" * 280, "access": "a" * 280},
+        }
+        renderer = APIView.renderer_classes[0]()
+        self.stdout.write("\nParts of a login, µs per call:")
+        self.stdout.write(f"  render payload, JSONRenderer        {self.time_call(JSONRenderer().render, payload):8.2f}")
+        self.stdout.write(f"  render payload, {type(renderer).__name__:<20}{self.time_call(renderer.render, payload):8.2f}")
+        credentials = {"email": "ada@example.com", "password": "secret-pw"}
+        stock = self.deep_copied(LoginCredentialsSerializer)
+        deep_copied = self.time_call(lambda: stock(data=credentials).is_valid())
+        precompiled = self.time_call(lambda: LoginCredentialsSerializer(data=credentials).is_valid())
+        self.stdout.write(f"  validate credentials, deep copy     {deep_copied:8.2f}")
+        self.stdout.write(f"  validate credentials, precompiled   {precompiled:8.2f}")
+
+    def configure(self, config):
+        stack = ExitStack()
+        # Every request is a 400; don't time Django logging each one
+        stack.enter_context(mock.patch.object(logging.getLogger("django.request"), "disabled", True))
+        stack.enter_context(override_settings(RATE_LIMITS={"ENABLED": False}, ALLOWED_HOSTS=["testserver"]))
+        if config == "before":
+            # Everything in MIDDLEWARE, in its old place
+            middleware = []
+            for path in settings.MIDDLEWARE:
+                middleware += settings.BROWSER_MIDDLEWARE if path == "users.middleware.BrowserMiddleware" else [path]
+            stack.enter_context(override_settings(MIDDLEWARE=middleware))
+            # APIView reads these at import time, so patch them there
+            stack.enter_context(mock.patch.object(APIView, "renderer_classes", [JSONRenderer, BrowsableAPIRenderer]))
+            stack.enter_context(
+                mock.patch.object(APIView, "parser_classes", [JSONParser, FormParser, MultiPartParser]),
+            )
+            stack.enter_context(
+                mock.patch.object(PrecompiledSerializer, "fields", serializers.Serializer.__dict__["fields"]),
+            )
+        return stack
+
+    def deep_copied(self, serializer_class):
+        """`serializer_class` with DRF's own per-instance fields."""
+        return type(serializer_class.__name__, (serializer_class,), {"fields": serializers.Serializer.__dict__["fields"]})
+
+    def time_requests(self, handler, path, body, n):
+        environ = RequestFactory().post(path, body, content_type="application/json").environ
+        content = json.dumps(body).encode()
+        for _ in range(min(n, 200)):   # warm up
+            self.request(handler, environ, content)
+        started = time.perf_counter()
+        for _ in range(n):
+            self.request(handler, environ, content)
+        return (time.perf_counter() - started) / n * 1e6
+
+    def request(self, handler, environ, content):
+        response = handler({**environ, "wsgi.input": FakePayload(content)}, lambda status, headers: None)
+        b"".join(response)
+        response.close()
+
+    def time_call(self, fn, *args, n=20000):
+        started = time.perf_counter()
+        for _ in range(n):
+            fn(*args)
+        return (time.perf_counter() - started) / n * 1e6
@@ -0,0 +1,159 @@
+import json
+import os
+import platform
+import random
+import secrets
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from users.loadtest import (
+    ASGI, WSGI, GoogleSigner, compare, delete_dataset, generate_dataset,
+    google_stand_in, linkedin_stand_in, run_load, run_server, scrape_queries,
+)
+
+PASSWORD = "bench-password"
+CLIENT_ID = "bench-client-id"
+# profile -> (path, URL name the server reports queries under)
+PROFILES = {
+    "register": ("/api/auth/register/", "register"),
+    "login": ("/api/auth/login/", "login"),
+    "google": ("/api/auth/social/google/", "google-auth"),
+    "linkedin": ("/api/auth/social/linkedin/", "linkedin-auth"),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds synthetic colleges and users, then runs registration, login and "
+        "social login storms against a local server with Google and LinkedIn "
+        "stand-ins. Writes throughput, p50/p95/p99 and queries per request as "
+        "JSON, and compares them with a baseline."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--colleges", type=int, default=50)
+        parser.add_argument("--users", type=int, default=5000)
+        parser.add_argument("--requests", type=int, default=500, help="Requests per profile.")
+        parser.add_argument("--concurrency", type=int, default=16)
+        parser.add_argument("--profile", action="append", choices=sorted(PROFILES),
+                            help="Run only these profiles (repeatable). Default: all.")
+        parser.add_argument("--server", choices=("asgi", "wsgi"), default="asgi")
+        parser.add_argument("--provider-latency", type=float, default=0.05,
+                            help="Seconds the Google/LinkedIn stand-ins take to answer.")
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument("--output", help="Write the results as JSON to this file.")
+        parser.add_argument("--baseline", help="Compare with results from an earlier run.")
+        parser.add_argument("--tolerance", type=float, default=0.2,
+                            help="Allowed fractional drop in throughput or rise in p95 against the baseline.")
+        parser.add_argument("--keep-data", action="store_true", help="Leave the synthetic users in place.")
+
+    def handle(self, *args, **options):
+        if options["users"] < options["colleges"]:
+            raise CommandError("--users must be at least --colleges (each college gets an admin).")
+        baseline = None
+        if options["baseline"]:
+            with open(options["baseline"]) as f:
+                baseline = json.load(f)
+
+        started = time.perf_counter()
+        data = generate_dataset(options["colleges"], options["users"], PASSWORD, seed=options["seed"])
+        self.stderr.write(f"Seeded {options['colleges']} colleges and {options['users']} users "
+                          f"in {time.perf_counter() - started:.1f}s")
+
+        rng = random.Random(options["seed"])
+        total = options["requests"]
+        signer = GoogleSigner()
+        google_people = list(data.google.items())
+        linkedin_people = list(data.linkedin.items())
+        # Four in five social logins are returning users, the rest sign up;
+        # tokens are signed up front so the client doesn't compete for CPU
+        college_codes = [rng.choice(list(data.colleges)) for _ in range(total)]
+        login_emails = [rng.choice(data.logins) for _ in range(total)]
+        google_tokens = []
+        for n, code in enumerate(college_codes):
+            sub, email = rng.choice(google_people) if google_people and rng.random() < 0.8 else (
+                f"bench-g-new{n}", f"gnew{n}@{data.colleges[code]}")
+            google_tokens.append(signer.token(CLIENT_ID, sub=sub, email=email))
+        people = dict(data.linkedin)
+        linkedin_ids = []
+        for n, code in enumerate(college_codes):
+            if linkedin_people and rng.random() < 0.8:
+                linkedin_ids.append(rng.choice(linkedin_people)[0])
+            else:
+                linkedin_ids.append(f"bench-li-new{n}")
+                people[f"bench-li-new{n}"] = f"linew{n}@{data.colleges[code]}"
+
+        bodies = {
+            "register": lambda i: {
+                "username": f"reg{i}", "email": f"reg{i}@{data.colleges[college_codes[i]]}",
+                "password": PASSWORD, "role": "student", "college_code": college_codes[i], "roll_number": f"REG{i}",
+            },
+            "login": lambda i: {"email": login_emails[i], "password": PASSWORD},
+            "google": lambda i: {"id_token": google_tokens[i], "role": "student", "college_code": college_codes[i]},
+            "linkedin": lambda i: {"access_token": linkedin_ids[i], "role": "alumni", "college_code": college_codes[i]},
+        }
+
+        google = google_stand_in(signer, options["provider_latency"])
+        linkedin = linkedin_stand_in(people, options["provider_latency"])
+        metrics_token = secrets.token_urlsafe()
+        env = {
+            "ASYNC_AUTH_VIEWS": str(options["server"] == "asgi"),
+            "GOOGLE_CLIENT_ID": CLIENT_ID,
+            "GOOGLE_CERTS_URL": f"http://127.0.0.1:{google.server_port}/oauth2/v1/certs",
+            "LINKEDIN_API_URL": f"http://127.0.0.1:{linkedin.server_port}",
+            "METRICS_ENABLED": "True",
+            "METRICS_TOKEN": metrics_token,
+        }
+        results = {
+            "meta": {
+                "server": options["server"], "concurrency": options["concurrency"], "requests": total,
+                "colleges": options["colleges"], "users": options["users"], "seed": options["seed"],
+                "provider_latency": options["provider_latency"], "database": connection.vendor,
+                "cpus": os.cpu_count(), "python": platform.python_version(),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            },
+            "profiles": {},
+        }
+        try:
+            with run_server(ASGI if options["server"] == "asgi" else WSGI, env) as base_url:
+                for name in options["profile"] or PROFILES:
+                    path, view = PROFILES[name]
+                    before = scrape_queries(base_url, metrics_token).get(view, (0, 0))
+                    stats = run_load(base_url + path, options["concurrency"], total, body=bodies[name])
+                    after = scrape_queries(base_url, metrics_token).get(view, (0, 0))
+                    if after[1] > before[1]:
+                        stats.queries = (after[0] - before[0]) / (after[1] - before[1])
+                    results["profiles"][name] = stats.as_dict()
+        finally:
+            google.shutdown()
+            linkedin.shutdown()
+            if not options["keep_data"]:
+                delete_dataset()
+
+        self.report(results, baseline)
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(results, f, indent=2)
+            self.stderr.write(f"Wrote {options['output']}")
+        else:
+            self.stdout.write(json.dumps(results, indent=2))
+
+        if baseline is not None:
+            regressions = compare(results, baseline, options["tolerance"])
+            if regressions:
+                raise CommandError("Regressions against the baseline:\n  " + "\n  ".join(regressions))
+            self.stderr.write(f"No regressions against {options['baseline']} (tolerance {options['tolerance']:.0%})")
+
+    def report(self, results, baseline):
+        self.stderr.write(f"{'profile':<10}{'req/sec':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}"
+                          f"{'queries':>9}{'errors':>8}{'baseline req/sec':>18}")
+        for name, stats in results["profiles"].items():
+            before = (baseline or {}).get("profiles", {}).get(name)
+            queries = "-" if stats["queries_per_request"] is None else f"{stats['queries_per_request']:.1f}"
+            self.stderr.write(
+                f"{name:<10}{stats['rate']:>9.1f}{stats['p50_ms']:>9.1f}{stats['p95_ms']:>9.1f}"
+                f"{stats['p99_ms']:>9.1f}{queries:>9}{stats['errors']:>8}"
+                f"{before['rate'] if before else '-':>18}"
+            )
@@ -0,0 +1,74 @@
+import os
+
+from django.core.management.base import BaseCommand
+
+from users.loadtest import ASGI, WSGI, json_stand_in, run_load, run_server
+from users.models import CustomUser
+
+PASSWORD = "bench-password"
+SERVERS = {
+    # One worker each, as deployed before and after ASYNC_AUTH_VIEWS
+    "sync (WSGI)": (WSGI, "False"),
+    "async (ASGI)": (ASGI, "True"),
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Load-tests logins against one sync gunicorn worker and one ASGI worker "
+        "serving the async auth views, and reports throughput and latency."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=32)
+        parser.add_argument("--requests", type=int, default=200, help="Requests per server and scenario.")
+        parser.add_argument("--linkedin-latency", type=float, default=0.2,
+                            help="Seconds the local LinkedIn stand-in takes to answer.")
+        parser.add_argument("--scenario", choices=("password", "linkedin", "all"), default="all")
+
+    def handle(self, *args, **options):
+        users = [
+            CustomUser(username="bench-login", email="bench-login@bench.invalid", role="admin"),
+            CustomUser(username="bench-li", email="bench-li@bench.invalid", role="admin", linkedin_id="bench-li"),
+        ]
+        for user in users:
+            user.set_password(PASSWORD)
+        CustomUser.objects.filter(email__endswith="@bench.invalid").delete()
+        CustomUser.objects.bulk_create(users)
+        CustomUser.objects.filter(email__endswith="@bench.invalid").update(is_active=True, is_approved=True)
+
+        scenarios = {
+            "password": ("/api/auth/login/", {"email": "bench-login@bench.invalid", "password": PASSWORD}),
+            "linkedin": ("/api/auth/social/linkedin/", {"access_token": "bench", "role": "alumni"}),
+        }
+        if options["scenario"] != "all":
+            scenarios = {options["scenario"]: scenarios[options["scenario"]]}
+
+        linkedin = json_stand_in({
+            "/v2/me": {"id": "bench-li", "localizedFirstName": "Bench", "localizedLastName": "User"},
+            "/v2/emailAddress": {"elements": [{"handle~": {"emailAddress": "bench-li@bench.invalid"}}]},
+        }, latency=options["linkedin_latency"])
+        results = []
+        try:
+            for server_name, (app, async_views) in SERVERS.items():
+                env = {
+                    "ASYNC_AUTH_VIEWS": async_views,
+                    "LINKEDIN_API_URL": f"http://127.0.0.1:{linkedin.server_port}",
+                }
+                with run_server(app, env) as base_url:
+                    for scenario, (path, body) in scenarios.items():
+                        stats = run_load(base_url + path, options["concurrency"], options["requests"], body=body)
+                        results.append((server_name, scenario, stats))
+        finally:
+            linkedin.shutdown()
+            CustomUser.objects.filter(email__endswith="@bench.invalid").delete()
+
+        self.stdout.write(
+            f"{options['concurrency']} concurrent clients, {options['requests']} requests, "
+            f"{os.cpu_count()} CPU(s), LinkedIn latency {options['linkedin_latency'] * 1000:.0f} ms"
+        )
+        self.stdout.write(f"{'server':<14}{'scenario':<10}{'req/sec':>9}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}")
+        for server_name, scenario, stats in results:
+            self.stdout.write(
+                f"{server_name:<14}{scenario:<10}{stats.rate:>9.1f}{stats.p50:>9.0f}{stats.p99:>9.0f}{stats.errors:>8}"
+            )
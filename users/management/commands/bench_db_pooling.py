@@ -0,0 +1,70 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from users.hashers import CalibratedPBKDF2PasswordHasher
+from users.loadtest import ASGI, WSGI, run_load, run_server
+from users.models import College, CustomUser
+from users.serializers import get_tokens_for_user
+
+PASSWORD = "bench-password"
+# Cheap hashes so logins measure connection handling rather than PBKDF2
+HASH_PARAMS = {"iterations": 1000}
+MODES = {
+    "new connection per request": {"DB_POOL": "False", "DB_CONN_MAX_AGE": "0"},
+    "persistent (CONN_MAX_AGE)": {"DB_POOL": "False", "DB_CONN_MAX_AGE": "60"},
+    "pool": {"DB_POOL": "True"},
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Runs the auth endpoints against the configured PostgreSQL database with and "
+        "without connection reuse, and reports p50/p99 latency for each."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--concurrency", type=int, default=8)
+        parser.add_argument("--requests", type=int, default=500, help="Requests per mode and endpoint.")
+        parser.add_argument("--server", choices=("asgi", "wsgi"), default="asgi")
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("bench_db_pooling needs DATABASES['default'] to point at PostgreSQL.")
+
+        college, _ = College.objects.get_or_create(code="999999", defaults={"name": "Bench College", "domain": "bench.invalid"})
+        CustomUser.objects.filter(email__endswith="@bench.invalid").delete()
+        admin = CustomUser(username="bench-admin", email="admin@bench.invalid", role="admin", college=college)
+        admin.password = CalibratedPBKDF2PasswordHasher(HASH_PARAMS).encode(PASSWORD, CalibratedPBKDF2PasswordHasher().salt())
+        admin.save()
+        CustomUser.objects.filter(pk=admin.pk).update(is_active=True, is_approved=True)
+        admin.refresh_from_db()
+        access = get_tokens_for_user(admin)["access"]
+
+        endpoints = {
+            "login": dict(path="/api/auth/login/", body={"email": "admin@bench.invalid", "password": PASSWORD}),
+            "pending approvals": dict(path="/api/approvals/pending/", method="GET",
+                                      headers={"Authorization": f"Bearer {access}"}),
+        }
+        app = ASGI if options["server"] == "asgi" else WSGI
+        env = {"PASSWORD_HASH_PARAMS": json.dumps(HASH_PARAMS), "ASYNC_AUTH_VIEWS": str(options["server"] == "asgi")}
+        results = []
+        try:
+            for mode, mode_env in MODES.items():
+                with run_server(app, {**env, **mode_env}) as base_url:
+                    for name, endpoint in endpoints.items():
+                        endpoint = dict(endpoint)
+                        url = base_url + endpoint.pop("path")
+                        run_load(url, options["concurrency"], options["concurrency"], **endpoint)   # warm up
+                        results.append((mode, name, run_load(url, options["concurrency"], options["requests"], **endpoint)))
+        finally:
+            CustomUser.objects.filter(email__endswith="@bench.invalid").delete()
+            college.delete()
+
+        self.stdout.write(f"{options['server'].upper()}, one worker, {options['concurrency']} concurrent clients")
+        self.stdout.write(f"{'connections':<28}{'endpoint':<19}{'req/sec':>9}{'p50 ms':>9}{'p99 ms':>9}{'errors':>8}")
+        for mode, name, stats in results:
+            self.stdout.write(
+                f"{mode:<28}{name:<19}{stats.rate:>9.1f}{stats.p50:>9.1f}{stats.p99:>9.1f}{stats.errors:>8}"
+            )
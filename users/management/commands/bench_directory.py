@@ -0,0 +1,138 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from users.directory import directory_users, page_query, search
+from users.loadtest import BENCH_DOMAIN, percentile
+from users.models import College
+
+CODE_PREFIX = "dirbench"
+EMAIL_DOMAIN = f"directory.{BENCH_DOMAIN}"
+# 16 two-letter syllables; three of them make a first or last name
+SYLLABLES = "karimotasenaluvedijopahubesogafi"
+
+
+def syllable(n):
+    return f"substr('{SYLLABLES}', ({n}) %% 16 * 2 + 1, 2)"
+
+
+class Command(BaseCommand):
+    help = (
+        "Seeds synthetic users into users_customuser and times the alumni "
+        "directory's queries: type-ahead on names, roll number prefixes, "
+        "LinkedIn filtering and deep pages. One college in ten users is "
+        "oversized, to show the indexes past what a college scan handles. "
+        "Fails when a query's p95 is over --target-ms."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--users", type=int, default=1_000_000)
+        parser.add_argument("--colleges", type=int, default=200)
+        parser.add_argument("--repeat", type=int, default=5, help="Runs per query.")
+        parser.add_argument("--target-ms", type=float, default=20)
+        parser.add_argument("--keep-data", action="store_true", help="Leave the synthetic users in place.")
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        colleges = self.seed(options["users"], options["colleges"])
+        self.stderr.write(f"Seeded {options['users']:,} users in {options['colleges']} colleges "
+                          f"in {time.perf_counter() - started:.1f}s")
+        try:
+            results = {}
+            for label, college in (("large college", colleges[0]), ("typical college", colleges[1])):
+                for kind, samples in self.measure(college, options["repeat"]).items():
+                    results[f"{kind} ({label})"] = samples
+        finally:
+            if not options["keep_data"]:
+                self.delete()
+
+        self.stdout.write(f"{'query':<34}{'runs':>6}{'p50 ms':>9}{'p95 ms':>9}{'max ms':>9}")
+        slow = []
+        for name, samples in results.items():
+            ordered = sorted(samples)
+            p95 = percentile(ordered, 0.95)
+            self.stdout.write(f"{name:<34}{len(ordered):>6}{statistics.median(ordered):>9.2f}"
+                              f"{p95:>9.2f}{ordered[-1]:>9.2f}")
+            if p95 > options["target_ms"]:
+                slow.append(f"{name}: p95 {p95:.1f} ms")
+        if slow:
+            raise CommandError(f"Over the {options['target_ms']:g} ms target:\n  " + "\n  ".join(slow))
+        self.stderr.write(f"Every query's p95 is within {options['target_ms']:g} ms")
+
+    # ---------------- Data ----------------
+    def seed(self, users, colleges):
+        self.delete()
+        College.objects.bulk_create(
+            College(name=f"Directory Bench College {n}", code=f"{CODE_PREFIX}{n}", domain=f"d{n}.{BENCH_DOMAIN}")
+            for n in range(colleges)
+        )
+        # Roughly: 40% alumni, six in seven approved, a quarter listing
+        # LinkedIn; every tenth user is in college 0.
+        first = " || ".join(syllable(f"n / {16 ** i}") for i in range(3))
+        last = " || ".join(syllable(f"(n * 13 + n / 7) / {16 ** i}") for i in range(3))
+        chunk = 100_000
+        with transaction.atomic(), connection.cursor() as cursor:
+            for start in range(0, users, chunk):
+                cursor.execute(
+                    f"""
+                    WITH RECURSIVE seq(n) AS (SELECT %s UNION ALL SELECT n + 1 FROM seq WHERE n < %s)
+                    INSERT INTO users_customuser (
+                        password, last_login, is_superuser, username, first_name, last_name, is_staff,
+                        is_active, date_joined, email, phone, role, college_id, roll_number, linkedin_url,
+                        google_sub, linkedin_id, verified, is_approved, auth_version
+                    )
+                    SELECT '!', NULL, FALSE, '{CODE_PREFIX}' || n, {first}, {last}, FALSE,
+                           n %% 7 <> 0, CURRENT_TIMESTAMP, '{CODE_PREFIX}' || n || '@{EMAIL_DOMAIN}', NULL,
+                           CASE WHEN n %% 5 < 2 THEN 'alumni' ELSE 'student' END, c.id, 'R' || n,
+                           CASE WHEN n %% 4 = 0 THEN 'https://www.linkedin.com/in/{CODE_PREFIX}' || n END,
+                           NULL, NULL, n %% 7 <> 0, n %% 7 <> 0, 0
+                    FROM seq JOIN users_college c
+                      ON c.code = '{CODE_PREFIX}' || CASE WHEN n %% 10 = 0 THEN 0 ELSE n %% %s END
+                    """,
+                    [start, min(start + chunk, users) - 1, colleges],
+                )
+        # VACUUM too, as autovacuum would have by now: index-only scans need the visibility map
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE" if connection.vendor == "sqlite" else "VACUUM ANALYZE users_customuser")
+        return list(College.objects.filter(code__in=[f"{CODE_PREFIX}0", f"{CODE_PREFIX}1"]).order_by("code"))
+
+    def delete(self):
+        with connection.cursor() as cursor:
+            cursor.execute("DELETE FROM users_customuser WHERE email LIKE %s", [f"%@{EMAIL_DOMAIN}"])
+        College.objects.filter(code__startswith=CODE_PREFIX).delete()
+
+    # ---------------- Queries ----------------
+    def measure(self, college, repeat):
+        members = directory_users(college.pk)
+        names = members.order_by("id").values_list("first_name", "last_name", "roll_number")[:5000:250]
+        rows = members.count()
+        deep = list(members.order_by("directory_name", "id").values_list("directory_name", "id")[rows // 2:rows // 2 + 1])
+
+        queries = {"type-ahead": [], "two words": [], "roll prefix": [], "linkedin": [], "browse": []}
+        for first, last, roll in names:
+            # Each keystroke of the first name, as a search box would send
+            for length in range(1, len(first) + 1):
+                queries["type-ahead"].append((search(members, q=first[:length]), None, 10))
+            queries["two words"].append((search(members, q=f"{first} {last[:2]}"), None, 10))
+            queries["roll prefix"].append((search(members, roll=roll[:4]), None, 10))
+        queries["linkedin"].append((search(members, linkedin=True), None, 20))
+        queries["browse"].append((members, None, 20))
+        if deep:
+            queries["browse"].append((members, deep[0], 20))
+
+        self.stderr.write(self.style.MIGRATE_HEADING(f"{college.name}: {rows:,} listed alumni"))
+        samples = {}
+        for kind, runs in queries.items():
+            queryset, cursor, limit = runs[-1]
+            self.stderr.write(f"  {kind} plan:")
+            for line in page_query(queryset, cursor, limit).explain().splitlines():
+                self.stderr.write(f"      {line}")
+            timings = samples[kind] = []
+            for _ in range(repeat):
+                for queryset, cursor, limit in runs:
+                    started = time.perf_counter()
+                    list(page_query(queryset, cursor, limit))
+                    timings.append((time.perf_counter() - started) * 1000)
+        return samples
@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from users.hashers import HASHERS, calibrate, hasher_memory, measure
+
+
+class Command(BaseCommand):
+    help = (
+        "Prints logins/sec per core for the configured password hasher, Django's "
+        "defaults and hashers calibrated to --target-ms."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--target-ms", type=float, default=100)
+        parser.add_argument("--max-memory-mb", type=int, default=64)
+        parser.add_argument("--rounds", type=int, default=5)
+
+    def handle(self, *args, **options):
+        configured = settings.PASSWORD_HASHING["ALGORITHM"]
+        configurations = [("configured", configured, HASHERS[configured]().current_params())]
+        for algorithm, hasher_class in HASHERS.items():
+            configurations.append(("django default", algorithm, hasher_class({}).current_params()))
+        for algorithm in HASHERS:
+            try:
+                params = calibrate(algorithm, options["target_ms"] / 1000, options["max_memory_mb"] * 1024 * 1024)
+            except ValueError as e:
+                self.stderr.write(f"Skipping calibrated {algorithm}: {e}")
+                continue
+            configurations.append((f"calibrated {options['target_ms']:.0f}ms", algorithm, params))
+
+        self.stdout.write(
+            f"{'configuration':<18}{'algorithm':<15}{'ms/hash':>9}{'logins/s/core':>15}{'MiB':>6}  params"
+        )
+        for label, algorithm, params in configurations:
+            try:
+                elapsed = measure(HASHERS[algorithm](params), rounds=options["rounds"])
+            except ValueError as e:
+                self.stderr.write(f"Skipping {label} {algorithm}: {e}")
+                continue
+            self.stdout.write(
+                f"{label:<18}{algorithm:<15}{elapsed * 1000:>9.1f}{1 / elapsed:>15.1f}"
+                f"{hasher_memory(algorithm, params) / 2 ** 20:>6.0f}  {params}"
+            )
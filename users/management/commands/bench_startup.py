@@ -0,0 +1,174 @@
+import json
+import os
+import statistics
+import subprocess
+import sys
+from collections import Counter
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+# Modules a worker should only load when a social login first needs them
+PROVIDER_MODULES = ("google.", "httpx", "users.google_auth", "users.linkedin")
+
+# Runs in a fresh interpreter, as a gunicorn worker would start. Imports the
+# app, then times one request that needs no database (a login with an
+# invalid body). With "fork", the process imports the app as the
+# --preload master does, then times a forked worker's first request.
+WORKER = r"""
+import asyncio, json, os, sys, time
+
+started = time.perf_counter()
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "AlumGlobe.settings")
+SERVER, FORK = sys.argv[1], sys.argv[2] == "fork"
+if SERVER == "asgi":
+    from AlumGlobe.asgi import application
+else:
+    from AlumGlobe.wsgi import application
+imported = time.perf_counter()
+
+BODY = b'{"email": "not-an-email"}'
+
+def wsgi_request():
+    from io import BytesIO
+    environ = {
+        "REQUEST_METHOD": "POST", "PATH_INFO": "/api/auth/login/", "SERVER_NAME": "localhost",
+        "SERVER_PORT": "80", "HTTP_HOST": "localhost", "CONTENT_TYPE": "application/json",
+        "CONTENT_LENGTH": str(len(BODY)), "wsgi.input": BytesIO(BODY), "wsgi.url_scheme": "http",
+    }
+    status = []
+    response = application(environ, lambda s, headers: status.append(int(s.split()[0])))
+    b"".join(response)
+    response.close()
+    return status[0]
+
+async def asgi_request():
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "POST",
+        "scheme": "http", "path": "/api/auth/login/", "raw_path": b"/api/auth/login/", "query_string": b"",
+        "root_path": "", "client": ("127.0.0.1", 1), "server": ("localhost", 80),
+        "headers": [(b"host", b"localhost"), (b"content-type", b"application/json"),
+                    (b"content-length", str(len(BODY)).encode())],
+    }
+    messages = [{"type": "http.request", "body": BODY, "more_body": False}]
+    status = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.Event().wait()   # the client stays connected
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            status.append(message["status"])
+
+    await application(scope, receive, send)
+    return status[0]
+
+def first_request():
+    begun = time.perf_counter()
+    status = asyncio.run(asgi_request()) if SERVER == "asgi" else wsgi_request()
+    return status, (time.perf_counter() - begun) * 1000
+
+result = {"import_ms": (imported - started) * 1000}
+if FORK:
+    read, write = os.pipe()
+    if os.fork() == 0:
+        os.close(read)
+        status, ms = first_request()
+        os.write(write, json.dumps({"status": status, "first_request_ms": ms}).encode())
+        os._exit(0)
+    os.close(write)
+    result.update(json.loads(os.read(read, 4096)))
+    os.wait()
+else:
+    status, result["first_request_ms"] = first_request()
+    result["status"] = status
+print(json.dumps(result))
+"""
+
+
+class Command(BaseCommand):
+    help = (
+        "Measures worker startup: time to import the app and serve a first request in "
+        "a fresh interpreter (python -X importtime), and a first request in a worker "
+        "forked from a preloaded master (gunicorn --preload). Lists the slowest "
+        "imports and any provider module loaded before it is needed."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--server", choices=("asgi", "wsgi"), default="asgi")
+        parser.add_argument("--runs", type=int, default=5)
+        parser.add_argument("--top", type=int, default=12, help="Packages to list by import time.")
+        parser.add_argument("--output", help="Write the results as JSON to this file.")
+        parser.add_argument("--baseline", help="Compare with results from an earlier run.")
+        parser.add_argument("--tolerance", type=float, default=0.2,
+                            help="Fractional slowdown against --baseline reported as a regression.")
+
+    def handle(self, *args, **options):
+        cold, forked, imports = [], [], None
+        for _ in range(options["runs"]):
+            result, imports = self.run_worker(options["server"], fork=False)
+            cold.append(result)
+            forked.append(self.run_worker(options["server"], fork=True)[0])
+
+        results = {
+            "server": options["server"],
+            "import_ms": round(statistics.median(r["import_ms"] for r in cold), 1),
+            "first_request_ms": round(statistics.median(r["first_request_ms"] for r in cold), 1),
+            "preloaded_first_request_ms": round(statistics.median(r["first_request_ms"] for r in forked), 1),
+        }
+        results["cold_worker_ms"] = round(results["import_ms"] + results["first_request_ms"], 1)
+
+        self.stdout.write(f"Median of {options['runs']} runs ({options['server']}):")
+        self.stdout.write(f"  import the app                 {results['import_ms']:8.1f} ms")
+        self.stdout.write(f"  first request                  {results['first_request_ms']:8.1f} ms")
+        self.stdout.write(f"  time to first request, cold    {results['cold_worker_ms']:8.1f} ms")
+        self.stdout.write(f"  time to first request, forked  {results['preloaded_first_request_ms']:8.1f} ms"
+                          "  (gunicorn --preload)")
+
+        self.stdout.write("\nSlowest packages to import (self time, ms, last run):")
+        for package, us in imports.most_common(options["top"]):
+            self.stdout.write(f"  {package:<30}{us / 1000:8.1f}")
+        eager = sorted(name for name in imports if name.startswith(PROVIDER_MODULES))
+        if eager:
+            self.stdout.write(self.style.WARNING(f"Provider modules loaded at startup: {', '.join(eager)}"))
+
+        if options["output"]:
+            with open(options["output"], "w") as f:
+                json.dump(results, f, indent=2)
+        if options["baseline"]:
+            with open(options["baseline"]) as f:
+                baseline = json.load(f)
+            regressions = [
+                f"{key}: {results[key]} ms, baseline {baseline[key]} ms"
+                for key in ("cold_worker_ms", "preloaded_first_request_ms")
+                if key in baseline and results[key] > baseline[key] * (1 + options["tolerance"])
+            ]
+            if regressions:
+                raise CommandError("Startup regressions:\n  " + "\n  ".join(regressions))
+            self.stdout.write(self.style.SUCCESS("No startup regressions against the baseline."))
+
+    def run_worker(self, server, fork):
+        """The worker's timings, and import self time (µs) by top-level package from -X importtime."""
+        env = {**os.environ, "DJANGO_SETTINGS_MODULE": os.environ.get("DJANGO_SETTINGS_MODULE", "AlumGlobe.settings"),
+               "ALLOWED_HOSTS": "localhost"}
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", WORKER, server, "fork" if fork else "cold"],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        if proc.returncode != 0:
+            raise CommandError(f"Worker failed:\n{proc.stderr[-2000:]}")
+        result = json.loads(proc.stdout.strip().splitlines()[-1])
+        if result["status"] != 400:
+            raise CommandError(f"First request answered {result['status']}, expected 400.")
+
+        # Lines read "import time:  <self µs> | <cumulative µs> |   <module>"
+        imports = Counter()
+        for line in proc.stderr.splitlines():
+            if not line.startswith("import time:") or "self [us]" in line:
+                continue
+            self_us, _, name = line.removeprefix("import time:").split("|")
+            name = name.strip()
+            imports[name if name.startswith(PROVIDER_MODULES) else name.split(".")[0]] += int(self_us)
+        return result, imports
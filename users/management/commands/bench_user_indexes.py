@@ -0,0 +1,120 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+TABLE = "bench_users"
+
+COLUMNS = (
+    "id, password, last_login, is_superuser, username, first_name, last_name, is_staff, "
+    "is_active, date_joined, email, phone, role, college_id, roll_number, linkedin_url, "
+    "google_sub, linkedin_id, verified, is_approved"
+)
+
+# Indexes that 0001_initial already provides
+BASELINE_INDEXES = [
+    f"CREATE UNIQUE INDEX {TABLE}_pk ON {TABLE} (id)",
+    f"CREATE UNIQUE INDEX {TABLE}_username ON {TABLE} (username)",
+    f"CREATE UNIQUE INDEX {TABLE}_email ON {TABLE} (email)",
+]
+
+# Same definitions as 0002_identity_indexes
+IDENTITY_INDEXES = [
+    f"CREATE UNIQUE INDEX {TABLE}_google_sub ON {TABLE} (google_sub) WHERE google_sub IS NOT NULL",
+    f"CREATE UNIQUE INDEX {TABLE}_linkedin_id ON {TABLE} (linkedin_id) WHERE linkedin_id IS NOT NULL",
+    f"CREATE INDEX {TABLE}_college_role_appr ON {TABLE} (college_id, role, is_approved)",
+    f"CREATE INDEX {TABLE}_pending ON {TABLE} (college_id, id) WHERE NOT is_approved",
+]
+
+
+class Command(BaseCommand):
+    help = (
+        "Builds a synthetic user table and reports query plans and latencies "
+        "for the identity lookups before and after the 0002 indexes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument("--colleges", type=int, default=200)
+        parser.add_argument("--repeat", type=int, default=20, help="Runs per query; the median is reported.")
+
+    def handle(self, *args, **options):
+        rows, colleges = options["rows"], options["colleges"]
+        probe = rows // 2 - rows // 2 % 12  # a row that has both provider ids
+        queries = [
+            ("google_sub", f"SELECT id FROM {TABLE} WHERE google_sub = %s", [f"g{probe}"]),
+            ("linkedin_id", f"SELECT id FROM {TABLE} WHERE linkedin_id = %s", [f"li{probe}"]),
+            ("email", f"SELECT id FROM {TABLE} WHERE email = %s", [f"user{probe}@example.com"]),
+            ("admin filter",
+             f"SELECT id FROM {TABLE} WHERE college_id = %s AND role = %s AND is_approved = %s "
+             f"ORDER BY id DESC LIMIT 100",
+             [colleges // 2, "alumni", True]),
+            ("pending queue",
+             f"SELECT id FROM {TABLE} WHERE college_id = %s AND NOT is_approved ORDER BY id LIMIT 50",
+             [colleges // 2]),
+        ]
+
+        with connection.cursor() as cursor:
+            self.stdout.write(f"Building {TABLE} with {rows:,} users across {colleges} colleges...")
+            started = time.perf_counter()
+            self._build_table(cursor, rows, colleges)
+            self.stdout.write(f"  done in {time.perf_counter() - started:.1f}s\n")
+
+            try:
+                before = self._measure(cursor, queries, options["repeat"], "Before (0001_initial indexes)")
+                for sql in IDENTITY_INDEXES:
+                    cursor.execute(sql)
+                cursor.execute(f"ANALYZE {TABLE}")
+                after = self._measure(cursor, queries, options["repeat"], "After (0002_identity_indexes)")
+            finally:
+                cursor.execute(f"DROP TABLE {TABLE}")
+
+        self.stdout.write(f"{'query':<16}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+        for name, _, _ in queries:
+            speedup = before[name] / after[name] if after[name] else float("inf")
+            self.stdout.write(f"{name:<16}{before[name]:>12.3f}{after[name]:>12.3f}{speedup:>9.1f}x")
+
+    def _build_table(self, cursor, rows, colleges):
+        cursor.execute(f"DROP TABLE IF EXISTS {TABLE}")
+        cursor.execute(f"CREATE TEMPORARY TABLE {TABLE} AS SELECT {COLUMNS} FROM users_customuser WHERE 1 = 0")
+        # Roughly: 2% admins, 38% alumni, 60% students, 20% pending approval,
+        # a third signed in with Google and a quarter with LinkedIn.
+        cursor.execute(
+            f"""
+            WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < %s)
+            INSERT INTO {TABLE} ({COLUMNS})
+            SELECT n, '!', NULL, n %% 50 = 0, 'user' || n, '', '', n %% 50 = 0,
+                   n %% 5 <> 0, CURRENT_TIMESTAMP, 'user' || n || '@example.com', NULL,
+                   CASE WHEN n %% 50 = 0 THEN 'admin' WHEN n %% 5 < 2 THEN 'alumni' ELSE 'student' END,
+                   n %% %s + 1, 'R' || n, NULL,
+                   CASE WHEN n %% 3 = 0 THEN 'g' || n END,
+                   CASE WHEN n %% 4 = 0 THEN 'li' || n END,
+                   n %% 2 = 0, n %% 5 <> 0
+            FROM seq
+            """,
+            [rows, colleges],
+        )
+        for sql in BASELINE_INDEXES:
+            cursor.execute(sql)
+        cursor.execute(f"ANALYZE {TABLE}")
+
+    def _measure(self, cursor, queries, repeat, title):
+        self.stdout.write(self.style.MIGRATE_HEADING(title))
+        explain = "EXPLAIN QUERY PLAN" if connection.vendor == "sqlite" else "EXPLAIN"
+        timings = {}
+        for name, sql, params in queries:
+            cursor.execute(f"{explain} {sql}", params)
+            plan = [" ".join(str(col) for col in row) for row in cursor.fetchall()]
+            samples = []
+            for _ in range(repeat):
+                started = time.perf_counter()
+                cursor.execute(sql, params)
+                cursor.fetchall()
+                samples.append((time.perf_counter() - started) * 1000)
+            timings[name] = statistics.median(samples)
+            self.stdout.write(f"  {name}: {timings[name]:.3f} ms")
+            for line in plan:
+                self.stdout.write(f"      {line}")
+        self.stdout.write("")
+        return timings
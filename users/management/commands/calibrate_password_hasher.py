@@ -0,0 +1,35 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users.hashers import HASHERS, calibrate, hasher_memory, measure
+
+
+class Command(BaseCommand):
+    help = (
+        "Finds password hasher parameters that take about --target-ms per hash on "
+        "this machine and prints the settings to deploy them with."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--algorithm", choices=sorted(HASHERS), default="scrypt")
+        parser.add_argument("--target-ms", type=float, default=100)
+        parser.add_argument("--max-memory-mb", type=int, default=64,
+                            help="Memory budget per hash for scrypt and argon2.")
+
+    def handle(self, *args, **options):
+        algorithm = options["algorithm"]
+        try:
+            params = calibrate(algorithm, options["target_ms"] / 1000, options["max_memory_mb"] * 1024 * 1024)
+        except ValueError as e:
+            # e.g. argon2-cffi is not installed
+            raise CommandError(str(e))
+
+        elapsed = measure(HASHERS[algorithm](params), rounds=5)
+        self.stdout.write(
+            f"{algorithm} {params}: {elapsed * 1000:.0f} ms per hash, "
+            f"{hasher_memory(algorithm, params) / 2 ** 20:.0f} MiB, {1 / elapsed:.1f} logins/sec per core"
+        )
+        self.stdout.write("Add to the environment (existing hashes are upgraded on next login):")
+        self.stdout.write(f"PASSWORD_HASH_ALGORITHM={algorithm}")
+        self.stdout.write(f"PASSWORD_HASH_PARAMS={json.dumps(params, separators=(',', ':'))}")
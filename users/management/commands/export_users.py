@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from users.colleges import get_college_by_code
+from users.export import CHUNK_SIZE, CONTENT_TYPES, export_lines, export_users
+from users.models import ROLE_CHOICES
+
+
+class Command(BaseCommand):
+    help = (
+        "Streams a college's users as NDJSON or CSV, in constant memory. "
+        "Columns: id, username, email, first_name, last_name, role, roll_number, "
+        "phone, linkedin_url, is_approved, is_active, date_joined."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("college", help="College code.")
+        parser.add_argument("--format", choices=sorted(CONTENT_TYPES), default="ndjson")
+        parser.add_argument("--role", choices=[role for role, _ in ROLE_CHOICES])
+        approval = parser.add_mutually_exclusive_group()
+        approval.add_argument("--approved", action="store_true", dest="approved", default=None,
+                              help="Only approved users.")
+        approval.add_argument("--pending", action="store_false", dest="approved", help="Only users awaiting approval.")
+        parser.add_argument("--output", "-o", default="-", help="File to write, or - for stdout.")
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE, help="Rows fetched per round trip.")
+
+    def handle(self, *args, **options):
+        college = get_college_by_code(options["college"])
+        if college is None:
+            raise CommandError(f"Unknown college code {options['college']!r}.")
+
+        queryset = export_users(college.pk, role=options["role"], approved=options["approved"])
+        lines = export_lines(queryset, options["format"], chunk_size=options["chunk_size"])
+        if options["output"] == "-":
+            for text in lines:
+                self.stdout.write(text, ending="")
+        else:
+            with open(options["output"], "w", encoding="utf-8", newline="") as stream:
+                stream.writelines(lines)
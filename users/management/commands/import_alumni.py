@@ -0,0 +1,65 @@
+import os
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from users.colleges import get_college_by_code
+from users.importer import AlumniImporter, detect_format, read_rows
+
+
+class Command(BaseCommand):
+    help = (
+        "Imports a college roster (CSV with a header row, or NDJSON) of students/alumni. "
+        "Columns: email, roll_number, and optionally username, role, college_code, "
+        "first_name, last_name, phone, linkedin_url, password."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Roster file, or - for stdin.")
+        parser.add_argument("--college", help="College code for rows without one; rows for other colleges are rejected.")
+        parser.add_argument("--format", choices=["csv", "ndjson"], help="Defaults to the file extension.")
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                            help="Processes used to hash passwords (1 hashes in-process).")
+        parser.add_argument("--pending", action="store_true",
+                            help="Leave imported users waiting for admin approval.")
+        parser.add_argument("--rejects", help="Where to write rejected rows as NDJSON (default: <path>.rejects.ndjson).")
+        parser.add_argument("--checkpoint", help="Resume file (default: <path>.checkpoint).")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        college = None
+        if options["college"]:
+            college = get_college_by_code(options["college"])
+            if college is None:
+                raise CommandError(f"Unknown college code {options['college']!r}.")
+
+        base = "import" if path == "-" else path
+        rejects_path = options["rejects"] or f"{base}.rejects.ndjson"
+        checkpoint = options["checkpoint"] or f"{base}.checkpoint"
+        fmt = options["format"] or detect_format(path)
+
+        stream = sys.stdin if path == "-" else open(path, encoding="utf-8-sig", newline="")
+        with stream, open(rejects_path, "a") as rejects:
+            importer = AlumniImporter(
+                college=college,
+                batch_size=options["batch_size"],
+                workers=options["workers"],
+                approve=not options["pending"],
+                reject_writer=rejects,
+                checkpoint_path=None if path == "-" else checkpoint,
+            )
+            result = importer.run(read_rows(stream, fmt), progress=self._progress)
+
+        if result.skipped:
+            self.stdout.write(f"Resumed after {result.skipped:,} rows from a previous run.")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {result.created:,} users, rejected {result.rejected:,} "
+            f"in {result.seconds:.1f}s ({result.rows_per_second:,.0f} rows/sec)."
+        ))
+        if result.rejected:
+            self.stdout.write(f"Rejected rows written to {rejects_path}")
+
+    def _progress(self, rows_done, result):
+        self.stdout.write(f"  {rows_done:,} rows  {result.rows_per_second:,.0f} rows/sec", ending="\r")
+        self.stdout.flush()
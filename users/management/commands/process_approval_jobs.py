@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from users.approvals import run_approval_job
+from users.models import ApprovalJob
+
+
+class Command(BaseCommand):
+    help = "Runs queued approval jobs and resumes ones interrupted by a restart."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int)
+
+    def handle(self, *args, **options):
+        for job_id in ApprovalJob.objects.filter(status__in=["queued", "running"]).order_by("id").values_list("id", flat=True):
+            job = run_approval_job(job_id, batch_size=options["batch_size"])
+            self.stdout.write(f"Job {job.pk}: {job.status}, approved {job.approved}/{job.total}")
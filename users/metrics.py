@@ -0,0 +1,331 @@
+"""
+Per-request timings and Prometheus metrics.
+
+`metrics_middleware` times each request and splits the time into:
+
+- database: query count and time, recorded by an execute wrapper that
+  signals.py installs on every connection;
+- outbound HTTP: time waiting on Google/LinkedIn, recorded with `timed("http")`;
+- password hashing: recorded with `timed("hash")`.
+
+The split is sent back in a `Server-Timing` header and added to per-view
+histograms. Concurrent waits in one request (LinkedIn's two calls, say)
+are timed once, by the code that waits on both.
+
+Counters are lock-free. Each thread updates its own shard, and a scrape
+merges every shard. With METRICS["DIR"] set, each worker also flushes its
+merged counters to `<DIR>/<pid>.json` every FLUSH_INTERVAL seconds, and a
+scrape adds up the files of the other workers. Set SLOW_REQUEST_MS to log
+slow requests with their queries. SLOW_REQUEST_SAMPLE_RATE is the share
+of requests whose queries are recorded. BUDGETS checks every request
+against the budgets in budgets.py, except requests that filled a
+per-process cache (see `cold_path`).
+"""
+
+import contextlib
+import contextvars
+import json
+import logging
+import math
+import os
+import random
+import threading
+import time
+from bisect import bisect_left
+from pathlib import Path
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseForbidden, HttpResponseNotFound
+from django.utils.crypto import constant_time_compare
+from django.utils.decorators import sync_and_async_middleware
+
+from .budgets import BudgetExceeded, violation
+
+logger = logging.getLogger("users.metrics")
+
+SECONDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+QUERIES = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+
+# name -> (help, buckets); every metric is a histogram labelled by view
+HISTOGRAMS = {
+    "alumglobe_request_duration_seconds": ("Wall time per request.", SECONDS),
+    "alumglobe_db_duration_seconds": ("Time in database queries per request.", SECONDS),
+    "alumglobe_db_queries": ("Database queries per request.", QUERIES),
+    "alumglobe_http_duration_seconds": ("Time waiting on outbound HTTP per request.", SECONDS),
+    "alumglobe_hash_duration_seconds": ("Time hashing passwords per request.", SECONDS),
+}
+RESPONSES = "alumglobe_responses"   # counter by view and status
+
+
+def conf():
+    return getattr(settings, "METRICS", {})
+
+
+# ---------------- Aggregation ----------------
+class Metrics:
+    """
+    Histograms as {(name, labels): [count per bucket..., +Inf count, sum]}
+    in one dict per thread; the owning thread is the only writer.
+    """
+
+    def __init__(self):
+        self._local = threading.local()
+        self._shards = []
+        self._lock = threading.Lock()   # only taken when a thread creates its shard
+        self._next_flush = 0
+
+    def _shard(self):
+        shard = getattr(self._local, "shard", None)
+        if shard is None:
+            shard = self._local.shard = {}
+            with self._lock:
+                self._shards.append(shard)
+        return shard
+
+    def observe(self, name, labels, value):
+        shard = self._shard()
+        key = (name, labels)
+        cells = shard.get(key)
+        if cells is None:
+            cells = shard[key] = [0] * (len(HISTOGRAMS[name][1]) + 2)
+        cells[bisect_left(HISTOGRAMS[name][1], value)] += 1
+        cells[-1] += value
+
+    def inc(self, name, labels):
+        shard = self._shard()
+        key = (name, labels)
+        shard[key] = shard.get(key, 0) + 1
+
+    def snapshot(self):
+        """This process's counters, merged across threads."""
+        merged = {}
+        for shard in list(self._shards):
+            merge_into(merged, list(shard.items()))
+        return merged
+
+    def collect(self):
+        """Counters for every worker: this process plus other workers' flushed files."""
+        merged = self.snapshot()
+        directory = conf().get("DIR")
+        if directory:
+            for path in Path(directory).glob("*.json"):
+                if path.stem == str(os.getpid()):
+                    continue
+                try:
+                    rows = json.loads(path.read_text())
+                except (OSError, ValueError):
+                    continue   # being replaced
+                merge_into(merged, [((name, tuple(map(tuple, labels))), value) for name, labels, value in rows])
+        return merged
+
+    def maybe_flush(self):
+        directory = conf().get("DIR")
+        if not directory or time.monotonic() < self._next_flush:
+            return
+        self._next_flush = time.monotonic() + conf().get("FLUSH_INTERVAL", 5)
+        self.flush(directory)
+
+    def flush(self, directory):
+        rows = [[name, labels, value] for (name, labels), value in self.snapshot().items()]
+        path = Path(directory) / f"{os.getpid()}.json"
+        tmp = path.with_suffix(f".{threading.get_ident()}.tmp")
+        tmp.write_text(json.dumps(rows))
+        os.replace(tmp, path)
+
+    def clear(self):
+        for shard in list(self._shards):
+            shard.clear()
+
+
+def merge_into(merged, items):
+    for key, value in items:
+        current = merged.get(key)
+        if current is None:
+            merged[key] = list(value) if isinstance(value, list) else value
+        elif isinstance(value, list):
+            for i, cell in enumerate(value):
+                current[i] += cell
+        else:
+            merged[key] = current + value
+
+
+metrics = Metrics()
+
+
+# ---------------- Per-request timings ----------------
+class RequestTimings:
+    __slots__ = ("db", "db_count", "http", "hash", "open", "queries", "cold")
+
+    def __init__(self, record_queries=False):
+        self.db = self.http = self.hash = 0.0
+        self.db_count = 0
+        self.cold = False      # filled a per-process cache; budgets are for warm workers
+        self.open = set()      # kinds being timed, so nested timers count once
+        self.queries = [] if record_queries else None
+
+
+_timings = contextvars.ContextVar("users_request_timings", default=None)
+
+
+@contextlib.contextmanager
+def timed(kind):
+    """Add the block's wall time to the current request's `kind` ("http" or "hash")."""
+    timings = _timings.get()
+    if timings is None or kind in timings.open:
+        yield
+        return
+    timings.open.add(kind)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        setattr(timings, kind, getattr(timings, kind) + time.perf_counter() - started)
+        timings.open.discard(kind)
+
+
+def cold_path():
+    """Mark the current request as filling a per-process cache, so its budget isn't checked."""
+    timings = _timings.get()
+    if timings is not None:
+        timings.cold = True
+
+
+def time_queries(execute, sql, params, many, context):
+    timings = _timings.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        elapsed = time.perf_counter() - started
+        timings.db += elapsed
+        timings.db_count += 1
+        if timings.queries is not None:
+            timings.queries.append((sql, round(elapsed * 1000, 2)))
+
+
+# ---------------- Middleware ----------------
+def start():
+    options = conf()
+    record = bool(options.get("BUDGETS")) or bool(
+        options.get("SLOW_REQUEST_MS") and random.random() < options.get("SLOW_REQUEST_SAMPLE_RATE", 1)
+    )
+    return _timings.set(RequestTimings(record_queries=record)), time.perf_counter()
+
+
+def finish(request, response, token, started):
+    elapsed = time.perf_counter() - started
+    timings = _timings.get()
+    _timings.reset(token)
+
+    match = getattr(request, "resolver_match", None)
+    labels = (("view", (match.url_name or match.view_name) if match else "unmatched"),)
+    metrics.observe("alumglobe_request_duration_seconds", labels, elapsed)
+    metrics.observe("alumglobe_db_duration_seconds", labels, timings.db)
+    metrics.observe("alumglobe_db_queries", labels, timings.db_count)
+    metrics.observe("alumglobe_http_duration_seconds", labels, timings.http)
+    metrics.observe("alumglobe_hash_duration_seconds", labels, timings.hash)
+    metrics.inc(RESPONSES, labels + (("status", str(response.status_code)),))
+    metrics.maybe_flush()
+
+    options = conf()
+    if options.get("SERVER_TIMING"):
+        response["Server-Timing"] = server_timing(timings, elapsed)
+    slow_ms = options.get("SLOW_REQUEST_MS")
+    if slow_ms and timings.queries is not None and elapsed * 1000 >= slow_ms:
+        logger.warning("Slow request %s %s %s", request.method, request.path, json.dumps({
+            "view": labels[0][1],
+            "status": response.status_code,
+            "total_ms": round(elapsed * 1000, 2),
+            "db_ms": round(timings.db * 1000, 2),
+            "http_ms": round(timings.http * 1000, 2),
+            "hash_ms": round(timings.hash * 1000, 2),
+            "queries": timings.queries,
+        }))
+
+    mode = options.get("BUDGETS")
+    if mode and not timings.cold:
+        own_ms = (elapsed - timings.hash - timings.http) * 1000
+        problem = violation(labels[0][1], timings.db_count, own_ms, timings.queries)
+        if problem and mode == "raise":
+            raise BudgetExceeded(problem)
+        if problem:
+            logger.warning("Over budget: %s", problem)
+
+
+def server_timing(timings, elapsed):
+    parts = [f'db;dur={timings.db * 1000:.1f};desc="{timings.db_count} queries"']
+    if timings.http:
+        parts.append(f"http;dur={timings.http * 1000:.1f}")
+    if timings.hash:
+        parts.append(f"hash;dur={timings.hash * 1000:.1f}")
+    parts.append(f"total;dur={elapsed * 1000:.1f}")
+    return ", ".join(parts)
+
+
+@sync_and_async_middleware
+def metrics_middleware(get_response):
+    if not conf().get("ENABLED", True):
+        return get_response
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            token, started = start()
+            response = await get_response(request)
+            finish(request, response, token, started)
+            return response
+    else:
+        def middleware(request):
+            token, started = start()
+            response = get_response(request)
+            finish(request, response, token, started)
+            return response
+    return middleware
+
+
+# ---------------- Prometheus endpoint ----------------
+def render(merged):
+    """Prometheus text format (0.0.4)."""
+    by_name = {}
+    for (name, labels), value in merged.items():
+        by_name.setdefault(name, []).append((labels, value))
+
+    lines = []
+    for name, (help_text, buckets) in HISTOGRAMS.items():
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} histogram"]
+        for labels, cells in sorted(by_name.get(name, ())):
+            cumulative = 0
+            for bound, count in zip((*buckets, math.inf), cells):
+                cumulative += count
+                le = "+Inf" if bound == math.inf else repr(float(bound))
+                lines.append(f"{name}_bucket{format_labels(labels + (('le', le),))} {cumulative}")
+            lines.append(f"{name}_sum{format_labels(labels)} {cells[-1]!r}")
+            lines.append(f"{name}_count{format_labels(labels)} {cumulative}")
+
+    lines += [f"# HELP {RESPONSES}_total Responses by view and status.", f"# TYPE {RESPONSES}_total counter"]
+    for labels, count in sorted(by_name.get(RESPONSES, ())):
+        lines.append(f"{RESPONSES}_total{format_labels(labels)} {count}")
+    return "\n".join(lines) + "\n"
+
+
+def format_labels(labels):
+    return "{" + ",".join(f'{key}="{escape(value)}"' for key, value in labels) + "}"
+
+
+def escape(value):
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def metrics_view(request):
+    """
+    GET /metrics; requires `Authorization: Bearer <METRICS["TOKEN"]>`.
+    Without a token it is only served with DEBUG on, and is a 404 otherwise.
+    """
+    token = conf().get("TOKEN")
+    if not token and not settings.DEBUG:
+        return HttpResponseNotFound()
+    if token and not constant_time_compare(request.META.get("HTTP_AUTHORIZATION", ""), f"Bearer {token}"):
+        return HttpResponseForbidden()
+    return HttpResponse(render(metrics.collect()), content_type="text/plain; version=0.0.4; charset=utf-8")
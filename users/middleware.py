@@ -0,0 +1,55 @@
+"""
+Middleware only the browser-facing pages need, skipped for the API.
+
+Sessions, CSRF, AuthenticationMiddleware, messages and X-Frame-Options
+serve the admin and other cookie-authenticated pages. The JSON API
+authenticates with bearer tokens. DRF views are CSRF-exempt, and they set
+request.user themselves. BrowserMiddleware runs settings.BROWSER_MIDDLEWARE
+as one stack in MIDDLEWARE's place. Requests under API_FAST_PATH_PREFIXES
+bypass that whole stack and go straight on to the view.
+"""
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+
+class BrowserMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.prefixes = tuple(getattr(settings, "API_FAST_PATH_PREFIXES", ()))
+
+        # Build the stack as Django would: the last entry wraps get_response
+        handler, view_hooks = get_response, []
+        for path in reversed(settings.BROWSER_MIDDLEWARE):
+            middleware = import_string(path)(handler)
+            if hasattr(middleware, "process_exception") or hasattr(middleware, "process_template_response"):
+                raise ImproperlyConfigured(f"{path} needs hooks BrowserMiddleware doesn't run; list it in MIDDLEWARE.")
+            if hasattr(middleware, "process_view"):
+                view_hooks.insert(0, middleware.process_view)
+            handler = middleware
+        self.browser = handler
+        self.view_hooks = view_hooks
+
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def is_api(self, request):
+        return request.path_info.startswith(self.prefixes)
+
+    def __call__(self, request):
+        # Either handler returns a coroutine when serving async
+        return self.get_response(request) if self.is_api(request) else self.browser(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if self.is_api(request):
+            return None
+        for hook in self.view_hooks:
+            response = hook(request, view_func, view_args, view_kwargs)
+            if response is not None:
+                return response
+        return None
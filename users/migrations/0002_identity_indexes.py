@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-17 03:24
+
+from django.db import migrations, models
+
+from ._operations import AddIndexOnline, AddUniqueConstraintOnline
+
+
+class Migration(migrations.Migration):
+    # Indexes build concurrently on PostgreSQL; the user table stays writable
+    atomic = False
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        AddIndexOnline(
+            model_name='customuser',
+            index=models.Index(fields=['college', 'role', 'is_approved'], name='users_college_role_appr_idx'),
+        ),
+        AddIndexOnline(
+            model_name='customuser',
+            index=models.Index(condition=models.Q(('is_approved', False)), fields=['college', 'id'], name='users_pending_approval_idx'),
+        ),
+        AddUniqueConstraintOnline(
+            model_name='customuser',
+            constraint=models.UniqueConstraint(condition=models.Q(('google_sub__isnull', False)), fields=('google_sub',), name='users_unique_google_sub'),
+        ),
+        AddUniqueConstraintOnline(
+            model_name='customuser',
+            constraint=models.UniqueConstraint(condition=models.Q(('linkedin_id__isnull', False)), fields=('linkedin_id',), name='users_unique_linkedin_id'),
+        ),
+    ]
@@ -0,0 +1,51 @@
+# Generated by Django 5.2.18 on 2026-10-17 04:29
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+import django.db.models.functions.text
+from django.contrib.postgres.operations import AddIndexConcurrently
+from django.db import migrations, models
+
+
+class AddDirectoryIndex(AddIndexConcurrently):
+    """
+    CREATE INDEX CONCURRENTLY on PostgreSQL, so the user table stays
+    writable while the index builds. Elsewhere a plain index, and no GIN
+    index at all: other databases search without one.
+    """
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+        elif not isinstance(self.index, django.contrib.postgres.indexes.GinIndex):
+            migrations.AddIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+        elif not isinstance(self.index, django.contrib.postgres.indexes.GinIndex):
+            migrations.AddIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
+
+
+class Migration(migrations.Migration):
+    atomic = False
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0005_token_revocation'),
+    ]
+
+    operations = [
+        AddDirectoryIndex(
+            model_name='customuser',
+            index=models.Index(models.F('college'), django.db.models.functions.text.Lower(django.db.models.functions.text.Concat('first_name', models.Value(' '), 'last_name', models.Value(' '), 'username')), models.F('id'), condition=models.Q(('is_active', True), ('is_approved', True), ('role', 'alumni')), include=('first_name', 'last_name', 'username', 'roll_number', 'linkedin_url', 'linkedin_id'), name='users_directory_name_idx'),
+        ),
+        AddDirectoryIndex(
+            model_name='customuser',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.search.SearchVector('first_name', 'last_name', 'username', config='simple'), condition=models.Q(('is_active', True), ('is_approved', True), ('role', 'alumni')), name='users_directory_search_idx'),
+        ),
+        AddDirectoryIndex(
+            model_name='customuser',
+            index=django.contrib.postgres.indexes.GinIndex(django.contrib.postgres.search.SearchVector('roll_number', config='simple'), condition=models.Q(('is_active', True), ('is_approved', True), ('role', 'alumni')), name='users_directory_roll_idx'),
+        ),
+    ]
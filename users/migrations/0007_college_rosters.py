@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-17 05:08
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('users', '0006_directory_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RosterEntry',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('roll_number', models.CharField(max_length=50)),
+            ],
+        ),
+        migrations.AddField(
+            model_name='college',
+            name='roster_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='rosterentry',
+            name='college',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='users.college'),
+        ),
+        migrations.AddConstraint(
+            model_name='rosterentry',
+            constraint=models.UniqueConstraint(fields=('college', 'roll_number'), name='users_roster_unique_roll_number'),
+        ),
+    ]
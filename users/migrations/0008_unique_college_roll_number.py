@@ -0,0 +1,55 @@
+import django.db.models.functions.text
+from django.db import migrations, models
+
+from ._operations import AddUniqueConstraintOnline
+
+REPORT_LIMIT = 20
+
+
+def check_duplicate_roll_numbers(apps, schema_editor):
+    """
+    Stop before building the index if two accounts in a college share a
+    roll number (ignoring case), listing them so an admin can correct or
+    clear the roll numbers that are wrong.
+    """
+    CustomUser = apps.get_model('users', 'CustomUser')
+    duplicates = (
+        CustomUser.objects.using(schema_editor.connection.alias)
+        .filter(roll_number__gt='')
+        .values('college', roll=django.db.models.functions.text.Lower('roll_number'))
+        .annotate(users=models.Count('id'))
+        .filter(users__gt=1)
+        .order_by('college', 'roll')
+    )
+    groups = list(duplicates[:REPORT_LIMIT + 1])
+    if not groups:
+        return
+    lines = []
+    for group in groups[:REPORT_LIMIT]:
+        ids = CustomUser.objects.using(schema_editor.connection.alias).filter(
+            college=group['college'], roll_number__iexact=group['roll'],
+        ).order_by('id').values_list('id', flat=True)
+        lines.append(f"  college {group['college']}, roll number {group['roll']!r}: users {', '.join(map(str, ids))}")
+    if len(groups) > REPORT_LIMIT:
+        lines.append("  ...")
+    raise RuntimeError(
+        "Roll numbers must be unique within a college before users_unique_college_roll_number "
+        "can be added. Correct or clear these and migrate again:\n" + "\n".join(lines)
+    )
+
+
+class Migration(migrations.Migration):
+    # The unique index builds concurrently on PostgreSQL; the user table stays writable
+    atomic = False
+
+    dependencies = [
+        ('users', '0007_college_rosters'),
+    ]
+
+    operations = [
+        migrations.RunPython(check_duplicate_roll_numbers, migrations.RunPython.noop),
+        AddUniqueConstraintOnline(
+            model_name='customuser',
+            constraint=models.UniqueConstraint(models.F('college'), django.db.models.functions.text.Lower('roll_number'), condition=models.Q(('roll_number__gt', '')), name='users_unique_college_roll_number'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+"""
+Index operations that keep the user table writable on PostgreSQL.
+
+Migrations using them must set `atomic = False`. Other databases get the
+plain AddIndex/AddConstraint.
+"""
+
+from django.contrib.postgres.operations import AddIndexConcurrently, NotInTransactionMixin
+from django.db import migrations
+
+
+class AddIndexOnline(AddIndexConcurrently):
+    """CREATE INDEX CONCURRENTLY on PostgreSQL, a plain index elsewhere."""
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_forwards(app_label, schema_editor, from_state, to_state)
+        else:
+            migrations.AddIndex.database_forwards(self, app_label, schema_editor, from_state, to_state)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor == 'postgresql':
+            super().database_backwards(app_label, schema_editor, from_state, to_state)
+        else:
+            migrations.AddIndex.database_backwards(self, app_label, schema_editor, from_state, to_state)
+
+
+class AddUniqueConstraintOnline(NotInTransactionMixin, migrations.AddConstraint):
+    """
+    A UniqueConstraint with a condition or expressions, which PostgreSQL
+    keeps as a unique index, built with CREATE UNIQUE INDEX CONCURRENTLY.
+    A build that fails on duplicate rows leaves an invalid index behind, so
+    one of the same name is dropped first and the migration can be rerun.
+    """
+    atomic = False
+
+    def describe(self):
+        return f"Concurrently create constraint {self.constraint.name} on model {self.model_name}"
+
+    def database_forwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return super().database_forwards(app_label, schema_editor, from_state, to_state)
+        self._ensure_not_in_transaction(schema_editor)
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            statement = self.constraint.create_sql(model, schema_editor)
+            if not statement.template.startswith('CREATE UNIQUE INDEX'):
+                raise ValueError(f"{self.constraint.name} isn't kept as a unique index; use AddConstraint.")
+            schema_editor.execute(schema_editor._delete_index_sql(model, self.constraint.name, concurrently=True))
+            statement.template = statement.template.replace('CREATE UNIQUE INDEX', 'CREATE UNIQUE INDEX CONCURRENTLY')
+            schema_editor.execute(statement)
+
+    def database_backwards(self, app_label, schema_editor, from_state, to_state):
+        if schema_editor.connection.vendor != 'postgresql':
+            return super().database_backwards(app_label, schema_editor, from_state, to_state)
+        self._ensure_not_in_transaction(schema_editor)
+        model = to_state.apps.get_model(app_label, self.model_name)
+        if self.allow_migrate_model(schema_editor.connection.alias, model):
+            schema_editor.execute(schema_editor._delete_index_sql(model, self.constraint.name, concurrently=True))
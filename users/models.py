@@ -1,5 +1,8 @@
-from django.db import models
 from django.contrib.auth.models import AbstractUser
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
+from django.db import models
+from django.db.models.functions import Concat, Lower
 
 ROLE_CHOICES = (
     ('student', 'Student'),
@@ -12,11 +15,22 @@ class College(models.Model):
     name = models.CharField(max_length=255, unique=True)
     code = models.CharField(max_length=50, unique=True)  # college_code for multi-tenant
     domain = models.CharField(max_length=255, blank=True, null=True)  # official email domain
+    sessions_revoked_at = models.DateTimeField(blank=True, null=True)  # tokens issued earlier are rejected
+    roster_version = models.PositiveIntegerField(default=0)  # bumped by each roster upload; 0 → no roster
 
     def __str__(self):
         return f"{self.name} ({self.code})"
 
 
+# Who the alumni directory lists, the lowercased "first last username" it
+# sorts by, and (on PostgreSQL) the words it searches in names and in roll
+# numbers. The directory indexes are built on these expressions.
+DIRECTORY_MEMBERS = models.Q(role='alumni', is_approved=True, is_active=True)
+DIRECTORY_NAME = Lower(Concat('first_name', models.Value(' '), 'last_name', models.Value(' '), 'username'))
+DIRECTORY_SEARCH = SearchVector('first_name', 'last_name', 'username', config='simple')
+DIRECTORY_ROLL_SEARCH = SearchVector('roll_number', config='simple')
+
+
 class CustomUser(AbstractUser):
     # inherited fields: username, first_name, last_name, password, is_active
     email = models.EmailField(unique=True)
@@ -35,8 +49,62 @@ class CustomUser(AbstractUser):
     verified = models.BooleanField(default=False)   # admin verified or auto-verified via domain
     is_approved = models.BooleanField(default=False)  # only after admin approval for students/alumni
 
+    # bumped whenever a field carried in JWT claims changes; older tokens are rejected
+    auth_version = models.PositiveIntegerField(default=0)
+
     REQUIRED_FIELDS = ['email']
 
+    class Meta(AbstractUser.Meta):
+        constraints = [
+            # Social logins look users up by provider id
+            models.UniqueConstraint(
+                fields=['google_sub'], condition=models.Q(google_sub__isnull=False),
+                name='users_unique_google_sub',
+            ),
+            models.UniqueConstraint(
+                fields=['linkedin_id'], condition=models.Q(linkedin_id__isnull=False),
+                name='users_unique_linkedin_id',
+            ),
+            # One account per roll number within a college, ignoring case;
+            # NULL and blank roll numbers (admins) are left out
+            models.UniqueConstraint(
+                models.F('college'), Lower('roll_number'), condition=models.Q(roll_number__gt=''),
+                name='users_unique_college_roll_number',
+            ),
+        ]
+        indexes = [
+            # Admin filters users by college + role + approval state
+            models.Index(fields=['college', 'role', 'is_approved'], name='users_college_role_appr_idx'),
+            # Pending-approval queue, paged by id within a college
+            models.Index(
+                fields=['college', 'id'], condition=models.Q(is_approved=False),
+                name='users_pending_approval_idx',
+            ),
+            # Directory pages in name order within a college. Covering, so
+            # short searches filter index-only scans without heap reads.
+            models.Index(
+                'college', DIRECTORY_NAME, 'id', condition=DIRECTORY_MEMBERS,
+                include=('first_name', 'last_name', 'username', 'roll_number', 'linkedin_url', 'linkedin_id'),
+                name='users_directory_name_idx',
+            ),
+            # Type-ahead on names and roll numbers (PostgreSQL only, see 0006)
+            GinIndex(DIRECTORY_SEARCH, condition=DIRECTORY_MEMBERS, name='users_directory_search_idx'),
+            GinIndex(DIRECTORY_ROLL_SEARCH, condition=DIRECTORY_MEMBERS, name='users_directory_roll_idx'),
+        ]
+
+    # Fields copied into JWT claims by get_tokens_for_user
+    AUTH_CLAIM_FIELDS = ('role', 'college_id', 'is_approved', 'is_active')
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._auth_state = instance._get_auth_state()
+        return instance
+
+    def _get_auth_state(self):
+        # Only loaded fields; touching a deferred one would cost a query
+        return {name: self.__dict__[name] for name in self.AUTH_CLAIM_FIELDS if name in self.__dict__}
+
     def save(self, *args, **kwargs):
         # Admins must use official college domain (if provided)
         if self.role == "admin" and self.college and self.college.domain:
@@ -44,12 +112,84 @@ class CustomUser(AbstractUser):
                 raise ValueError(f"Admins must use the official email domain: @{self.college.domain}")
             self.is_approved = True   # auto-approved admins
 
-        # Students and Alumni → must wait for approval
-        if self.role in ["student", "alumni"] and not self.pk:
+        # Students and Alumni → must wait for approval, unless the college roster vouched for them
+        if self.role in ["student", "alumni"] and not self.pk and not self.is_approved:
             self.is_active = False   # prevent login until approved
 
+        # Role, college or approval changed → tokens carrying the old claims go stale
+        state = self._get_auth_state()
+        previous = getattr(self, '_auth_state', None)
+        if previous is not None and any(state.get(name, value) != value for name, value in previous.items()):
+            self.auth_version += 1
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = set(update_fields) | {'auth_version'}
+
         super().save(*args, **kwargs)
+        self._auth_state = state
 
     def __str__(self):
         return f"{self.username} ({self.role}) - {self.college.name if self.college else 'No College'}"
 
+
+
+class ApprovalJob(models.Model):
+    """Bulk approval queued by a college admin and applied in small batches."""
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+
+    college = models.ForeignKey(College, on_delete=models.CASCADE)
+    requested_by = models.ForeignKey(CustomUser, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    user_ids = models.JSONField(blank=True, null=True)   # None → every pending user up to max_user_id
+    max_user_id = models.BigIntegerField()                # users registered after queueing are left alone
+    last_user_id = models.BigIntegerField(default=0)      # keyset position of the last applied batch
+    total = models.PositiveIntegerField(default=0)
+    approved = models.PositiveIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Approval job {self.pk} ({self.status}) - {self.college.code}"
+
+
+class RosterEntry(models.Model):
+    """A roll number on a college's roster; students and alumni who register with it are approved at once."""
+    college = models.ForeignKey(College, on_delete=models.CASCADE, related_name='+')
+    roll_number = models.CharField(max_length=50)   # normalized, see rosters.normalize_roll_number
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['college', 'roll_number'], name='users_roster_unique_roll_number'),
+        ]
+
+    def __str__(self):
+        return f"{self.roll_number} - {self.college.code}"
+
+
+class RevokedToken(models.Model):
+    """Revoked refresh token JTIs; rows are pruned once the token would have expired anyway."""
+    jti = models.CharField(max_length=255, unique=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return self.jti
+
+
+class RefreshTokenFamily(models.Model):
+    """
+    The chain of refresh tokens rotated from one login. Only a token of the
+    current generation can be refreshed; rows are pruned once the newest
+    token would have expired.
+    """
+    family = models.CharField(max_length=255, unique=True)   # jti of the login's refresh token
+    generation = models.PositiveIntegerField()
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.family} ({self.generation})"
@@ -0,0 +1,19 @@
+from rest_framework import permissions
+
+
+class IsCollegeAdmin(permissions.BasePermission):
+    """Authenticated admins attached to a college; data is scoped to that college."""
+    message = "Only college admins can access this resource."
+
+    def has_permission(self, request, view):
+        user = request.user
+        return bool(user and user.is_authenticated and user.role == "admin" and user.college_id)
+
+
+class IsApprovedCollegeMember(permissions.BasePermission):
+    """Authenticated, approved users attached to a college; read from token claims, no query."""
+    message = "Only approved members of a college can access this resource."
+
+    def has_permission(self, request, view):
+        user = request.user
+        return bool(user and user.is_authenticated and user.is_approved and user.college_id)
@@ -0,0 +1,228 @@
+"""
+Sliding-window rate limits for the unauthenticated auth endpoints.
+
+Each rule allows `limit` requests per `window` seconds for one identity
+(client IP, email or known college code) within a scope ("login", "register",
+"social"). Counts are kept per fixed window; the estimate for the sliding
+window is the current window's count plus the previous window's count
+weighted by how much of it still overlaps. That is two integers per key
+and no timestamps per request.
+
+The memory backend takes no locks. Counters are immutable tuples replaced
+in one dict assignment, so a race between threads can only drop an
+increment, letting at most one extra request through. Set
+RATE_LIMITS["CACHE_ALIAS"] to share counters between workers.
+
+Checks run before any database or hashing work: as a DRF throttle for the
+views in views.py, and at the top of the async views.
+"""
+
+import hashlib
+import math
+import re
+import threading
+import time
+from collections.abc import Mapping
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.settings import api_settings
+from rest_framework.throttling import BaseThrottle
+
+from .colleges import get_college_by_code
+
+RATE_RE = re.compile(r"^(\d+)/(\d*)([smhd])")
+UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def parse_rate(rate):
+    """"10/m" -> (10, 60); "100/15m" -> (100, 900)."""
+    match = RATE_RE.match(rate)
+    if not match:
+        raise ValueError(f"Invalid rate {rate!r}; expected e.g. '10/m' or '100/15m'")
+    limit, multiplier, unit = match.groups()
+    return int(limit), int(multiplier or 1) * UNITS[unit]
+
+
+# ---------------- Backends ----------------
+class MemoryBackend:
+    """Per-process counters: key -> (window index, count, previous count, expires at)."""
+
+    def __init__(self, max_keys=100_000):
+        self.max_keys = max_keys
+        self._counters = {}
+        self._sweep_lock = threading.Lock()
+
+    def counts(self, key, index):
+        entry = self._counters.get(key)
+        if entry is None:
+            return 0, 0
+        if entry[0] == index:
+            return entry[1], entry[2]
+        return 0, entry[1] if entry[0] == index - 1 else 0
+
+    def incr(self, key, index, window):
+        entry = self._counters.get(key)
+        if entry is not None and entry[0] == index:
+            self._counters[key] = (index, entry[1] + 1, entry[2], entry[3])
+            return
+        previous = entry[1] if entry is not None and entry[0] == index - 1 else 0
+        self._counters[key] = (index, 1, previous, (index + 2) * window)
+        if len(self._counters) > self.max_keys:
+            self._sweep()
+
+    def _sweep(self):
+        if not self._sweep_lock.acquire(blocking=False):
+            return
+        try:
+            now = time.time()
+            live = {key: entry for key, entry in list(self._counters.items()) if entry[3] > now}
+            # A flood of distinct keys resets the table rather than growing it
+            self._counters = live if len(live) <= self.max_keys else {}
+        finally:
+            self._sweep_lock.release()
+
+
+class CacheBackend:
+    """Counters in a Django cache shared by every worker."""
+
+    def __init__(self, alias):
+        self.cache = caches[alias]
+
+    def _key(self, key, index):
+        return f"users:ratelimit:{hashlib.blake2b(key.encode(), digest_size=12).hexdigest()}:{index}"
+
+    def counts(self, key, index):
+        current, previous = self._key(key, index), self._key(key, index - 1)
+        values = self.cache.get_many([current, previous])
+        return values.get(current, 0), values.get(previous, 0)
+
+    def incr(self, key, index, window):
+        cache_key = self._key(key, index)
+        if self.cache.add(cache_key, 1, timeout=window * 2 + 1):
+            return
+        try:
+            self.cache.incr(cache_key)
+        except ValueError:
+            # Expired between add() and incr()
+            self.cache.add(cache_key, 1, timeout=window * 2 + 1)
+
+
+# ---------------- Limiter ----------------
+class RateLimiter:
+    def __init__(self, backend, rules, clock=time.time):
+        self.backend = backend
+        self.clock = clock
+        # scope -> ((identity, limit, window), ...)
+        self.rules = {
+            scope: tuple((identity, *parse_rate(rate)) for identity, rate in identities.items())
+            for scope, identities in rules.items()
+        }
+
+    def check(self, scope, **identities):
+        """
+        Count a request in `scope` and return 0 if it is allowed, or the
+        seconds until it would be. Identities that are missing or empty are
+        not limited; a rejected request is not counted.
+        """
+        now = self.clock()
+        hits = []
+        for identity, limit, window in self.rules.get(scope, ()):
+            value = identities.get(identity)
+            if not value:
+                continue
+            key = f"{scope}:{identity}:{value}"
+            index, elapsed = divmod(now, window)
+            current, previous = self.backend.counts(key, int(index))
+            if previous * (window - elapsed) / window + current >= limit:
+                return retry_after(limit, window, elapsed, current, previous)
+            hits.append((key, int(index), window))
+
+        for key, index, window in hits:
+            self.backend.incr(key, index, window)
+        return 0
+
+
+def retry_after(limit, window, elapsed, current, previous):
+    """Seconds until the sliding-window estimate drops below `limit`."""
+    if current >= limit:
+        # Wait out this window, then for its weight in the next one to decay
+        wait = window - elapsed + window * (1 - limit / current)
+    else:
+        wait = window * (1 - (limit - current) / previous) - elapsed
+    return max(1, math.ceil(wait))
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter():
+    """The per-process limiter configured by settings.RATE_LIMITS; it has no rules when disabled."""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                conf = getattr(settings, "RATE_LIMITS", {})
+                alias = conf.get("CACHE_ALIAS")
+                backend = CacheBackend(alias) if alias else MemoryBackend()
+                _limiter = RateLimiter(backend, conf.get("RULES", {}) if conf.get("ENABLED", True) else {})
+    return _limiter
+
+
+def reset_rate_limiter():
+    global _limiter
+    with _limiter_lock:
+        _limiter = None
+
+
+def request_identities(ip, data):
+    """
+    Rate limit identities for an auth request body. The college counts only
+    when its code names a known College, so made-up codes get no counters;
+    the lookup uses the College cache and may load it. A body that isn't an
+    object is limited by IP alone and left for the view to reject.
+    """
+    if not isinstance(data, Mapping):
+        return {"ip": ip}
+    email = data.get("email")
+    code = data.get("college_code")
+    college = get_college_by_code(code) if isinstance(code, str) else None
+    return {
+        "ip": ip,
+        "email": str(email).strip().lower() if email else None,
+        "college": college.code if college is not None else None,
+    }
+
+
+def client_ip(request):
+    """
+    DRF's `get_ident`, honouring REST_FRAMEWORK["NUM_PROXIES"], but read
+    straight from META: building `request.headers` costs more than the check.
+    """
+    xff = request.META.get("HTTP_X_FORWARDED_FOR")
+    remote_addr = request.META.get("REMOTE_ADDR")
+    num_proxies = api_settings.NUM_PROXIES
+    if num_proxies is not None:
+        if num_proxies == 0 or xff is None:
+            return remote_addr
+        addrs = xff.split(",")
+        return addrs[-min(num_proxies, len(addrs))].strip()
+    return "".join(xff.split()) if xff else remote_addr
+
+
+class AuthRateThrottle(BaseThrottle):
+    """
+    Applies RATE_LIMITS["RULES"][view.throttle_scope]. Views using it should
+    have no authentication classes, so a rejected request touches nothing
+    but the limiter.
+    """
+
+    def allow_request(self, request, view):
+        self.retry_after = get_rate_limiter().check(
+            view.throttle_scope, **request_identities(client_ip(request), request.data)
+        )
+        return not self.retry_after
+
+    def wait(self):
+        return self.retry_after
@@ -0,0 +1,231 @@
+"""
+Refresh token revocation.
+
+Rotation doesn't revoke anything here. The tokens rotated from one login
+form a family (the `fam` claim, the jti of the login's token) with a
+generation (`gen`). Each refresh moves the family's RefreshTokenFamily row
+to the next generation with one conditional write, so a token that was
+already rotated is rejected at once, in every worker, and the table holds
+one row per live session rather than one per refresh.
+
+Logging out one session revokes its JTI. Revoked JTIs are kept in every
+process as a Bloom filter backed by an exact dict of jti -> expiry.
+Checking a token is one Bloom probe, plus a dict lookup for the rare
+maybe-hit. A pluggable backend shares revocations between workers. Each
+process pulls new entries at most every `SYNC_INTERVAL` seconds, so a
+logged-out token still refreshes on other workers for up to that long.
+Entries are pruned once the token would have expired anyway.
+
+Two cheaper mechanisms cover "log out everywhere":
+- Per user: bump `CustomUser.auth_version`. Every token carries `ver`, so
+  they all go stale (see authentication.py).
+- Per college: set `College.sessions_revoked_at`. Tokens issued before it
+  are rejected through the College cache: at once in this process, and
+  within COLLEGE_CACHE_TTL in the others unless COLLEGE_CACHE_ALIAS is set.
+"""
+
+import datetime
+import hashlib
+import math
+import threading
+import time
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from django.utils.module_loading import import_string
+
+from .colleges import invalidate_college_cache
+from .models import College, RefreshTokenFamily, RevokedToken
+
+
+class BloomFilter:
+    def __init__(self, capacity, error_rate=0.001):
+        self.capacity = capacity
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+# ---------------- Backends ----------------
+class MemoryBackend:
+    """Nothing shared; for a single process and for tests."""
+
+    def add(self, jti, expires_at):
+        pass
+
+    def changes_since(self, cursor):
+        return [], cursor
+
+    def prune(self, now):
+        pass
+
+
+class DatabaseBackend:
+    """
+    RevokedToken rows shared by every worker. Syncs re-read a small window
+    of ids below the cursor so rows committed out of id order aren't missed.
+    """
+    overlap = 100
+
+    def add(self, jti, expires_at):
+        # One INSERT ... ON CONFLICT DO NOTHING; revoking twice is harmless
+        RevokedToken.objects.bulk_create([RevokedToken(jti=jti, expires_at=expires_at)], ignore_conflicts=True)
+
+    def changes_since(self, cursor):
+        rows = list(
+            RevokedToken.objects.filter(id__gt=max(cursor - self.overlap, 0))
+            .order_by("id").values_list("id", "jti", "expires_at")
+        )
+        if not rows:
+            return [], cursor
+        return [(jti, expires_at.timestamp()) for _, jti, expires_at in rows], rows[-1][0]
+
+    def prune(self, now):
+        RevokedToken.objects.filter(expires_at__lte=datetime.datetime.fromtimestamp(now, datetime.timezone.utc)).delete()
+
+
+# ---------------- Store ----------------
+class RevocationStore:
+    def __init__(self, backend, sync_interval=2.0, prune_interval=600, capacity=10000):
+        self.backend = backend
+        self.sync_interval = sync_interval
+        self.prune_interval = prune_interval
+        self._min_capacity = self._capacity = capacity
+        self._exact = {}   # jti -> expiry as a unix timestamp
+        self._bloom = BloomFilter(capacity)
+        self._cursor = 0
+        self._next_sync = 0.0
+        self._next_prune = time.monotonic() + prune_interval
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._exact)
+
+    def _add_local(self, jti, expires_at):
+        self._exact[jti] = expires_at
+        if len(self._exact) > self._capacity:
+            self._rebuild(self._capacity * 2)
+        else:
+            self._bloom.add(jti)
+
+    def _rebuild(self, capacity):
+        bloom = BloomFilter(capacity)
+        for jti in self._exact:
+            bloom.add(jti)
+        self._capacity, self._bloom = capacity, bloom
+
+    def revoke(self, jti, expires_at):
+        """Revoke a JTI until `expires_at` (unix timestamp)."""
+        self.backend.add(jti, datetime.datetime.fromtimestamp(expires_at, datetime.timezone.utc))
+        with self._lock:
+            self._add_local(jti, expires_at)
+
+    def is_revoked(self, jti):
+        if time.monotonic() >= self._next_sync:
+            self.sync()
+        return jti in self._bloom and jti in self._exact
+
+    def sync(self):
+        with self._lock:
+            self._next_sync = time.monotonic() + self.sync_interval
+            entries, self._cursor = self.backend.changes_since(self._cursor)
+            for jti, expires_at in entries:
+                if jti not in self._exact:
+                    self._add_local(jti, expires_at)
+            if time.monotonic() >= self._next_prune:
+                self._prune()
+
+    def _prune(self):
+        now = time.time()
+        self._next_prune = time.monotonic() + self.prune_interval
+        self._exact = {jti: exp for jti, exp in self._exact.items() if exp > now}
+        self._rebuild(max(self._min_capacity, len(self._exact) * 2))
+        self.backend.prune(now)
+        prune_token_families(now)
+
+    def clear(self):
+        with self._lock:
+            self._exact.clear()
+            self._rebuild(self._min_capacity)
+            self._cursor = 0
+            self._next_sync = 0.0
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_revocation_store():
+    """The per-process store, configured by settings.TOKEN_REVOCATION."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                options = dict(getattr(settings, "TOKEN_REVOCATION", {}))
+                backend = import_string(options.pop("BACKEND", "users.revocation.DatabaseBackend"))()
+                _store = RevocationStore(backend, **{key.lower(): value for key, value in options.items()})
+    return _store
+
+
+def reset_revocation_store():
+    global _store
+    with _store_lock:
+        _store = None
+
+
+def revoke_token(token):
+    get_revocation_store().revoke(token["jti"], token["exp"])
+
+
+def is_token_revoked(token):
+    return get_revocation_store().is_revoked(token["jti"])
+
+
+# ---------------- Rotation ----------------
+def token_family(token):
+    """(family, generation) of a refresh token; a login's own token starts its family."""
+    return token.get("fam", token["jti"]), token.get("gen", 0)
+
+
+def advance_token_family(family, generation, expires_at):
+    """
+    Move `family` from `generation` to the next one, keeping it until
+    `expires_at` (unix timestamp). False if that generation was already
+    rotated, by this request's token or a concurrent refresh of it.
+    """
+    expires_at = datetime.datetime.fromtimestamp(expires_at, datetime.timezone.utc)
+    if generation == 0:
+        # The first rotation creates the row; the unique family lets only one through
+        try:
+            with transaction.atomic():
+                RefreshTokenFamily.objects.create(family=family, generation=1, expires_at=expires_at)
+        except IntegrityError:
+            return False
+        return True
+    return RefreshTokenFamily.objects.filter(family=family, generation=generation).update(
+        generation=generation + 1, expires_at=expires_at,
+    ) == 1
+
+
+def prune_token_families(now):
+    RefreshTokenFamily.objects.filter(expires_at__lte=datetime.datetime.fromtimestamp(now, datetime.timezone.utc)).delete()
+
+
+def revoke_college_sessions(college):
+    """Reject every token issued to the college's users before now."""
+    College.objects.filter(pk=college.pk).update(sessions_revoked_at=timezone.now())
+    invalidate_college_cache()
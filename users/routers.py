@@ -0,0 +1,189 @@
+"""
+Primary/replica database routing.
+
+Writes always go to `default`. Reads also go to `default` unless the code
+opts in with `use_replica(request)`. The admin listings and read-only
+endpoints do that; everything else keeps reading its own writes.
+
+Inside `use_replica`, reads still stay on the primary when:
+
+- the current request has already written (any query routed through
+  `db_for_write`), or
+- the user is pinned, i.e. they wrote within REPLICA_STICKY_SECONDS. Saving
+  a CustomUser pins that user, so a newly registered user sees their own
+  row, and a request that writes pins whoever made it.
+
+Pins are kept per process. Set REPLICA_PIN_CACHE_ALIAS to a cache shared
+by every worker, so that a write handled by one worker pins the user on
+all of them.
+"""
+
+import contextlib
+import contextvars
+import functools
+import random
+import threading
+import time
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.cache import caches
+from django.db import DEFAULT_DB_ALIAS
+from django.utils.decorators import sync_and_async_middleware
+from django.utils.functional import SimpleLazyObject, empty
+
+PIN_KEY = "users:replica-pin:{}"
+
+
+def replica_aliases():
+    return getattr(settings, "DATABASE_REPLICAS", ())
+
+
+# ---------------- Sticky-after-write pins ----------------
+class ReplicaPins:
+    def __init__(self):
+        self._until = {}   # user id -> monotonic time the pin expires
+        self._lock = threading.Lock()
+
+    @property
+    def ttl(self):
+        return getattr(settings, "REPLICA_STICKY_SECONDS", 5)
+
+    @property
+    def shared(self):
+        alias = getattr(settings, "REPLICA_PIN_CACHE_ALIAS", None)
+        return caches[alias] if alias else None
+
+    def pin(self, user_id):
+        shared = self.shared
+        if shared is not None:
+            shared.set(PIN_KEY.format(user_id), 1, timeout=self.ttl)
+            return
+        with self._lock:
+            now = time.monotonic()
+            if len(self._until) > 10000:
+                self._until = {k: v for k, v in self._until.items() if v > now}
+            self._until[user_id] = now + self.ttl
+
+    def is_pinned(self, user_id):
+        shared = self.shared
+        if shared is not None:
+            return shared.get(PIN_KEY.format(user_id)) is not None
+        return self._until.get(user_id, 0) > time.monotonic()
+
+    def clear(self):
+        with self._lock:
+            self._until.clear()
+
+
+replica_pins = ReplicaPins()
+
+
+def request_user_id(request):
+    """The id of the request's user if already authenticated, without loading it."""
+    user = getattr(request, "user", None)
+    if isinstance(user, SimpleLazyObject) and user._wrapped is empty:
+        return None
+    return user.pk if user is not None and user.is_authenticated else None
+
+
+# ---------------- Routing state ----------------
+class RoutingState:
+    """Per request (or per `use_replica` block outside a request)."""
+    __slots__ = ("replica", "wrote")
+
+    def __init__(self):
+        self.replica = None   # alias reads go to, when set
+        self.wrote = False
+
+
+_state = contextvars.ContextVar("users_db_routing", default=None)
+
+
+@contextlib.contextmanager
+def use_replica(request=None):
+    """
+    Send reads in this block to a replica, unless there are none configured,
+    this request has written or `request`'s user is pinned.
+    """
+    state = _state.get()
+    token = _state.set(RoutingState()) if state is None else None
+    state = _state.get()
+    previous = state.replica
+
+    replicas = replica_aliases()
+    user_id = request_user_id(request) if request is not None else None
+    if replicas and not state.wrote and not (user_id is not None and replica_pins.is_pinned(user_id)):
+        state.replica = previous or random.choice(replicas)
+    try:
+        yield
+    finally:
+        state.replica = previous
+        if token is not None:
+            _state.reset(token)
+
+
+def replica_reads(view_method):
+    """Run a view method (self, request, ...) under `use_replica(request)`."""
+    @functools.wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        with use_replica(request):
+            return view_method(self, request, *args, **kwargs)
+    return wrapper
+
+
+@sync_and_async_middleware
+def replica_routing_middleware(get_response):
+    """
+    Track writes per request so reads after them stay on the primary, and
+    pin the request's user when it wrote.
+    """
+
+    def finish(request, token):
+        if _state.get().wrote:
+            user_id = request_user_id(request)
+            if user_id is not None:
+                replica_pins.pin(user_id)
+        _state.reset(token)
+
+    if iscoroutinefunction(get_response):
+        async def middleware(request):
+            token = _state.set(RoutingState())
+            try:
+                return await get_response(request)
+            finally:
+                finish(request, token)
+    else:
+        def middleware(request):
+            token = _state.set(RoutingState())
+            try:
+                return get_response(request)
+            finally:
+                finish(request, token)
+    return middleware
+
+
+# ---------------- Router ----------------
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _state.get()
+        if state is not None and state.replica and not state.wrote:
+            return state.replica
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        # Never the instance's own alias: rows read from a replica are saved to the primary
+        state = _state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *replica_aliases()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema by replication from the primary
+        return db == DEFAULT_DB_ALIAS
@@ -1,6 +1,15 @@
+from django.db import IntegrityError, transaction
 from rest_framework import serializers
-from .models import CustomUser, College
+from .models import CustomUser, College, ApprovalJob
+from .colleges import get_college_by_code, get_college_for_email, email_matches_college
+from rest_framework_simplejwt.exceptions import AuthenticationFailed
 from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings as jwt_settings
+from .authentication import validate_refresh_token
+from .revocation import advance_token_family, token_family
+from .directory import FIELDS as DIRECTORY_FIELDS
+from .rosters import approve_from_roster, roll_number_taken
 
 
 class CollegeSerializer(serializers.ModelSerializer):
@@ -15,7 +24,7 @@ class RegisterSerializer(serializers.ModelSerializer):
     college_code = serializers.RegexField(
         regex=r'^\d+$',  # one or more digits
         write_only=True,
-        required=True,
+        required=False,   # picked from the email domain when omitted
         error_messages={
             "invalid": "College code must contain only digits (e.g., 092, 1923, 09712)."
         }
@@ -41,35 +50,38 @@ class RegisterSerializer(serializers.ModelSerializer):
         if role in ["student", "alumni"] and not roll_number:
             raise serializers.ValidationError("Roll number is required for Students and Alumni.")
 
-        # College code required for everyone
+        # College code required for everyone, unless the email domain identifies the college
         if not college_code:
-            raise serializers.ValidationError("College code is required for registration.")
+            college = get_college_for_email(attrs.get("email"))
+            if college is None:
+                raise serializers.ValidationError("College code is required for registration.")
+            attrs["college_code"] = college.code
 
         return attrs
 
     def validate_college_code(self, value):
-        if value:
-            try:
-                College.objects.get(code=value)
-            except College.DoesNotExist:
-                raise serializers.ValidationError("Invalid college code.")
+        if value and get_college_by_code(value) is None:
+            raise serializers.ValidationError("Invalid college code.")
         return value
 
     def create(self, validated_data):
         college_code = validated_data.pop('college_code', None)
         roll_number = validated_data.pop('roll_number', None)
 
-        college = None
-        if college_code:
-            college = College.objects.get(code=college_code)
+        college = get_college_by_code(college_code)
 
         password = validated_data.pop('password')
+        # Already hashed off the event loop by the async view
+        password_hash = validated_data.pop('password_hash', None)
         user = CustomUser(**validated_data)
         user.college = college
         if roll_number:
             user.roll_number = roll_number
 
-        user.set_password(password)
+        if password_hash:
+            user.password = password_hash
+        else:
+            user.set_password(password)
 
         # Admin rules
         if user.role == "admin":
@@ -88,27 +100,54 @@ class RegisterSerializer(serializers.ModelSerializer):
 
         # Student / Alumni rules
         elif user.role in ["student", "alumni"]:
-            if college and college.domain and user.email.endswith(f"@{college.domain}"):
-                user.verified = True
-            else:
-                user.verified = False
+            user.verified = email_matches_college(user.email, college)
             user.is_approved = False  # Requires admin approval
             user.is_active = False    # Block login until approved
+            approve_from_roster(user)  # ...unless the college roster lists them
 
-        user.save()
+        try:
+            with transaction.atomic():
+                user.save()
+        except IntegrityError:
+            # Checked only now, to keep it off the common path
+            if roll_number_taken(user):
+                raise serializers.ValidationError({"roll_number": ["This roll number is already registered."]})
+            raise
         return user
 
 
-class LoginSerializer(serializers.Serializer):
+class PrecompiledSerializer(serializers.Serializer):
+    """
+    A Serializer whose fields are built and bound once per class, not deep
+    copied for every instance; that copy is half the cost of validating a
+    login body. Only for flat serializers on hot paths: the shared fields
+    see no instance's context or partial flag.
+    """
+
+    @property
+    def fields(self):
+        cls = type(self)
+        compiled = cls.__dict__.get("_compiled_fields")
+        if compiled is None:
+            # Bound to a blank instance, so no request's data is kept alive
+            compiled = cls._compiled_fields = super(PrecompiledSerializer, cls()).fields
+        return compiled
+
+
+class LoginCredentialsSerializer(PrecompiledSerializer):
+    """Field checks only; the async login view verifies the password itself."""
     email = serializers.EmailField()
     password = serializers.CharField(write_only=True)
 
+
+class LoginSerializer(LoginCredentialsSerializer):
     def validate(self, data):
         email = data.get('email')
         password = data.get('password')
 
         try:
-            user = CustomUser.objects.get(email=email)
+            # The response carries the college code
+            user = CustomUser.objects.select_related('college').get(email=email)
         except CustomUser.DoesNotExist:
             raise serializers.ValidationError("Invalid credentials.")
 
@@ -123,8 +162,82 @@ class LoginSerializer(serializers.Serializer):
         return data
 
 
+class PendingUserSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = CustomUser
+        fields = (
+            'id', 'username', 'email', 'first_name', 'last_name',
+            'role', 'roll_number', 'verified', 'date_joined'
+        )
+        read_only_fields = fields
+
+
+class DirectoryEntrySerializer(serializers.BaseSerializer):
+    """Read-only; takes the dicts from directory_page as they are, with no per-field objects."""
+
+    def to_representation(self, row):
+        return {field: row[field] for field in DIRECTORY_FIELDS}
+
+
+class BulkApproveSerializer(serializers.Serializer):
+    # Omit user_ids to approve everyone currently pending in the college
+    user_ids = serializers.ListField(child=serializers.IntegerField(min_value=1), required=False, allow_empty=False)
+
+
+class RosterUploadSerializer(serializers.Serializer):
+    # The whole roster, replacing the previous one: a JSON list, or a CSV/NDJSON file with a roll_number column
+    roll_numbers = serializers.ListField(child=serializers.CharField(max_length=50, allow_blank=True), required=False)
+    file = serializers.FileField(required=False)
+
+    def validate(self, attrs):
+        if ('roll_numbers' in attrs) == ('file' in attrs):
+            raise serializers.ValidationError("Send either roll_numbers or a roster file.")
+        return attrs
+
+
+class ApprovalJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = ApprovalJob
+        fields = ('id', 'status', 'total', 'approved', 'error', 'created_at', 'updated_at')
+        read_only_fields = fields
+
+
+class RotatingTokenRefreshSerializer(TokenRefreshSerializer):
+    """
+    Checks the revocation store instead of loading the user. On rotation the
+    token's family moves to the next generation, which the old token can't
+    refresh again (see revocation.py).
+    """
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs['refresh'])
+        validate_refresh_token(refresh)
+
+        data = {'access': str(refresh.access_token)}
+        if jwt_settings.ROTATE_REFRESH_TOKENS:
+            family, generation = token_family(refresh)
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            if not advance_token_family(family, generation, refresh['exp']):
+                raise AuthenticationFailed("Token has been revoked.", code="token_revoked")
+            refresh['fam'] = family
+            refresh['gen'] = generation + 1
+            data['refresh'] = str(refresh)
+        return data
+
+
+class LogoutSerializer(PrecompiledSerializer):
+    refresh = serializers.CharField()
+
+
 def get_tokens_for_user(user):
     refresh = RefreshToken.for_user(user)
+    # Claims read by CachedJWTAuthentication so requests don't need the user row
+    refresh['role'] = user.role
+    refresh['college'] = user.college.code if user.college else None
+    refresh['approved'] = user.is_approved
+    refresh['ver'] = user.auth_version
     return {
         'refresh': str(refresh),
         'access': str(refresh.access_token),
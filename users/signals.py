@@ -0,0 +1,38 @@
+from django.db import transaction
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .authentication import invalidate_users
+from .colleges import invalidate_college_cache
+from .metrics import time_queries
+from .models import College, CustomUser
+from .routers import replica_pins
+
+
+@receiver(post_save, sender=College)
+@receiver(post_delete, sender=College)
+def college_changed(sender, **kwargs):
+    # Drop it now for this process and again once the change is visible to others
+    invalidate_college_cache()
+    transaction.on_commit(invalidate_college_cache)
+
+
+@receiver(post_save, sender=CustomUser)
+@receiver(post_delete, sender=CustomUser)
+def user_changed(sender, instance, **kwargs):
+    invalidate_users(instance.pk)
+    transaction.on_commit(lambda: invalidate_users(instance.pk))
+
+
+@receiver(post_save, sender=CustomUser)
+def pin_user_to_primary(sender, instance, **kwargs):
+    # Their own reads skip replicas until the new row has replicated
+    replica_pins.pin(instance.pk)
+
+
+@receiver(connection_created)
+def install_query_timer(sender, connection, **kwargs):
+    # Fires on every (re)connect of the same wrapper, e.g. each pool checkout
+    if time_queries not in connection.execute_wrappers:
+        connection.execute_wrappers.append(time_queries)
@@ -1,3 +1,1989 @@
-from django.test import TestCase
+import asyncio
+import csv
+import datetime
+import importlib
+import io
+import json
+import os
+import runpy
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import mock, skipIf, skipUnless
 
-# Create your tests here.
+import requests as http_requests
+from asgiref.sync import async_to_sync
+from django.apps import apps as django_apps
+from django.contrib.auth.hashers import make_password
+from django.conf import settings
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.http import HttpResponse
+from django.core.management import call_command
+from django.core.handlers.asgi import ASGIHandler
+from django.core.management.base import CommandError
+from django.core.signals import request_finished, request_started
+from django.db import IntegrityError, close_old_connections, connection, connections, router, transaction
+from django.test import (
+    AsyncRequestFactory, RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings,
+)
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework.renderers import JSONRenderer
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from . import accounts, async_views, budgets, google_auth, hashers, identity, idempotency, linkedin, loadtest
+from .metrics import Metrics, metrics, metrics_middleware, render, timed
+from .colleges import CollegeCache, college_cache, get_college_by_code, get_college_for_email, invalidate_college_cache
+from .approvals import run_approval_job
+from .export import export_lines, export_users
+from .importer import AlumniImporter
+from .authentication import CachedJWTAuthentication, user_versions
+from .ratelimit import MemoryBackend, CacheBackend, RateLimiter, parse_rate, reset_rate_limiter
+from .rosters import RosterIndex, roster_index
+from .routers import ReplicaRouter, replica_pins, replica_routing_middleware, use_replica
+from .revocation import (
+    BloomFilter, DatabaseBackend, RevocationStore, advance_token_family, get_revocation_store, reset_revocation_store,
+)
+from .admin import EstimatedCountPaginator
+from .models import ApprovalJob, College, CustomUser, RefreshTokenFamily, RevokedToken
+from .renderers import ORJSONRenderer
+from .serializers import LoginCredentialsSerializer, LoginSerializer, get_tokens_for_user
+
+
+class AuthTestCase(TestCase):
+    """
+    TestCase that starts every test with empty per-process caches; rolled
+    back rows never fire the signals that would otherwise invalidate them.
+    """
+
+    def setUp(self):
+        super().setUp()
+        invalidate_college_cache()
+        user_versions.clear()
+        reset_revocation_store()
+        reset_rate_limiter()
+        replica_pins.clear()
+        idempotency.reset_idempotency_store()
+        roster_index.clear()
+
+
+# ---------------- Local stand-in servers ----------------
+class StubServer:
+    """
+    Serves canned JSON responses from a background thread.
+
+    `routes` maps a path to a callable returning (status, body, headers);
+    `delays` maps a path to seconds to sleep before answering.
+    """
+
+    def __init__(self, routes, delays=None):
+        self.routes = routes
+        self.delays = delays or {}
+        self.hits = {}
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def do_GET(self):
+                path = self.path.split("?")[0]
+                stub.hits[path] = stub.hits.get(path, 0) + 1
+                time.sleep(stub.delays.get(path, 0))
+                status, body, headers = stub.routes[path](self)
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.server.handle_error = lambda request, address: None  # clients may hang up on delayed routes
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    def url(self, path):
+        return f"http://127.0.0.1:{self.server.server_port}{path}"
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class GoogleSigner(loadtest.GoogleSigner):
+    """Serves its certificates through StubServer."""
+
+    def certs_route(self, max_age=3600):
+        return lambda handler: (200, self.certs, {"Cache-Control": f"public, max-age={max_age}"})
+
+
+# ---------------- Google certificate cache ----------------
+class GoogleCertCacheTests(SimpleTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.signer = GoogleSigner()
+
+    def test_warm_cache_makes_no_fetches(self):
+        with StubServer({"/certs": self.signer.certs_route()}) as stub:
+            verifier = google_auth.GoogleTokenVerifier(audience="client-id", certs_url=stub.url("/certs"))
+            token = self.signer.token("client-id")
+            self.assertEqual(verifier.verify(token)["sub"], "1234567890")
+            for _ in range(20):
+                verifier.verify(token)
+            verifier.request.close()
+        self.assertEqual(stub.hits["/certs"], 1)
+
+    def test_refreshes_in_background_before_expiry(self):
+        with StubServer({"/certs": self.signer.certs_route(max_age=2)}) as stub:
+            request = google_auth.CachedCertsRequest(refresh_margin=1.5)
+            verifier = google_auth.GoogleTokenVerifier(
+                audience="client-id", certs_url=stub.url("/certs"), request=request)
+            token = self.signer.token("client-id")
+            verifier.verify(token)
+            time.sleep(1.5)
+            self.assertEqual(stub.hits["/certs"], 2)
+            verifier.verify(token)
+            request.close()
+        self.assertEqual(stub.hits["/certs"], 2)
+
+    def test_wrong_audience_and_issuer_raise_value_error(self):
+        with StubServer({"/certs": self.signer.certs_route()}) as stub:
+            verifier = google_auth.GoogleTokenVerifier(audience="client-id", certs_url=stub.url("/certs"))
+            with self.assertRaises(ValueError):
+                verifier.verify(self.signer.token("someone-else"))
+            with self.assertRaises(ValueError):
+                verifier.verify(self.signer.token("client-id", iss="https://evil.example.com"))
+            verifier.request.close()
+
+    def test_cache_lifetime_honours_age(self):
+        headers = {"Cache-Control": "public, max-age=600, must-revalidate", "Age": "100"}
+        self.assertEqual(google_auth.cache_lifetime(headers, 5), 500)
+        self.assertEqual(google_auth.cache_lifetime({}, 5), 5)
+
+
+class GoogleAuthViewTests(AuthTestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.signer = GoogleSigner()
+
+    def tearDown(self):
+        google_auth.reset_google_verifier()
+
+    def test_sign_ins_share_cached_certs(self):
+        college = College.objects.create(name="Test College", code="101", domain="example.com")
+        CustomUser.objects.create(
+            username="student", email="student@example.com", role="student",
+            college=college, is_approved=True,
+        )
+        CustomUser.objects.update(is_active=True)
+        with StubServer({"/certs": self.signer.certs_route()}) as stub:
+            with override_settings(GOOGLE_CLIENT_ID="client-id", GOOGLE_CERTS_URL=stub.url("/certs")):
+                google_auth.reset_google_verifier()
+                token = self.signer.token("client-id")
+                for _ in range(5):
+                    response = self.client.post("/api/auth/social/google/", {"id_token": token}, content_type="application/json")
+                    self.assertEqual(response.status_code, 200)
+                    self.assertIn("tokens", response.json())
+        self.assertEqual(stub.hits["/certs"], 1)
+
+    def test_workers_fetch_certs_before_the_first_sign_in(self):
+        post_worker_init = runpy.run_path(os.path.join(settings.BASE_DIR, "gunicorn.conf.py"))["post_worker_init"]
+        with StubServer({"/certs": self.signer.certs_route()}) as stub:
+            with override_settings(GOOGLE_CLIENT_ID="client-id", GOOGLE_CERTS_URL=stub.url("/certs")):
+                google_auth.reset_google_verifier()
+                post_worker_init(None)
+                next(t for t in threading.enumerate() if t.name == "warm-google-certs").join(5)
+                self.assertEqual(stub.hits["/certs"], 1)
+                self.assertTrue(google_auth.get_google_verifier().request.is_fresh(stub.url("/certs")))
+
+    def test_failed_prefetch_is_logged(self):
+        with override_settings(GOOGLE_CLIENT_ID="client-id", GOOGLE_CERTS_URL="http://127.0.0.1:9/certs"):
+            google_auth.reset_google_verifier()
+            with self.assertLogs("users.google_auth", "WARNING"):
+                google_auth.warm_google_verifier()
+
+
+# ---------------- LinkedIn client ----------------
+def linkedin_routes(linkedin_id="li-1", email="alum@example.com"):
+    return {
+        "/v2/me": lambda h: (200, {"id": linkedin_id, "localizedFirstName": "Ada", "localizedLastName": "L"}, {}),
+        "/v2/emailAddress": lambda h: (200, {"elements": [{"handle~": {"emailAddress": email}}]}, {}),
+    }
+
+
+class LinkedInClientTests(SimpleTestCase):
+    def test_lookups_run_concurrently(self):
+        with StubServer(linkedin_routes(), delays={"/v2/me": 0.4, "/v2/emailAddress": 0.4}) as stub:
+            client = linkedin.LinkedInClient(base_url=stub.url(""), timeout=2)
+            started = time.monotonic()
+            p_resp, e_resp = client.fetch_profile_and_email("token")
+            elapsed = time.monotonic() - started
+        self.assertEqual(p_resp.json()["id"], "li-1")
+        self.assertEqual(e_resp.json()["elements"][0]["handle~"]["emailAddress"], "alum@example.com")
+        self.assertLess(elapsed, 0.7)
+
+    def test_deadline_and_breaker(self):
+        with StubServer(linkedin_routes(), delays={"/v2/me": 0.5}) as stub:
+            breaker = linkedin.CircuitBreaker(failure_threshold=2, reset_timeout=60)
+            client = linkedin.LinkedInClient(base_url=stub.url(""), timeout=0.1, breaker=breaker)
+            for _ in range(2):
+                with self.assertRaises(linkedin.LinkedInUnavailable):
+                    client.fetch_profile_and_email("token")
+            self.assertTrue(breaker.is_open)
+
+            hits = dict(stub.hits)
+            started = time.monotonic()
+            with self.assertRaises(linkedin.LinkedInUnavailable):
+                client.fetch_profile_and_email("token")
+            self.assertLess(time.monotonic() - started, 0.05)
+            self.assertEqual(stub.hits, hits)
+
+    def test_breaker_half_open_trial(self):
+        breaker = linkedin.CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+        self.assertTrue(breaker.allow())
+        self.assertFalse(breaker.allow())
+        breaker.record_success()
+        self.assertFalse(breaker.is_open)
+
+    def test_unexpected_error_ends_the_trial(self):
+        breaker = linkedin.CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+        client = linkedin.LinkedInClient(base_url="http://linkedin.invalid", breaker=breaker)
+        with mock.patch.object(client, "_get", side_effect=ValueError("bad header")):
+            with self.assertRaises(ValueError):
+                client.fetch_profile_and_email("token")
+        client.executor.shutdown(wait=False)
+        self.assertEqual(breaker.failures, 1)
+        self.assertTrue(breaker.allow())
+
+    def test_lookups_share_the_deadline(self):
+        with StubServer(linkedin_routes(), delays={"/v2/me": 1}) as stub:
+            client = linkedin.LinkedInClient(base_url=stub.url(""), timeout=5)
+            started = time.monotonic()
+            with self.assertRaises(http_requests.Timeout):
+                client._get(linkedin.PROFILE_PATH, {}, deadline=started + 0.2)
+            self.assertLess(time.monotonic() - started, 0.5)
+            # A lookup that only gets a thread after the deadline isn't sent
+            with self.assertRaises(http_requests.Timeout):
+                client._get(linkedin.EMAIL_PATH, {}, deadline=time.monotonic())
+            client.executor.shutdown(wait=False)
+        self.assertNotIn("/v2/emailAddress", stub.hits)
+
+
+class LinkedInAuthViewTests(AuthTestCase):
+    def tearDown(self):
+        linkedin.reset_linkedin_client()
+
+    def test_first_login_creates_pending_user(self):
+        College.objects.create(name="Test College", code="101", domain="example.com")
+        with StubServer(linkedin_routes()) as stub:
+            with override_settings(LINKEDIN_API_URL=stub.url("")):
+                linkedin.reset_linkedin_client()
+                response = self.client.post(
+                    "/api/auth/social/linkedin/",
+                    {"access_token": "token", "role": "alumni", "college_code": "101", "roll_number": "A1"},
+                    content_type="application/json",
+                )
+        self.assertEqual(response.status_code, 200)
+        user = CustomUser.objects.get(linkedin_id="li-1")
+        self.assertTrue(user.verified)
+        self.assertFalse(user.is_approved)
+
+
+# ---------------- Identity indexes ----------------
+class IdentityConstraintTests(AuthTestCase):
+    def test_provider_ids_unique_when_set(self):
+        CustomUser.objects.create(username="a", email="a@example.com")
+        CustomUser.objects.create(username="b", email="b@example.com")  # many NULL ids are fine
+        CustomUser.objects.create(username="c", email="c@example.com", google_sub="g1", linkedin_id="l1")
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            CustomUser.objects.create(username="d", email="d@example.com", google_sub="g1")
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            CustomUser.objects.create(username="e", email="e@example.com", linkedin_id="l1")
+
+
+
+class SocialIdentityTests(AuthTestCase):
+    def setUp(self):
+        super().setUp()
+        self.college = College.objects.create(name="Test College", code="101", domain="example.com")
+
+    def login(self, sub, email, roll_number="R1"):
+        return accounts.social_login("google_sub", sub, email, "student", "101", roll_number, first_name="Ada")
+
+    def test_resolved_in_one_query_preferring_provider_id(self):
+        by_email = CustomUser.objects.create(username="a", email="ada@example.com")
+        by_sub = CustomUser.objects.create(username="b", email="other@example.com", google_sub="g-1")
+        with self.assertNumQueries(1):
+            self.assertEqual(identity.resolve_user("google_sub", "g-1", "ada@example.com"), by_sub)
+        with self.assertNumQueries(1):
+            self.assertEqual(identity.resolve_user("google_sub", "g-2", "ada@example.com"), by_email)
+
+    def test_links_provider_to_account_found_by_email(self):
+        user = CustomUser.objects.create(username="a", email="ada@example.com")
+        self.login("g-1", "ada@example.com")
+        user.refresh_from_db()
+        self.assertEqual(user.google_sub, "g-1")
+        self.assertEqual(CustomUser.objects.count(), 1)
+
+    def test_shared_local_part_gets_distinct_usernames(self):
+        for sub, email, roll_number in (("g-1", "ada@example.com", "R1"), ("g-2", "ada@other.edu", "R2")):
+            _, code = self.login(sub, email, roll_number)
+            self.assertEqual(code, 200)
+        usernames = set(CustomUser.objects.values_list("username", flat=True))
+        self.assertEqual(len(usernames), 2)
+        self.assertTrue(all(name.startswith("ada-") for name in usernames))
+
+    def test_losing_a_creation_race_returns_the_winner(self):
+        winner = CustomUser.objects.create(username="w", email="ada@example.com", google_sub="g-1")
+        # The lookup ran before the concurrent request inserted its row
+        with mock.patch.object(accounts, "resolve_user", return_value=None):
+            _, code = self.login("g-1", "ada@example.com")
+        self.assertEqual(code, 200)
+        self.assertEqual(list(CustomUser.objects.all()), [winner])
+
+
+@skipIf(connection.vendor == "sqlite", "SQLite locks the whole database for concurrent writers")
+class ConcurrentSocialLoginTests(TransactionTestCase):
+    def test_simultaneous_first_logins_create_one_user(self):
+        College.objects.create(name="Test College", code="101", domain="example.com")
+        invalidate_college_cache()
+        threads, barrier, results = 12, threading.Barrier(12), []
+
+        def first_login():
+            try:
+                barrier.wait()
+                results.append(accounts.social_login(
+                    "linkedin_id", "li-race", "race@example.com", "alumni", "101", "R1",
+                ))
+            finally:
+                connection.close()
+
+        workers = [threading.Thread(target=first_login) for _ in range(threads)]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        self.assertEqual([code for _, code in results], [200] * threads)
+        self.assertEqual(CustomUser.objects.filter(email="race@example.com").count(), 1)
+        self.assertEqual(CustomUser.objects.get(linkedin_id="li-race").email, "race@example.com")
+
+# ---------------- College cache ----------------
+def college_queries(queries):
+    return [q["sql"] for q in queries if "users_college" in q["sql"] and "INSERT" not in q["sql"]]
+
+
+class CollegeCacheTests(AuthTestCase):
+    def setUp(self):
+        super().setUp()
+        self.college = College.objects.create(name="Test College", code="101", domain="example.com")
+
+    def test_warm_registration_makes_no_college_queries(self):
+        get_college_by_code("101")
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post("/api/auth/register/", {
+                "username": "stud", "email": "stud@example.com", "password": "s3cret-pass",
+                "role": "student", "college_code": "101", "roll_number": "R1",
+            }, content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(college_queries(ctx.captured_queries), [])
+        self.assertEqual(CustomUser.objects.get(email="stud@example.com").college, self.college)
+
+    def test_signals_invalidate(self):
+        self.assertEqual(get_college_by_code("101").name, "Test College")
+        self.college.name = "Renamed"
+        self.college.save()
+        self.assertEqual(get_college_by_code("101").name, "Renamed")
+        self.college.delete()
+        self.assertIsNone(get_college_by_code("101"))
+
+    @override_settings(COLLEGE_CACHE_ALIAS="default")
+    def test_shared_generation_reloads_other_workers(self):
+        get_college_by_code("101")
+        # Another worker renames the college: its signal bumps the shared generation
+        College.objects.filter(pk=self.college.pk).update(name="Elsewhere")
+        caches["default"].set("users:college-cache:generation", "other-worker")
+        self.assertEqual(get_college_by_code("101").name, "Elsewhere")
+        with self.assertNumQueries(0):
+            college_cache.by_code("101")
+
+    def test_other_workers_reload_after_ttl(self):
+        this_worker, other_worker = CollegeCache(), CollegeCache()
+        other_worker.by_code("101")
+        # This worker logs the college out; no signal reaches the other one
+        College.objects.filter(pk=self.college.pk).update(sessions_revoked_at=timezone.now())
+        this_worker.invalidate()
+        self.assertIsNotNone(this_worker.by_code("101").sessions_revoked_at)
+        with self.assertNumQueries(0):
+            self.assertIsNone(other_worker.by_code("101").sessions_revoked_at)
+        later = time.monotonic() + settings.COLLEGE_CACHE_TTL + 1
+        with mock.patch("users.colleges.time.monotonic", return_value=later):
+            self.assertIsNotNone(other_worker.by_code("101").sessions_revoked_at)
+
+
+# ---------------- Email domain index ----------------
+class CollegeDomainIndexTests(AuthTestCase):
+    def setUp(self):
+        super().setUp()
+        self.iitd = College.objects.create(name="IIT Delhi", code="201", domain="iitd.ac.in")
+        self.cse = College.objects.create(name="IIT Delhi CSE", code="202", domain="cse.iitd.ac.in")
+
+    def test_longest_suffix_wins(self):
+        self.assertEqual(get_college_for_email("a@iitd.ac.in"), self.iitd)
+        self.assertEqual(get_college_for_email("a@EE.IITD.ac.in"), self.iitd)
+        self.assertEqual(get_college_for_email("a@x.cse.iitd.ac.in"), self.cse)
+        self.assertIsNone(get_college_for_email("a@notiitd.ac.in"))
+        self.assertIsNone(get_college_for_email("a@ac.in"))
+        with self.assertNumQueries(0):
+            get_college_for_email("a@cs.iitd.ac.in")
+
+    def test_registration_picks_college_from_email(self):
+        response = self.client.post("/api/auth/register/", {
+            "username": "stud", "email": "stud@ee.iitd.ac.in", "password": "s3cret-pass",
+            "role": "student", "roll_number": "R1",
+        }, content_type="application/json")
+        self.assertEqual(response.status_code, 201)
+        user = CustomUser.objects.get(username="stud")
+        self.assertEqual(user.college, self.iitd)
+        self.assertTrue(user.verified)
+
+    def test_registration_without_code_or_known_domain_fails(self):
+        response = self.client.post("/api/auth/register/", {
+            "username": "stud", "email": "stud@gmail.com", "password": "s3cret-pass",
+            "role": "student", "roll_number": "R1",
+        }, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+
+# ---------------- Bulk alumni import ----------------
+class ImportAlumniTests(AuthTestCase):
+    def setUp(self):
+        super().setUp()
+        self.college = College.objects.create(name="Test College", code="101", domain="example.com")
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+
+    def write(self, name, text):
+        path = os.path.join(self.tmp.name, name)
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def test_csv_import_with_rejects(self):
+        path = self.write("roster.csv", (
+            "email,roll_number,first_name,password\n"
+            "a@example.com,R1,Ann,s3cret-pass\n"
+            "b@example.com,R2,Bob,\n"
+            "not-an-email,R3,Cat,\n"
+            "a@example.com,R4,Dup,\n"
+            "d@example.com,,Dan,\n"
+        ))
+        out = io.StringIO()
+        call_command("import_alumni", path, "--college", "101", "--workers", "2", "--batch-size", "2", stdout=out)
+        self.assertIn("Imported 2 users, rejected 3", out.getvalue())
+        self.assertIn("rows/sec", out.getvalue())
+
+        ann = CustomUser.objects.get(email="a@example.com")
+        self.assertTrue(ann.check_password("s3cret-pass"))
+        self.assertTrue(ann.is_approved and ann.is_active and ann.verified)
+        self.assertFalse(CustomUser.objects.get(email="b@example.com").has_usable_password())
+
+        with open(f"{path}.rejects.ndjson") as f:
+            rejects = [json.loads(line) for line in f]
+        self.assertEqual([r["row"] for r in rejects], [3, 4, 5])
+        self.assertFalse(os.path.exists(f"{path}.checkpoint"))
+
+    def test_resume_from_checkpoint(self):
+        path = self.write("roster.ndjson", "".join(
+            json.dumps({"email": f"u{i}@example.com", "roll_number": f"R{i}"}) + "\n" for i in range(5)
+        ))
+        self.write("roster.ndjson.checkpoint", json.dumps({"rows_done": 3}))
+        out = io.StringIO()
+        call_command("import_alumni", path, "--college", "101", "--workers", "1", stdout=out)
+        self.assertIn("Resumed after 3 rows", out.getvalue())
+        self.assertEqual(
+            sorted(CustomUser.objects.values_list("email", flat=True)),
+            ["u3@example.com", "u4@example.com"],
+        )
+
+    def import_ndjson(self, lines):
+        path = self.write("roster.ndjson", "\n".join(lines) + "\n")
+        out = io.StringIO()
+        call_command("import_alumni", path, "--college", "101", "--workers", "1", "--batch-size", "2", stdout=out)
+        with open(f"{path}.rejects.ndjson") as f:
+            return out.getvalue(), [json.loads(line) for line in f]
+
+    def test_malformed_json_line_is_rejected(self):
+        out, rejects = self.import_ndjson([
+            '{"email": "a@example.com", "roll_number": "R1"}', '{"email": "b@example.com",', '{"email": "c@example.com", "roll_number": "R3"}',
+        ])
+        self.assertIn("Imported 2 users, rejected 1", out)
+        self.assertEqual((rejects[0]["row"], rejects[0]["data"]), (2, '{"email": "b@example.com",'))
+        self.assertIn("Invalid JSON", rejects[0]["error"])
+
+    def test_line_that_is_not_an_object_is_rejected(self):
+        out, rejects = self.import_ndjson(['[1, 2]', '{"email": "a@example.com", "roll_number": "R1"}'])
+        self.assertIn("Imported 1 users, rejected 1", out)
+        self.assertEqual(rejects, [{"row": 1, "error": "Row is not a JSON object.", "data": "[1, 2]"}])
+
+    def test_numbers_are_read_as_text(self):
+        out, rejects = self.import_ndjson([
+            '{"email": "a@example.com", "roll_number": 1001, "phone": 5550100}',
+            '{"email": "b@example.com", "roll_number": ["R2"]}',
+        ])
+        self.assertIn("Imported 1 users, rejected 1", out)
+        self.assertEqual(CustomUser.objects.get(email="a@example.com").roll_number, "1001")
+        self.assertEqual(rejects[0]["error"], "roll_number must be text.")
+
+    def test_over_long_username_is_rejected(self):
+        long_email = json.dumps("a" * 150 + "@example.com")
+        out, rejects = self.import_ndjson([
+            f'{{"email": {long_email}, "roll_number": "R1"}}', '{"email": "b@example.com", "roll_number": "R2"}',
+        ])
+        self.assertIn("Imported 1 users, rejected 1", out)
+        self.assertEqual(rejects[0]["error"], "username is longer than 150 characters.")
+
+    def test_admin_upload(self):
+        admin_user = CustomUser.objects.create_superuser("root", "root@example.com", "pw", role="admin")
+        self.client.force_login(admin_user)
+        self.assertContains(self.client.get("/admin/users/customuser/"), "Import alumni")
+        self.assertContains(self.client.get("/admin/users/customuser/import/"), "roll_number")
+        roster = SimpleUploadedFile("roster.csv", b"email,roll_number,role\nx@example.com,R9,student\n")
+        response = self.client.post("/admin/users/customuser/import/", {
+            "roster": roster, "college": self.college.pk, "pending": "on",
+        })
+        self.assertEqual(response.status_code, 302)
+        user = CustomUser.objects.get(email="x@example.com")
+        self.assertEqual(user.role, "student")
+        self.assertFalse(user.is_approved)
+
+
+# ---------------- Approvals API ----------------
+@override_settings(APPROVAL_JOBS_ASYNC=False)
+class ApprovalsAPITests(AuthTestCase):
+    def setUp(self):
+        super().setUp()
+        self.college = College.objects.create(name="Test College", code="101", domain="example.com")
+        other = College.objects.create(name="Other College", code="102", domain="other.com")
+        self.admin = CustomUser.objects.create(
+            username="admin", email="admin@example.com", role="admin", college=self.college,
+        )
+        for i in range(7):
+            CustomUser.objects.create(
+                username=f"s{i}", email=f"s{i}@example.com", college=self.college,
+                role="student" if i % 2 else "alumni", roll_number=f"R{i}",
+            )
+        CustomUser.objects.create(username="x", email="x@other.com", college=other, role="student")
+        token = get_tokens_for_user(self.admin)["access"]
+        self.auth = {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+
+    def test_keyset_pages_cover_queue_once(self):
+        self.client.get("/api/approvals/pending/?limit=1", **self.auth)  # warm user and college caches
+        seen, cursor = [], None
+        while True:
+            url = "/api/approvals/pending/?limit=3" + (f"&cursor={cursor}" if cursor else "")
+            with self.assertNumQueries(1):  # just the page
+                body = self.client.get(url, **self.auth).json()
+            seen += [row["email"] for row in body["results"]]
+            cursor = body["next_cursor"]
+            if cursor is None:
+                break
+        self.assertEqual(seen, [f"s{i}@example.com" for i in range(7)])
+
+    def test_requires_college_admin(self):
+        student = CustomUser.objects.get(username="s1")
+        token = get_tokens_for_user(student)["access"]
+        response = self.client.get("/api/approvals/pending/", HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.assertIn(response.status_code, (401, 403))
+
+    def test_bulk_approve_all_in_batches(self):
+        with self.captureOnCommitCallbacks(execute=True), override_settings(APPROVAL_BATCH_SIZE=2):
+            response = self.client.post("/api/approvals/bulk/", {}, content_type="application/json", **self.auth)
+        self.assertEqual(response.status_code, 202)
+        job_id = response.json()["id"]
+
+        body = self.client.get(f"/api/approvals/jobs/{job_id}/", **self.auth).json()
+        self.assertEqual((body["status"], body["total"], body["approved"]), ("done", 7, 7))
+        self.assertEqual(CustomUser.objects.filter(college=self.college, is_approved=False).count(), 0)
+        self.assertFalse(CustomUser.objects.get(username="x").is_approved)
+
+    def test_bulk_approve_selected_and_resume(self):
+        ids = list(CustomUser.objects.filter(username__in=["s0", "s1", "s2", "x"]).values_list("id", flat=True))
+        response = self.client.post("/api/approvals/bulk/", {"user_ids": ids}, content_type="application/json", **self.auth)
+        job = ApprovalJob.objects.get(pk=response.json()["id"])
+        self.assertEqual((job.status, job.total), ("queued", 3))
+
+        run_approval_job(job.pk, batch_size=1)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.approved), ("done", 3))
+        self.assertEqual(
+            sorted(CustomUser.objects.filter(is_approved=True, role__in=["student", "alumni"]).values_list("username", flat=True)),
+            ["s0", "s1", "s2"],
+        )
+
+
+
+# ---------------- Rosters ----------------
+@override_settings(APPROVAL_JOBS_ASYNC=False)
+class RosterTests(AuthTestCase):
+    def setUp(self):
+        super().setUp()
+        self.college = College.objects.create(name="Test College", code="101", domain="example.com")
+        self.other = College.objects.create(name="Other College", code="102", domain="other.com")
+        admin = CustomUser.objects.create(username="admin", email="admin@example.com", role="admin", college=self.college)
+        self.auth = {"HTTP_AUTHORIZATION": f"Bearer {get_tokens_for_user(admin)['access']}"}
+
+    def upload(self, roll_numbers):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(
+                "/api/college/roster/", {"roll_numbers": roll_numbers}, content_type="application/json", **self.auth,
+            )
+
+    def register(self, email, roll_number, college_code="101"):
+        return self.client.post("/api/auth/register/", {
+            "username": email.split("@")[0], "email": email, "password": "secret-pw",
+            "role": "student", "college_code": college_code, "roll_number": roll_number,
+        }, content_type="application/json")
+
+    def test_listed_registrations_are_approved(self):
+        self.assertEqual(self.upload(["CS-001", " cs-002 ", "CS-001", ""]).json()["roll_numbers"], 2)
+        response = self.register("ada@example.com", "cs-001")
+        self.assertEqual(response.status_code, 201)
+        self.assertIn("tokens", response.json())
+        self.assertNotIn("tokens", self.register("bob@example.com", "CS-999").json())
+        self.assertNotIn("tokens", self.register("cy@other.com", "CS-002", college_code="102").json())
+        user = CustomUser.objects.get(email="ada@example.com")
+        self.assertTrue(user.is_approved and user.is_active)
+
+    def test_upload_approves_pending_users(self):
+        self.register("ada@example.com", "CS-001")
+        self.register("bob@example.com", "CS-002")
+        body = self.upload(["cs-001"]).json()
+        self.assertEqual(body["approval_job"]["total"], 1)
+        self.assertEqual(
+            list(CustomUser.objects.filter(role="student", is_approved=True).values_list("email", flat=True)),
+            ["ada@example.com"],
+        )
+
+    def test_index_is_reloaded_after_an_upload(self):
+        self.upload(["CS-001"])
+        college = get_college_by_code("101")
+        with self.assertNumQueries(1):
+            self.assertTrue(roster_index.contains(college, "CS-001"))
+        with self.assertNumQueries(0):
+            self.assertFalse(roster_index.contains(college, "CS-002"))
+        self.upload(["CS-002"])
+        college = get_college_by_code("101")
+        self.assertTrue(roster_index.contains(college, "CS-002"))
+        self.assertFalse(roster_index.contains(college, "CS-001"))
+
+    def test_other_workers_see_an_upload_within_the_college_cache_ttl(self):
+        other_colleges, other_rosters = CollegeCache(), RosterIndex()
+        self.assertFalse(other_rosters.contains(other_colleges.by_code("101"), "CS-001"))
+        self.upload(["CS-001"])   # in this worker
+        self.assertTrue(roster_index.contains(get_college_by_code("101"), "CS-001"))
+        self.assertFalse(other_rosters.contains(other_colleges.by_code("101"), "CS-001"))
+        later = time.monotonic() + settings.COLLEGE_CACHE_TTL + 1
+        with mock.patch("users.colleges.time.monotonic", return_value=later):
+            self.assertTrue(other_rosters.contains(other_colleges.by_code("101"), "CS-001"))
+
+    def test_roster_file(self):
+        roster = SimpleUploadedFile("roster.csv", b"email,roll_number\na@example.com,CS-001\nb@example.com,CS-002\n")
+        response = self.client.post("/api/college/roster/", {"file": roster}, **self.auth)
+        self.assertEqual(response.json(), {"roll_numbers": 2, "approval_job": None})
+        self.assertEqual(self.client.post("/api/college/roster/", {}, **self.auth).status_code, 400)
+
+    def test_roll_numbers_are_unique_per_college(self):
+        self.assertEqual(self.register("ada@example.com", "CS-001").status_code, 201)
+        response = self.register("bob@example.com", "cs-001")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("roll_number", response.json())
+        self.assertEqual(self.register("cy@other.com", "CS-001", college_code="102").status_code, 201)
+
+        _, code = accounts.social_login("google_sub", "g-1", "dee@example.com", "alumni", "101", "CS-001")
+        self.assertEqual(code, 400)
+        result = AlumniImporter(college=self.college).run([
+            {"email": "eve@example.com", "roll_number": "CS-001"},
+            {"email": "fay@example.com", "roll_number": "CS-003"},
+            {"email": "gus@example.com", "roll_number": "cs-003"},
+        ])
+        self.assertEqual((result.created, result.rejected), (1, 2))
+
+    def test_migration_stops_on_duplicate_roll_numbers(self):
+        check = importlib.import_module("users.migrations.0008_unique_college_roll_number").check_duplicate_roll_numbers
+        schema_editor = mock.Mock(connection=connection)
+        # As the table was before the constraint; the test's transaction puts the index back
+        with connection.cursor() as cursor:
+            cursor.execute('DROP INDEX "users_unique_college_roll_number"')
+        for username, roll_number in (("ada", "CS-001"), ("bob", "cs-001"), ("cy", "CS-002")):
+            CustomUser.objects.create(username=username, email=f"{username}@example.com", college=self.college, roll_number=roll_number)
+        with self.assertRaises(RuntimeError) as raised:
+            check(django_apps, schema_editor)
+        ids = CustomUser.objects.filter(username__in=("ada", "bob")).order_by("id").values_list("id", flat=True)
+        self.assertIn(f"college {self.college.pk}, roll number 'cs-001': users {ids[0]}, {ids[1]}", str(raised.exception))
+        self.assertNotIn("cs-002", str(raised.exception))
+
+        CustomUser.objects.filter(username="bob").update(roll_number="CS-003")
+        check(django_apps, schema_editor)
+
+# ---------------- User admin ----------------
+class UserAdminQueryTests(AuthTestCase):
+    def setUp(self):
+        super().setUp()
+        self.colleges = [
+            College.objects.create(name=f"College {i}", code=str(100 + i), domain=f"c{i}.edu") for i in range(3)
+        ]
+        self.root = CustomUser.objects.create_superuser("root", "root@example.com", "pw", role="admin")
+        self.client.force_login(self.root)
+
+    def add_users(self, n, start=0):
+        for i in range(start, start + n):
+            CustomUser.objects.create(
+                username=f"u{i}", email=f"u{i}@c{i % 3}.edu", college=self.colleges[i % 3], roll_number=f"R{i}",
+            )
+
+    def changelist_queries(self, url="/admin/users/customuser/"):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response, ctx.captured_queries
+
+    def test_query_count_independent_of_rows(self):
+        self.add_users(5)
+        _, small = self.changelist_queries()
+        self.add_users(40, start=5)
+        response, large = self.changelist_queries()
+        self.assertEqual(len(small), len(large))
+        self.assertContains(response, "u44")
+        college_lookups = [q for q in large if 'FROM "users_college"' in q["sql"]]
+        self.assertEqual(college_lookups, [])
+
+    def test_college_filter_by_code_or_label(self):
+        self.add_users(6)
+        for value in ("101", "College 1 (101)"):
+            response, _ = self.changelist_queries(f"/admin/users/customuser/?college_code={value}")
+            self.assertEqual(response.context["cl"].result_count, 2)
+
+    def test_bounded_count(self):
+        self.add_users(12)
+        paginator = EstimatedCountPaginator(CustomUser.objects.order_by("id"), 5)
+        paginator.exact_limit = 5
+        if connection.vendor == "postgresql":
+            self.assertGreaterEqual(paginator.count, 5)   # planner estimate, at least the bounded count
+        else:
+            self.assertEqual(paginator.count, 13)  # other databases fall back to an exact count
+        paginator = EstimatedCountPaginator(CustomUser.objects.filter(college=self.colleges[0]).order_by("id"), 5)
+        self.assertEqual(paginator.count, 4)
+
+    @override_settings(APPROVAL_BATCH_SIZE=4)
+    def test_approve_action_runs_in_batches(self):
+        self.add_users(10)
+        CustomUser.objects.filter(username="u0").update(is_approved=True)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post("/admin/users/customuser/", {
+                "action": "approve_users", "select_across": "1", "index": "0",
+                "_selected_action": CustomUser.objects.values_list("id", flat=True)[:1],
+            })
+        self.assertEqual(response.status_code, 302)
+        self.assertFalse(CustomUser.objects.filter(is_approved=False).exists())
+        updates = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith('UPDATE "users_customuser"')]
+        self.assertEqual(len(updates), 3)   # the 9 pending users, 4 at a time
+
+
+# ---------------- Cached JWT authentication ----------------
+@override_settings(APPROVAL_JOBS_ASYNC=False)
+class CachedJWTAuthenticationTests(AuthTestCase):
+    def setUp(self):
+        super().setUp()
+        self.college = College.objects.create(name="Test College", code="101", domain="example.com")
+        self.admin = CustomUser.objects.create(
+            username="admin", email="admin@example.com", role="admin", college=self.college,
+        )
+
+    def get(self, token):
+        return self.client.get("/api/approvals/pending/", HTTP_AUTHORIZATION=f"Bearer {token}")
+
+    def test_warm_requests_skip_user_row(self):
+        token = get_tokens_for_user(self.admin)["access"]
+        self.assertEqual(self.get(token).status_code, 200)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.get(token).status_code, 200)
+        self.assertFalse([q for q in ctx.captured_queries if '"users_customuser"."id" = ' in q["sql"]])
+
+    def test_role_change_rejects_old_tokens(self):
+        token = get_tokens_for_user(self.admin)["access"]
+        self.assertEqual(self.get(token).status_code, 200)
+        self.admin.role = "alumni"
+        self.admin.save()
+        response = self.get(token)
+        self.assertEqual(response.status_code, 401)
+        self.assertEqual(response.json()["code"], "token_stale")
+
+    def test_unrelated_save_keeps_tokens(self):
+        token = get_tokens_for_user(self.admin)["access"]
+        self.admin.phone = "12345"
+        self.admin.save()
+        self.assertEqual(self.get(token).status_code, 200)
+
+    def test_bulk_approval_bumps_version(self):
+        student = CustomUser.objects.create(
+            username="s", email="s@example.com", role="student", college=self.college, roll_number="R1",
+        )
+        before = student.auth_version
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(
+                "/api/approvals/bulk/", {}, content_type="application/json",
+                HTTP_AUTHORIZATION=f"Bearer {get_tokens_for_user(self.admin)['access']}",
+            )
+        student.refresh_from_db()
+        self.assertTrue(student.is_approved)
+        self.assertEqual(student.auth_version, before + 1)
+
+    def test_claims_user_loads_other_fields_lazily(self):
+        token = AccessToken(get_tokens_for_user(self.admin)["access"])
+        user = CachedJWTAuthentication().get_user(token)
+        with self.assertNumQueries(0):
+            self.assertEqual((user.role, user.college_id, user.is_approved), ("admin", self.college.pk, True))
+        self.assertEqual(user.email, "admin@example.com")
+
+
+# ---------------- Token revocation ----------------
+class BloomFilterTests(SimpleTestCase):
+    def test_no_false_negatives_and_few_false_positives(self):
+        bloom = BloomFilter(1000, error_rate=0.01)
+        for i in range(1000):
+            bloom.add(f"jti-{i}")
+        self.assertTrue(all(f"jti-{i}" in bloom for i in range(1000)))
+        false_positives = sum(f"other-{i}" in bloom for i in range(10000))
+        self.assertLess(false_positives, 300)
+
+
+class TokenRevocationTests(AuthTestCase):
+    def setUp(self):
+        super().setUp()
+        self.college = College.objects.create(name="Test College", code="101", domain="example.com")
+        self.admin = CustomUser.objects.create(
+            username="admin", email="admin@example.com", role="admin", college=self.college,
+        )
+        self.tokens = get_tokens_for_user(self.admin)
+
+    def refresh(self, token):
+        return self.client.post("/api/auth/token/refresh/", {"refresh": token}, content_type="application/json")
+
+    def test_rotation_revokes_old_refresh_token(self):
+        response = self.refresh(self.tokens["refresh"])
+        self.assertEqual(response.status_code, 200)
+        rotated = response.json()["refresh"]
+        self.assertNotEqual(rotated, self.tokens["refresh"])
+        self.assertEqual(self.refresh(self.tokens["refresh"]).status_code, 401)
+        self.assertEqual(self.refresh(rotated).status_code, 200)
+
+    def test_rotation_keeps_one_row_per_session(self):
+        refresh = self.tokens["refresh"]
+        for _ in range(3):
+            refresh = self.refresh(refresh).json()["refresh"]
+        self.assertFalse(RevokedToken.objects.exists())
+        family = RefreshTokenFamily.objects.get()
+        self.assertEqual((family.family, family.generation), (RefreshToken(self.tokens["refresh"])["jti"], 3))
+
+    def test_rotated_token_is_rejected_before_any_sync(self):
+        rotated = self.refresh(self.tokens["refresh"]).json()["refresh"]
+        # As on a worker whose revocation store hasn't heard of anything
+        with mock.patch("users.authentication.is_token_revoked", return_value=False):
+            self.assertEqual(self.refresh(self.tokens["refresh"]).status_code, 401)
+            self.assertEqual(self.refresh(rotated).status_code, 200)
+            self.assertEqual(self.refresh(rotated).status_code, 401)
+
+    def test_expired_families_are_pruned(self):
+        self.assertTrue(advance_token_family("old", 0, time.time() - 1))
+        self.assertTrue(advance_token_family("live", 0, time.time() + 60))
+        self.assertFalse(advance_token_family("live", 0, time.time() + 60))
+        RevocationStore(DatabaseBackend(), prune_interval=0).sync()
+        self.assertEqual(list(RefreshTokenFamily.objects.values_list("family", flat=True)), ["live"])
+
+    def test_warm_refresh_makes_no_queries_beyond_revocation(self):
+        self.refresh(self.tokens["refresh"])  # warms the caches
+        tokens = get_tokens_for_user(self.admin)
+        with CaptureQueriesContext(connection) as ctx:
+            self.assertEqual(self.refresh(tokens["refresh"]).status_code, 200)
+        selects = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith("SELECT")]
+        self.assertFalse([sql for sql in selects if "users_customuser" in sql])
+
+    def test_logout_revokes_one_session(self):
+        other = get_tokens_for_user(self.admin)
+        response = self.client.post("/api/auth/logout/", {"refresh": self.tokens["refresh"]}, content_type="application/json")
+        self.assertEqual(response.status_code, 205)
+        self.assertEqual(self.refresh(self.tokens["refresh"]).status_code, 401)
+        self.assertEqual(self.refresh(other["refresh"]).status_code, 200)
+
+    def test_logout_all_revokes_access_and_refresh(self):
+        auth = {"HTTP_AUTHORIZATION": f"Bearer {self.tokens['access']}"}
+        self.assertEqual(self.client.post("/api/auth/logout/all/", **auth).status_code, 205)
+        self.assertEqual(self.client.get("/api/approvals/pending/", **auth).status_code, 401)
+        self.assertEqual(self.refresh(self.tokens["refresh"]).status_code, 401)
+
+    def test_college_revocation_rejects_earlier_tokens(self):
+        refresh = RefreshToken(self.tokens["refresh"])
+        refresh.set_iat(at_time=datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(minutes=1))
+        auth = {"HTTP_AUTHORIZATION": f"Bearer {self.tokens['access']}"}
+        self.assertEqual(self.client.post("/api/college/sessions/revoke/", **auth).status_code, 205)
+        self.assertEqual(self.refresh(str(refresh)).status_code, 401)
+
+    def test_database_backend_shares_revocations(self):
+        first = RevocationStore(DatabaseBackend(), sync_interval=0)
+        second = RevocationStore(DatabaseBackend(), sync_interval=0)
+        second.is_revoked("warm")
+        first.revoke("abc", time.time() + 60)
+        self.assertTrue(second.is_revoked("abc"))
+        self.assertFalse(second.is_revoked("xyz"))
+
+
+# ---------------- Async auth views ----------------
+class AsyncAuthViewTests(AuthTestCase):
+    def setUp(self):
+        super().setUp()
+        self.college = College.objects.create(name="Test College", code="101", domain="example.com")
+        self.user = CustomUser.objects.create(
+            username="alum", email="alum@example.com", role="alumni", college=self.college,
+            is_approved=True, password=make_password("secret-pw"),
+        )
+        CustomUser.objects.filter(pk=self.user.pk).update(is_active=True)
+        self.factory = AsyncRequestFactory()
+
+    async def post(self, view_class, data):
+        request = self.factory.post("/", data, content_type="application/json")
+        response = await view_class.as_view()(request)
+        return response.status_code, json.loads(response.content)
+
+    async def test_login(self):
+        code, body = await self.post(async_views.AsyncLoginView, {"email": "alum@example.com", "password": "secret-pw"})
+        self.assertEqual(code, 200)
+        self.assertEqual(body["user"]["college"], "101")
+        self.assertIn("access", body["tokens"])
+        code, body = await self.post(async_views.AsyncLoginView, {"email": "alum@example.com", "password": "wrong"})
+        self.assertEqual((code, body), (400, {"non_field_errors": ["Invalid credentials."]}))
+
+    async def test_login_rehashes_outdated_password(self):
+        self.user.password = make_password("secret-pw", hasher="pbkdf2_sha1")
+        await self.user.asave(update_fields=["password"])
+        code, _ = await self.post(async_views.AsyncLoginView, {"email": "alum@example.com", "password": "secret-pw"})
+        self.assertEqual(code, 200)
+        await self.user.arefresh_from_db()
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$"))
+
+    async def test_hashing_leaves_loop_free(self):
+        ticks, done = 0, False
+
+        async def ticker():
+            nonlocal ticks
+            while not done:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        task = asyncio.ensure_future(ticker())
+        started = time.monotonic()
+        code, _ = await self.post(async_views.AsyncLoginView, {"email": "alum@example.com", "password": "secret-pw"})
+        elapsed = time.monotonic() - started
+        done = True
+        await task
+        self.assertEqual(code, 200)
+        self.assertGreater(ticks, elapsed / 0.01 / 2)
+
+    async def test_register(self):
+        code, body = await self.post(async_views.AsyncRegisterView, {
+            "username": "new", "email": "new@example.com", "password": "secret-pw",
+            "role": "student", "roll_number": "S1",
+        })
+        self.assertEqual(code, 201)
+        user = await CustomUser.objects.aget(pk=body["user_id"])
+        self.assertTrue(user.verified)
+        self.assertTrue(user.check_password("secret-pw"))
+        code, body = await self.post(async_views.AsyncRegisterView, {"email": "bad"})
+        self.assertEqual(code, 400)
+        self.assertIn("email", body)
+
+    async def test_linkedin_login(self):
+        with StubServer(linkedin_routes(), delays={"/v2/me": 0.3, "/v2/emailAddress": 0.3}) as stub:
+            with override_settings(LINKEDIN_API_URL=stub.url("")):
+                linkedin.reset_linkedin_client()
+                started = time.monotonic()
+                code, _ = await self.post(async_views.AsyncLinkedInAuthView, {
+                    "access_token": "token", "role": "alumni", "college_code": "101", "roll_number": "A1",
+                })
+                elapsed = time.monotonic() - started
+        linkedin.reset_linkedin_client()
+        self.assertEqual(code, 200)
+        self.assertLess(elapsed, 0.55)  # both lookups in flight together
+        self.assertTrue(await CustomUser.objects.filter(linkedin_id="li-1", email="alum@example.com").aexists())
+
+    async def test_linkedin_deadline(self):
+        with StubServer(linkedin_routes(), delays={"/v2/me": 0.5}) as stub:
+            client = linkedin.LinkedInClient(base_url=stub.url(""), timeout=0.1)
+            with self.assertRaises(linkedin.LinkedInUnavailable):
+                await client.afetch_profile_and_email("token")
+        self.assertEqual(client.breaker.failures, 1)
+        client.executor.shutdown(wait=False)
+
+    async def test_cancelled_trial_is_not_a_failure(self):
+        breaker = linkedin.CircuitBreaker(failure_threshold=1, reset_timeout=0)
+        breaker.record_failure()
+        with StubServer(linkedin_routes(), delays={"/v2/me": 1}) as stub:
+            client = linkedin.LinkedInClient(base_url=stub.url(""), timeout=2, breaker=breaker)
+            trial = asyncio.ensure_future(client.afetch_profile_and_email("token"))
+            await asyncio.sleep(0.1)
+            self.assertFalse(breaker.allow())   # the trial is running
+            trial.cancel()   # the client went away
+            with self.assertRaises(asyncio.CancelledError):
+                await trial
+        client.executor.shutdown(wait=False)
+        self.assertEqual(breaker.failures, 1)
+        self.assertTrue(breaker.allow())   # the next call gets a new trial
+
+    async def test_disconnects_do_not_open_the_breaker(self):
+        breaker = linkedin.CircuitBreaker(failure_threshold=2, reset_timeout=60)
+        with StubServer(linkedin_routes(), delays={"/v2/me": 1}) as stub:
+            client = linkedin.LinkedInClient(base_url=stub.url(""), timeout=2, breaker=breaker)
+            for _ in range(3):
+                call = asyncio.ensure_future(client.afetch_profile_and_email("token"))
+                await asyncio.sleep(0.05)
+                call.cancel()
+                with self.assertRaises(asyncio.CancelledError):
+                    await call
+        client.executor.shutdown(wait=False)
+        self.assertFalse(breaker.is_open)
+        self.assertEqual(breaker.failures, 0)
+
+    async def test_google_login_fetches_certs_once(self):
+        signer = GoogleSigner()
+        with StubServer({"/certs": signer.certs_route()}) as stub:
+            with override_settings(GOOGLE_CLIENT_ID="client-id", GOOGLE_CERTS_URL=stub.url("/certs")):
+                google_auth.reset_google_verifier()
+                results = await asyncio.gather(*(
+                    self.post(async_views.AsyncGoogleAuthView, {
+                        "id_token": signer.token("client-id", sub="g-1", email="alum@example.com"),
+                        "role": "alumni",
+                    })
+                    for _ in range(3)
+                ))
+                code, body = await self.post(async_views.AsyncGoogleAuthView, {"id_token": "garbage"})
+        google_auth.reset_google_verifier()
+        self.assertEqual([code for code, _ in results], [200, 200, 200])
+        self.assertEqual(stub.hits["/certs"], 1)
+        self.assertEqual(code, 400)
+        await self.user.arefresh_from_db()
+        self.assertEqual(self.user.google_sub, "g-1")
+
+
+# ---------------- Calibrated password hashers ----------------
+def hashing(algorithm, **params):
+    preferred = hashers.HASHERS[algorithm]
+    return override_settings(
+        PASSWORD_HASHING={"ALGORITHM": algorithm, "PARAMS": params},
+        PASSWORD_HASHERS=[f"{cls.__module__}.{cls.__name__}" for cls in (
+            preferred, *(c for c in hashers.HASHERS.values() if c is not preferred)
+        )],
+    )
+
+
+class CalibratedHasherTests(AuthTestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = CustomUser.objects.create(username="admin", email="admin@example.com", role="admin", is_approved=True)
+
+    def login(self):
+        return self.client.post(
+            "/api/auth/login/", {"email": "admin@example.com", "password": "secret-pw"}, content_type="application/json",
+        )
+
+    def test_params_recorded_and_rehashed_on_login(self):
+        with hashing("pbkdf2_sha256", iterations=1000):
+            self.user.set_password("secret-pw")
+            self.user.save()
+        self.assertTrue(self.user.password.startswith("pbkdf2_sha256$1000$"))
+
+        with hashing("pbkdf2_sha256", iterations=2000):
+            self.assertEqual(self.login().status_code, 200)
+            self.user.refresh_from_db()
+            self.assertTrue(self.user.password.startswith("pbkdf2_sha256$2000$"))
+
+        with hashing("scrypt", work_factor=2 ** 10, block_size=8, parallelism=2):
+            self.assertEqual(self.login().status_code, 200)
+            self.user.refresh_from_db()
+            self.assertTrue(self.user.password.startswith("scrypt$1024$"))
+            self.assertEqual(self.user.password.split("$")[3:5], ["8", "2"])
+            self.assertEqual(self.login().status_code, 200)  # no further rehash needed
+            self.user.refresh_from_db()
+            self.assertFalse(hashers.HASHERS["scrypt"]().must_update(self.user.password))
+
+    def test_calibration_respects_memory_budget(self):
+        params = hashers.calibrate("scrypt", 0.005, max_memory=4 * 1024 * 1024)
+        self.assertLessEqual(hashers.hasher_memory("scrypt", params), 4 * 1024 * 1024)
+        self.assertGreaterEqual(params["parallelism"], 1)
+        self.assertGreaterEqual(hashers.calibrate("pbkdf2_sha256", 0.005)["iterations"], 10_000)
+
+    def test_large_scrypt_work_factor_fits_maxmem(self):
+        # 64 MiB is over OpenSSL's default limit
+        hasher = hashers.HASHERS["scrypt"]({"work_factor": 2 ** 16, "block_size": 8, "parallelism": 1})
+        self.assertTrue(hasher.verify("pw", hasher.encode("pw", hasher.salt())))
+
+
+# ---------------- Rate limits ----------------
+class FakeClock:
+    def __init__(self, now=1_000_040.0):   # 20s into a 60s window
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+class RateLimiterTests(SimpleTestCase):
+    def test_parse_rate(self):
+        self.assertEqual(parse_rate("10/m"), (10, 60))
+        self.assertEqual(parse_rate("100/15m"), (100, 900))
+        with self.assertRaises(ValueError):
+            parse_rate("ten per minute")
+
+    def test_sliding_window(self):
+        for backend in (MemoryBackend(), CacheBackend("default")):
+            clock = FakeClock()
+            limiter = RateLimiter(backend, {"login": {"email": "3/m"}}, clock=clock)
+            self.assertEqual([limiter.check("login", email="a@x.com") for _ in range(3)], [0, 0, 0])
+            self.assertEqual(limiter.check("login", email="a@x.com"), 40)
+            self.assertEqual(limiter.check("login", email="b@x.com"), 0)
+
+            # 30s into the next window the 3 earlier requests still weigh 1.5
+            clock.now += 70
+            self.assertEqual(limiter.check("login", email="a@x.com"), 0)
+            self.assertEqual(limiter.check("login", email="a@x.com"), 0)
+            self.assertGreater(limiter.check("login", email="a@x.com"), 0)
+            clock.now += 60
+            self.assertEqual(limiter.check("login", email="a@x.com"), 0)
+            caches["default"].clear()
+
+    def test_rejected_requests_are_not_counted(self):
+        limiter = RateLimiter(MemoryBackend(), {"login": {"ip": "2/m", "email": "1/m"}}, clock=FakeClock())
+        self.assertEqual(limiter.check("login", ip="1.1.1.1", email="a@x.com"), 0)
+        self.assertGreater(limiter.check("login", ip="1.1.1.1", email="a@x.com"), 0)
+        self.assertEqual(limiter.check("login", ip="1.1.1.1", email="b@x.com"), 0)
+
+    def test_memory_backend_stays_bounded(self):
+        backend = MemoryBackend(max_keys=10)
+        limiter = RateLimiter(backend, {"login": {"ip": "1/s"}}, clock=time.time)
+        for i in range(25):
+            limiter.check("login", ip=f"10.0.0.{i}")
+        self.assertLessEqual(len(backend._counters), 10)
+
+
+@override_settings(RATE_LIMITS={"RULES": {"login": {"ip": "100/m", "email": "2/m"}, "social": {"college": "1/m"}}})
+class RateLimitedViewTests(AuthTestCase):
+    def login(self, email, ip="10.0.0.1"):
+        return self.client.post(
+            "/api/auth/login/", {"email": email, "password": "x"},
+            content_type="application/json", REMOTE_ADDR=ip,
+        )
+
+    def test_throttled_before_database_work(self):
+        for ip in ("10.0.0.1", "10.0.0.2"):
+            self.assertEqual(self.login("Victim@example.com", ip).status_code, 400)
+        with self.assertNumQueries(0):
+            response = self.login("victim@example.com", "10.0.0.3")
+        self.assertEqual(response.status_code, 429)
+        self.assertIn("Retry-After", response)
+        self.assertEqual(self.login("other@example.com").status_code, 400)
+
+    def test_social_limited_by_college(self):
+        College.objects.create(name="Test College", code="101", domain="example.com")
+        body = {"access_token": "", "college_code": "101"}
+        self.assertEqual(self.client.post("/api/auth/social/linkedin/", body, content_type="application/json").status_code, 400)
+        self.assertEqual(self.client.post("/api/auth/social/linkedin/", body, content_type="application/json").status_code, 429)
+
+    def test_body_that_is_not_an_object_is_rejected(self):
+        for url in ("/api/auth/login/", "/api/auth/register/"):
+            response = self.client.post(url, [1, 2], content_type="application/json")
+            self.assertEqual(response.status_code, 400)
+
+    def test_unknown_college_codes_are_not_counted(self):
+        for code in ("999", "999", ["101"]):
+            body = {"access_token": "", "college_code": code}
+            self.assertEqual(self.client.post("/api/auth/social/linkedin/", body, content_type="application/json").status_code, 400)
+
+    async def test_async_views_limit_by_college(self):
+        await College.objects.acreate(name="Test College", code="101", domain="example.com")
+        factory = AsyncRequestFactory()
+        codes = []
+        for _ in range(2):
+            request = factory.post("/", {"access_token": "", "college_code": "101"}, content_type="application/json")
+            codes.append((await async_views.AsyncLinkedInAuthView.as_view()(request)).status_code)
+        self.assertEqual(codes, [400, 429])
+
+    async def test_async_views_share_limits(self):
+        factory = AsyncRequestFactory()
+        codes = []
+        for _ in range(3):
+            request = factory.post("/", {"email": "victim@example.com", "password": "x"}, content_type="application/json")
+            codes.append((await async_views.AsyncLoginView.as_view()(request)).status_code)
+        self.assertEqual(codes, [400, 400, 429])
+
+
+# ---------------- Alumni directory ----------------
+class DirectoryAPITests(AuthTestCase):
+    def setUp(self):
+        super().setUp()
+        self.college = College.objects.create(name="Test College", code="101", domain="example.com")
+        other = College.objects.create(name="Other College", code="102", domain="other.com")
+        alumni = [
+            ("ada", "Ada", "Lovelace", "CS-001", "https://www.linkedin.com/in/ada"),
+            ("alan", "Alan", "Turing", "CS-002", None),
+            ("grace", "Grace", "Hopper", "EE-003", None),
+            ("adele", "Adele", "Goldberg", "CS-104", "https://www.linkedin.com/in/adele"),
+            ("lovelace2", "Lovisa", "Adams", "ME-005", None),
+        ]
+        for username, first, last, roll, linkedin_url in alumni:
+            CustomUser.objects.create(
+                username=username, email=f"{username}@example.com", first_name=first, last_name=last,
+                role="alumni", college=self.college, roll_number=roll, linkedin_url=linkedin_url, is_approved=True,
+            )
+        CustomUser.objects.create(username="pending", email="pending@example.com", role="alumni", college=self.college)
+        CustomUser.objects.create(
+            username="adam", email="adam@other.com", first_name="Adam", role="alumni", college=other, is_approved=True,
+        )
+        self.student = CustomUser.objects.create(
+            username="student", email="student@example.com", first_name="Ada", role="student",
+            college=self.college, is_approved=True,
+        )
+        CustomUser.objects.filter(is_approved=True).update(is_active=True)
+        self.student.refresh_from_db()
+        token = get_tokens_for_user(self.student)["access"]
+        self.auth = {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+
+    def get(self, **params):
+        response = self.client.get("/api/directory/", params, **self.auth)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    def usernames(self, **params):
+        return [row["username"] for row in self.get(**params)["results"]]
+
+    def test_pages_cover_listed_alumni_once_in_name_order(self):
+        self.get(limit=1)   # warm user and college caches
+        seen, cursor = [], None
+        while True:
+            with self.assertNumQueries(1):   # just the page
+                body = self.get(limit=2, **({"cursor": cursor} if cursor else {}))
+            seen += [row["username"] for row in body["results"]]
+            cursor = body["next_cursor"]
+            if cursor is None:
+                break
+        self.assertEqual(seen, ["ada", "adele", "alan", "grace", "lovelace2"])
+        self.assertEqual(
+            set(body["results"][0]), {"id", "username", "first_name", "last_name", "roll_number", "linkedin_url"},
+        )
+
+    def test_search(self):
+        self.assertEqual(self.usernames(q="ad"), ["ada", "adele", "lovelace2"])
+        self.assertEqual(self.usernames(q="Ada Lo"), ["ada", "lovelace2"])   # Lovisa Adams
+        self.assertEqual(self.usernames(q="grace h"), ["grace"])
+        self.assertEqual(self.usernames(q="love"), ["ada", "lovelace2"])
+        self.assertEqual(self.usernames(q="ring"), [])   # words match from their start
+        self.assertEqual(self.usernames(roll="cs-0"), ["ada", "alan"])
+        self.assertEqual(self.usernames(q="a", linkedin="true"), ["ada", "adele"])
+        self.assertEqual(self.usernames(q="a", linkedin="false"), ["alan", "lovelace2"])
+
+    def test_requires_college_member(self):
+        outsider = CustomUser.objects.create(username="outsider", email="outsider@example.org", role="alumni", is_approved=True)
+        CustomUser.objects.filter(pk=outsider.pk).update(is_active=True)
+        outsider.refresh_from_db()
+        token = get_tokens_for_user(outsider)["access"]
+        self.assertEqual(self.client.get("/api/directory/", HTTP_AUTHORIZATION=f"Bearer {token}").status_code, 403)
+        self.assertEqual(self.client.get("/api/directory/").status_code, 401)
+
+    def test_invalid_cursor(self):
+        response = self.client.get("/api/directory/", {"cursor": "not-a-cursor"}, **self.auth)
+        self.assertEqual(response.status_code, 400)
+
+
+# ---------------- User export ----------------
+def insert_users(college, count):
+    """`count` synthetic users of `college` in one INSERT ... SELECT, much faster than bulk_create."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            WITH RECURSIVE seq(n) AS (SELECT 1 UNION ALL SELECT n + 1 FROM seq WHERE n < %s)
+            INSERT INTO users_customuser (
+                password, is_superuser, username, first_name, last_name, is_staff, is_active, date_joined,
+                email, role, college_id, roll_number, verified, is_approved, auth_version
+            )
+            SELECT '!', FALSE, %s || n, 'First', 'Last', FALSE, TRUE, CURRENT_TIMESTAMP,
+                   %s || n || '@example.com', 'student', %s, 'R' || n, FALSE, TRUE, 0
+            FROM seq
+            """,
+            [count, college.code, college.code, college.pk],
+        )
+
+
+class UserExportTests(AuthTestCase):
+    def setUp(self):
+        super().setUp()
+        self.college = College.objects.create(name="Test College", code="101", domain="example.com")
+        other = College.objects.create(name="Other College", code="102", domain="other.com")
+        self.admin = CustomUser.objects.create(
+            username="admin", email="admin@example.com", role="admin", college=self.college,
+        )
+        CustomUser.objects.create(
+            username="ada", email="ada@example.com", first_name="Ada, \"Countess\"", role="alumni",
+            college=self.college, roll_number="CS-001", is_approved=True,
+        )
+        CustomUser.objects.create(username="alan", email="alan@example.com", role="student", college=self.college)
+        CustomUser.objects.create(username="adam", email="adam@other.com", role="alumni", college=other)
+        token = get_tokens_for_user(self.admin)["access"]
+        self.auth = {"HTTP_AUTHORIZATION": f"Bearer {token}"}
+
+    def export(self, fmt, **params):
+        response = self.client.get(f"/api/college/users/export.{fmt}", params, **self.auth)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content).decode()
+
+    def test_ndjson(self):
+        response, body = self.export("ndjson")
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        rows = sorted((json.loads(line) for line in body.splitlines()), key=lambda row: row["username"])
+        self.assertEqual([row["username"] for row in rows], ["ada", "admin", "alan"])
+        self.assertEqual(rows[0]["first_name"], 'Ada, "Countess"')
+        self.assertEqual((rows[0]["roll_number"], rows[0]["is_approved"]), ("CS-001", True))
+        datetime.datetime.fromisoformat(rows[0]["date_joined"])
+
+    def test_csv_with_filters(self):
+        response, body = self.export("csv", role="alumni", approved="true")
+        self.assertIn('filename="college-', response["Content-Disposition"])
+        header, *rows = csv.reader(io.StringIO(body))
+        self.assertEqual(header[:3], ["id", "username", "email"])
+        self.assertEqual([(row[1], row[3]) for row in rows], [("ada", 'Ada, "Countess"')])
+        _, body = self.export("csv", approved="false")
+        self.assertEqual([row[1] for row in list(csv.reader(io.StringIO(body)))[1:]], ["alan"])   # admins are approved
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.client.get("/api/college/users/export.xml", **self.auth).status_code, 404)
+        self.assertEqual(self.client.get("/api/college/users/export.csv", {"role": "dean"}, **self.auth).status_code, 400)
+        CustomUser.objects.filter(username="ada").update(is_active=True)
+        token = get_tokens_for_user(CustomUser.objects.get(username="ada"))["access"]
+        response = self.client.get("/api/college/users/export.csv", HTTP_AUTHORIZATION=f"Bearer {token}")
+        self.assertEqual(response.status_code, 403)
+
+    def test_command(self):
+        out = io.StringIO()
+        call_command("export_users", "101", "--format", "csv", "--pending", stdout=out)
+        self.assertEqual([row[1] for row in csv.reader(io.StringIO(out.getvalue()))], ["username", "alan"])
+        with self.assertRaises(CommandError):
+            call_command("export_users", "999")
+
+
+# Row counts for the small and large exports. Ten times the rows in about
+# the same memory already shows the export streams; EXPORT_MEMORY_ROWS
+# ("10000,500000") checks it at production sizes.
+EXPORT_ROWS = tuple(int(n) for n in os.getenv("EXPORT_MEMORY_ROWS", "5000,50000").split(","))
+
+
+class UserExportMemoryTests(AuthTestCase):
+    def peak_memory(self, college, count):
+        insert_users(college, count)
+        tracemalloc.start()
+        try:
+            rows = sum(text.count("\n") for text in export_lines(export_users(college.pk), "csv"))
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(rows, count + 1)
+        return peak
+
+    def test_peak_memory_is_flat(self):
+        small = self.peak_memory(College.objects.create(name="Small", code="small"), EXPORT_ROWS[0])
+        large = self.peak_memory(College.objects.create(name="Large", code="large"), EXPORT_ROWS[1])
+        # Many times the rows in about the same memory: a chunk, not the export
+        self.assertLess(large, small * 1.5)
+
+    def asgi_peak_memory(self, code, count):
+        """Peak memory of the export endpoint served by Django's ASGI handler, as uvicorn runs it."""
+        college = College.objects.create(name=code, code=code, domain=f"{code}.edu")
+        insert_users(college, count)
+        admin = CustomUser.objects.create(username=f"admin-{code}", email=f"admin@{code}.edu", role="admin", college=college)
+        scope = {
+            "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+            "path": "/api/college/users/export.csv", "raw_path": b"/api/college/users/export.csv",
+            "query_string": b"", "root_path": "", "client": ("127.0.0.1", 1), "server": ("testserver", 80),
+            "headers": [
+                (b"host", b"testserver"),
+                (b"authorization", f"Bearer {get_tokens_for_user(admin)['access']}".encode()),
+            ],
+        }
+        messages = [{"type": "http.request", "body": b"", "more_body": False}]
+        lines = 0
+
+        async def receive():
+            if messages:
+                return messages.pop(0)
+            await asyncio.Event().wait()
+
+        async def send(message):
+            nonlocal lines
+            lines += message.get("body", b"").count(b"\n")
+
+        tracemalloc.start()
+        try:
+            async_to_sync(ASGIHandler())(scope, receive, send)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        self.assertEqual(lines, count + 2)   # header and the admin
+        return peak
+
+    def test_asgi_endpoint_streams(self):
+        # Like the test client: these would close the test's connection mid-transaction
+        request_started.disconnect(close_old_connections)
+        request_finished.disconnect(close_old_connections)
+        self.addCleanup(request_started.connect, close_old_connections)
+        self.addCleanup(request_finished.connect, close_old_connections)
+        small = self.asgi_peak_memory("small", EXPORT_ROWS[0])
+        large = self.asgi_peak_memory("large", EXPORT_ROWS[1])
+        self.assertLess(large, small * 1.5)
+
+
+# ---------------- Idempotency keys ----------------
+class IdempotencyTests(AuthTestCase):
+    body = {
+        "username": "new", "email": "new@example.com", "password": "secret-pw",
+        "role": "student", "roll_number": "S1",
+    }
+
+    def setUp(self):
+        super().setUp()
+        College.objects.create(name="Test College", code="101", domain="example.com")
+        get_college_by_code("101")   # warm the cache, as a live worker would be
+
+    def register(self, body, key="key-1"):
+        return self.client.post("/api/auth/register/", body, content_type="application/json", headers={"Idempotency-Key": key})
+
+    def test_retry_replays_first_response(self):
+        first = self.register(self.body)
+        self.assertEqual(first.status_code, 201)
+        with self.assertNumQueries(0), mock.patch("django.contrib.auth.base_user.make_password") as hash_password:
+            retry = self.register(self.body)
+        hash_password.assert_not_called()
+        self.assertEqual((retry.status_code, retry.content), (201, first.content))
+        self.assertEqual(retry["Idempotent-Replayed"], "true")
+        self.assertEqual(CustomUser.objects.filter(email="new@example.com").count(), 1)
+
+        # Without the key the retry runs again and trips over its own row
+        response = self.client.post("/api/auth/register/", self.body, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+
+    def test_key_reused_with_other_body(self):
+        self.assertEqual(self.register(self.body).status_code, 201)
+        response = self.register({**self.body, "email": "other@example.com"})
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(self.register({**self.body, "email": "other@example.com"}, key="key-2").status_code, 400)
+
+    def test_server_errors_are_not_stored(self):
+        statuses = [503, 201]
+
+        def view(request):
+            return HttpResponse(status=statuses.pop(0))
+
+        wrapped = idempotency.idempotent(view)
+        post = lambda: wrapped(RequestFactory().post("/x", b"{}", content_type="application/json", headers={"Idempotency-Key": "k"}))
+        self.assertEqual([post().status_code, post().status_code, post().status_code], [503, 201, 201])
+        self.assertEqual(statuses, [])
+
+    def test_concurrent_duplicate_waits_for_first(self):
+        calls = []
+
+        def view(request):
+            calls.append(request)
+            time.sleep(0.2)
+            return HttpResponse(b"created", status=201)
+
+        wrapped = idempotency.idempotent(view)
+        responses = []
+
+        def post():
+            request = RequestFactory().post("/x", b"{}", content_type="application/json", headers={"Idempotency-Key": "k"})
+            responses.append(wrapped(request))
+
+        threads = [threading.Thread(target=post) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(calls), 1)
+        self.assertEqual([(r.status_code, r.content) for r in responses], [(201, b"created")] * 4)
+        self.assertEqual(sum(r.has_header("Idempotent-Replayed") for r in responses), 3)
+
+    @override_settings(IDEMPOTENCY={"WAIT": 0.05})
+    def test_gives_up_waiting(self):
+        started = threading.Event()
+
+        def view(request):
+            started.set()
+            time.sleep(0.3)
+            return HttpResponse(status=201)
+
+        wrapped = idempotency.idempotent(view)
+        request = lambda: RequestFactory().post("/x", b"{}", content_type="application/json", headers={"Idempotency-Key": "k"})
+        first = threading.Thread(target=wrapped, args=(request(),))
+        first.start()
+        started.wait()
+        response = wrapped(request())
+        first.join()
+        self.assertEqual((response.status_code, response["Retry-After"]), (409, "1"))
+
+    async def test_async_duplicate_waits_off_the_loop(self):
+        calls = 0
+
+        async def view(request):
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0.2)
+            return HttpResponse(b"created", status=201)
+
+        wrapped = idempotency.idempotent(view)
+        factory = AsyncRequestFactory()
+        responses = await asyncio.gather(*(
+            wrapped(factory.post("/x", b"{}", content_type="application/json", headers={"Idempotency-Key": "k"}))
+            for _ in range(3)
+        ))
+        self.assertEqual(calls, 1)
+        self.assertEqual([r.status_code for r in responses], [201] * 3)
+
+    async def test_async_store_calls_leave_the_loop(self):
+        loop_thread = threading.get_ident()
+        threads = []
+
+        class Backend(idempotency.MemoryBackend):
+            def reserve(self, *args):
+                threads.append(threading.get_ident())
+                return super().reserve(*args)
+
+            def complete(self, *args):
+                threads.append(threading.get_ident())
+                return super().complete(*args)
+
+        async def view(request):
+            return HttpResponse(b"created", status=201)
+
+        store = idempotency.IdempotencyStore(Backend(), ttl=60, wait=0)
+        with mock.patch("users.idempotency.get_idempotency_store", return_value=store):
+            wrapped = idempotency.idempotent(view)
+            for _ in range(2):
+                await wrapped(AsyncRequestFactory().post("/x", b"{}", content_type="application/json", headers={"Idempotency-Key": "k"}))
+        self.assertEqual(len(threads), 3)   # reserve, complete, then reserve for the replay
+        self.assertNotIn(loop_thread, threads)
+
+    def test_memory_backend_is_bounded(self):
+        backend = idempotency.MemoryBackend(max_keys=2)
+        for key in ("a", "b", "c"):
+            entry, created = backend.reserve(key, "fp", ttl=60)
+            backend.complete(key, entry, (201, b"", "text/plain"), ttl=60)
+        self.assertEqual(list(backend._entries), ["b", "c"])
+        self.assertTrue(backend.reserve("a", "fp", ttl=60)[1])
+
+    def test_cache_backend(self):
+        store = idempotency.IdempotencyStore(idempotency.CacheBackend("default"), ttl=60, wait=0)
+        caches["default"].clear()
+        state, entry = store.acquire("k", "fp")
+        self.assertEqual(state, idempotency.OWNER)
+        self.assertEqual(store.acquire("k", "fp")[0], idempotency.IN_FLIGHT)
+        store.finish("k", entry, HttpResponse(b"ok", status=201))
+        self.assertEqual(store.acquire("k", "fp"), (idempotency.REPLAY, (201, b"ok", "text/html; charset=utf-8")))
+        self.assertEqual(store.acquire("k", "other")[0], idempotency.MISMATCH)
+
+
+# ---------------- API fast path ----------------
+class APIFastPathTests(AuthTestCase):
+    def test_api_skips_browser_middleware(self):
+        response = self.client.post("/api/auth/login/", {"email": "x"}, content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        self.assertNotIn("X-Frame-Options", response.headers)
+        self.assertNotIn("Cookie", response.headers.get("Vary", ""))
+
+    def test_admin_keeps_full_stack(self):
+        response = self.client.get("/admin/login/")
+        self.assertEqual(response["X-Frame-Options"], "DENY")
+        self.assertIn(settings.CSRF_COOKIE_NAME, response.cookies)
+        client = self.client_class(enforce_csrf_checks=True)
+        self.assertEqual(client.post("/admin/login/", {"username": "x", "password": "y"}).status_code, 403)
+
+    def test_orjson_matches_json_renderer(self):
+        data = {"user": {"id": 1, "name": "Zoë", "tags": ["a", None, True]}, "detail": gettext_lazy("Not found.")}
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+        self.assertEqual(
+            ORJSONRenderer().render(data, "application/json; indent=2"),
+            JSONRenderer().render(data, "application/json; indent=2"),
+        )
+
+    def test_malformed_json(self):
+        response = self.client.post("/api/auth/login/", "{", content_type="application/json")
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("JSON parse error", response.json()["detail"])
+
+    def test_precompiled_serializer_fields(self):
+        self.assertIs(LoginCredentialsSerializer().fields, LoginCredentialsSerializer().fields)
+        self.assertIsNot(LoginSerializer().fields, LoginCredentialsSerializer().fields)
+        first = LoginCredentialsSerializer(data={"email": "ada@example.com", "password": "pw"})
+        second = LoginCredentialsSerializer(data={"email": "bad"})
+        self.assertTrue(first.is_valid())
+        self.assertFalse(second.is_valid())
+        self.assertEqual(first.validated_data, {"email": "ada@example.com", "password": "pw"})
+        self.assertEqual(set(second.errors), {"email", "password"})
+
+
+    def test_url_loading_defers_provider_imports(self):
+        script = (
+            "import sys, django; django.setup();"
+            "from django.urls import get_resolver; get_resolver().url_patterns;"
+            "print(sorted(m for m in sys.modules if m.startswith(('users.google_auth', 'users.linkedin', 'google.', 'httpx'))))"
+        )
+        result = subprocess.run(
+            [sys.executable, "-c", script], cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        )
+        self.assertEqual(result.stdout.strip(), "[]")
+
+# ---------------- Read replicas ----------------
+@override_settings(DATABASE_REPLICAS=["replica_x"], REPLICA_STICKY_SECONDS=60)
+class ReplicaRouterTests(AuthTestCase):
+    """Routing decisions only; "replica_x" is never connected to."""
+
+    def setUp(self):
+        super().setUp()
+        self.user = CustomUser.objects.create(username="reader", email="reader@example.com")
+        replica_pins.clear()
+        self.request = RequestFactory().get("/")
+        self.request.user = self.user
+
+    def test_reads_use_replica_only_when_asked(self):
+        self.assertEqual(CustomUser.objects.all().db, "default")
+        with use_replica(self.request):
+            self.assertEqual(CustomUser.objects.all().db, "replica_x")
+            self.assertEqual(router.db_for_write(CustomUser), "default")
+        self.assertEqual(CustomUser.objects.all().db, "default")
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas_configured(self):
+        with use_replica(self.request):
+            self.assertEqual(CustomUser.objects.all().db, "default")
+
+    def test_reads_after_a_write_stay_on_primary(self):
+        with use_replica(self.request):
+            College.objects.create(name="New", code="555", domain="new.edu")
+            self.assertEqual(College.objects.all().db, "default")
+
+    def test_user_pinned_after_saving_their_row(self):
+        self.user.first_name = "Changed"
+        self.user.save()
+        with use_replica(self.request):
+            self.assertEqual(CustomUser.objects.all().db, "default")
+        with use_replica(RequestFactory().get("/")):
+            self.assertEqual(CustomUser.objects.all().db, "replica_x")
+
+    def test_middleware_pins_user_of_a_writing_request(self):
+        def view(request):
+            with use_replica(request):
+                reads_before = CustomUser.objects.all().db
+                College.objects.create(name="New", code="556", domain="new2.edu")
+                return reads_before, CustomUser.objects.all().db
+
+        self.assertEqual(replica_routing_middleware(view)(self.request), ("replica_x", "default"))
+        self.assertTrue(replica_pins.is_pinned(self.user.pk))
+        with use_replica(self.request):
+            self.assertEqual(CustomUser.objects.all().db, "default")
+
+    def test_pins_expire(self):
+        with override_settings(REPLICA_STICKY_SECONDS=0):
+            replica_pins.pin(self.user.pk)
+        with use_replica(self.request):
+            self.assertEqual(CustomUser.objects.all().db, "replica_x")
+
+    def test_relations_across_primary_and_replica(self):
+        college = College(name="Replica", code="557", domain="r.edu")
+        college._state.db = "replica_x"
+        self.assertTrue(ReplicaRouter().allow_relation(college, self.user))
+
+    def test_only_the_primary_is_migrated(self):
+        self.assertTrue(ReplicaRouter().allow_migrate("default", "users"))
+        self.assertFalse(ReplicaRouter().allow_migrate("replica_x", "users"))
+
+
+@skipUnless(getattr(settings, "DATABASE_REPLICAS", None), "needs a replica database (DB_REPLICAS)")
+class ReplicaDatabaseTests(AuthTestCase):
+    """
+    The replica mirrors the primary's test database over a connection of its
+    own, outside the test's transaction, so it can't see rows written during
+    the test. That shows which database served a read.
+    """
+    databases = "__all__"
+
+    def setUp(self):
+        super().setUp()
+        self.replica = settings.DATABASE_REPLICAS[0]
+        College.objects.create(name="Written In Test", code="601", domain="primary.edu")
+        self.root = CustomUser.objects.create_superuser("root", "root@example.com", "pw", role="admin")
+        self.client.force_login(self.root)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        # Pooled mirror connections would keep the test database from being dropped
+        for alias in settings.DATABASE_REPLICAS:
+            connections[alias].close_pool()
+
+    def test_admin_listing_reads_replica(self):
+        replica_pins.clear()
+        with CaptureQueriesContext(connections[self.replica]) as ctx:
+            response = self.client.get("/admin/users/college/")
+        self.assertEqual(response.status_code, 200)
+        self.assertNotContains(response, "Written In Test")
+        self.assertTrue(ctx.captured_queries)
+
+    def test_admin_sees_primary_right_after_writing(self):
+        # force_login saved last_login, which pinned the admin
+        response = self.client.get("/admin/users/college/")
+        self.assertContains(response, "Written In Test")
+
+    def test_new_user_reads_own_row(self):
+        user = CustomUser.objects.create(username="fresh", email="fresh@example.com")
+        request = RequestFactory().get("/")
+        request.user = user
+        with use_replica(request):
+            self.assertTrue(CustomUser.objects.filter(pk=user.pk).exists())
+
+
+# ---------------- Metrics ----------------
+@override_settings(METRICS={"ENABLED": True, "SERVER_TIMING": True})
+class MetricsTests(AuthTestCase):
+    def setUp(self):
+        super().setUp()
+        metrics.clear()
+        self.user = CustomUser.objects.create(
+            username="alum", email="alum@example.com", role="alumni",
+            is_approved=True, password=make_password("secret-pw"),
+        )
+        CustomUser.objects.filter(pk=self.user.pk).update(is_active=True)
+
+    def login(self):
+        return self.client.post(
+            "/api/auth/login/", {"email": "alum@example.com", "password": "secret-pw"}, content_type="application/json",
+        )
+
+    def test_login_timings_in_header_and_histograms(self):
+        response = self.login()
+        self.assertEqual(response.status_code, 200)
+        timing = response["Server-Timing"]
+        self.assertRegex(timing, r'^db;dur=[\d.]+;desc="[1-9]\d* queries", hash;dur=[\d.]+, total;dur=[\d.]+$')
+
+        with override_settings(DEBUG=True):
+            body = self.client.get("/metrics").content.decode()
+        self.assertIn('alumglobe_hash_duration_seconds_count{view="login"} 1', body)
+        self.assertIn('alumglobe_request_duration_seconds_bucket{view="login",le="+Inf"} 1', body)
+        self.assertIn('alumglobe_responses_total{view="login",status="200"} 1', body)
+
+    def test_outbound_http_timed_once_when_nested(self):
+        def view(request):
+            with timed("http"):
+                with timed("http"):
+                    time.sleep(0.02)
+            return HttpResponse()
+
+        response = metrics_middleware(view)(RequestFactory().get("/"))
+        http_ms = float(response["Server-Timing"].split("http;dur=")[1].split(",")[0])
+        self.assertGreaterEqual(http_ms, 20)
+        self.assertLess(http_ms, 40)
+
+    def test_threads_and_workers_merged_on_scrape(self):
+        registry = Metrics()
+        labels = (("view", "login"),)
+        threads = [threading.Thread(target=registry.observe, args=("alumglobe_db_queries", labels, 3)) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        registry.inc("alumglobe_responses", labels + (("status", "200"),))
+
+        with tempfile.TemporaryDirectory() as directory, override_settings(METRICS={"DIR": directory}):
+            # Another worker's flushed counters
+            other = Metrics()
+            other.observe("alumglobe_db_queries", labels, 50)
+            other.flush(directory)
+            os.rename(os.path.join(directory, f"{os.getpid()}.json"), os.path.join(directory, "1.json"))
+            text = render(registry.collect())
+
+        self.assertIn('alumglobe_db_queries_bucket{view="login",le="3.0"} 4', text)
+        self.assertIn('alumglobe_db_queries_count{view="login"} 5', text)
+        self.assertIn('alumglobe_db_queries_sum{view="login"} 62', text)
+        self.assertIn('alumglobe_responses_total{view="login",status="200"} 1', text)
+
+    def test_slow_requests_logged_with_queries(self):
+        with override_settings(METRICS={"SLOW_REQUEST_MS": 1}), self.assertLogs("users.metrics", "WARNING") as logs:
+            self.login()
+        self.assertEqual(len(logs.records), 1)
+        self.assertIn("POST /api/auth/login/", logs.output[0])
+        self.assertIn('FROM \\"users_customuser\\"', logs.output[0])
+
+    @override_settings(METRICS={"TOKEN": "scrape-secret"})
+    def test_endpoint_token(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 403)
+        response = self.client.get("/metrics", HTTP_AUTHORIZATION="Bearer scrape-secret")
+        self.assertEqual(response.status_code, 200)
+        self.assertIn("# TYPE alumglobe_request_duration_seconds histogram", response.content.decode())
+
+    def test_endpoint_hidden_without_token_unless_debug(self):
+        self.assertEqual(self.client.get("/metrics").status_code, 404)
+        with override_settings(DEBUG=True):
+            self.assertEqual(self.client.get("/metrics").status_code, 200)
+
+
+# ---------------- Benchmark suite ----------------
+class BenchmarkSuiteTests(AuthTestCase):
+    def test_generated_dataset(self):
+        data = loadtest.generate_dataset(colleges=3, users=60, password="bench-pw", seed=7)
+        users = CustomUser.objects.filter(email__endswith=".bench.invalid")
+        self.assertEqual(users.count(), 60)
+        self.assertEqual(users.filter(role="admin").count(), 3)
+        self.assertEqual(set(users.values_list("role", flat=True)), {"admin", "student", "alumni"})
+        self.assertEqual(len(data.logins), users.filter(is_approved=True, is_active=True).count())
+        self.assertLess(len(data.logins), 60)
+        self.assertEqual(len(data.google), users.exclude(google_sub=None).count())
+        self.assertTrue(users.get(email=data.logins[0]).check_password("bench-pw"))
+
+        again = loadtest.generate_dataset(colleges=3, users=60, password="bench-pw", seed=7)
+        self.assertEqual((again.logins, again.google), (data.logins, data.google))
+        self.assertEqual(CustomUser.objects.filter(email__endswith=".bench.invalid").count(), 60)
+
+    def test_compare_with_baseline(self):
+        def run(rate, p95, queries):
+            return {"profiles": {"login": {"rate": rate, "p95_ms": p95, "queries_per_request": queries}}}
+
+        baseline = run(100, 50, 2)
+        self.assertEqual(loadtest.compare(run(90, 55, 2), baseline), [])
+        regressions = loadtest.compare(run(70, 80, 4), baseline)
+        self.assertEqual(len(regressions), 3)
+        self.assertIn("login: 70 req/s, baseline 100", regressions)
+
+
+# ---------------- Endpoint budgets ----------------
+@override_settings(METRICS={"ENABLED": True, "BUDGETS": "raise"})
+class EndpointBudgetTests(AuthTestCase):
+    """
+    Every endpoint in users/urls.py under its budget; a request over budget
+    raises BudgetExceeded listing its SQL.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.signer = GoogleSigner()
+
+    def setUp(self):
+        super().setUp()
+        self.college = College.objects.create(name="Test College", code="101", domain="example.com")
+        self.user = CustomUser.objects.create(
+            username="alum", email="alum@example.com", role="alumni", college=self.college,
+            is_approved=True, password=make_password("secret-pw"), google_sub="g-1", linkedin_id="li-1",
+        )
+        CustomUser.objects.filter(pk=self.user.pk).update(is_active=True)
+        self.user.refresh_from_db()
+        # Budgets are for warm workers: fill the per-process caches first
+        get_college_by_code("101")
+        get_revocation_store().sync()
+
+    def tearDown(self):
+        google_auth.reset_google_verifier()
+        linkedin.reset_linkedin_client()
+
+    def post(self, name, data, **extra):
+        return self.client.post(reverse(name), data, content_type="application/json", **extra)
+
+    def test_every_endpoint_has_a_budget(self):
+        from .urls import urlpatterns
+        self.assertEqual({pattern.name for pattern in urlpatterns} - set(budgets.BUDGETS), set())
+
+    def test_register(self):
+        response = self.post("register", {
+            "username": "new", "email": "new@example.com", "password": "secret-pw", "role": "student",
+            "college_code": "101", "roll_number": "R1",
+        })
+        self.assertEqual(response.status_code, 201)
+
+    def test_login(self):
+        response = self.post("login", {"email": "alum@example.com", "password": "secret-pw"})
+        self.assertEqual(response.status_code, 200)
+
+    def test_token_refresh_and_logout(self):
+        refresh = get_tokens_for_user(self.user)["refresh"]
+        response = self.post("token-refresh", {"refresh": refresh})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.post("logout", {"refresh": response.json()["refresh"]}).status_code, 205)
+
+    def test_logout_all(self):
+        access = get_tokens_for_user(self.user)["access"]
+        self.assertEqual(self.post("logout-all", {}, HTTP_AUTHORIZATION=f"Bearer {access}").status_code, 205)
+
+    def test_google_returning_and_new_user(self):
+        with StubServer({"/certs": self.signer.certs_route()}) as stub:
+            with override_settings(GOOGLE_CLIENT_ID="client-id", GOOGLE_CERTS_URL=stub.url("/certs")):
+                google_auth.reset_google_verifier()
+                for sub, email in (("g-1", "alum@example.com"), ("g-2", "fresh@example.com")):
+                    token = self.signer.token("client-id", sub=sub, email=email)
+                    response = self.post("google-auth", {"id_token": token, "role": "student", "roll_number": "R2"})
+                    self.assertEqual(response.status_code, 200)
+
+    def test_linkedin_returning_and_new_user(self):
+        for linkedin_id, email in (("li-1", "alum@example.com"), ("li-2", "fresh@example.com")):
+            with StubServer(linkedin_routes(linkedin_id, email)) as stub:
+                with override_settings(LINKEDIN_API_URL=stub.url("")):
+                    linkedin.reset_linkedin_client()
+                    response = self.post("linkedin-auth", {"access_token": "t", "role": "alumni", "roll_number": "R3"})
+            self.assertEqual(response.status_code, 200)
+
+    def test_directory(self):
+        access = get_tokens_for_user(self.user)["access"]
+        response = self.client.get(reverse("directory"), {"q": "alu"}, HTTP_AUTHORIZATION=f"Bearer {access}")
+        self.assertEqual(response.status_code, 200)
+
+    def test_cold_cache_fill_is_not_checked(self):
+        # A worker's first register also reads every College row, one query over budget
+        invalidate_college_cache()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post("register", {
+                "username": "new", "email": "new@example.com", "password": "secret-pw", "role": "student",
+                "college_code": "101", "roll_number": "R1",
+            })
+        self.assertEqual(response.status_code, 201)
+        self.assertGreater(len(queries), budgets.BUDGETS["register"].queries)
+
+    def test_over_budget_logged_with_sql(self):
+        with mock.patch.dict(budgets.BUDGETS, {"login": budgets.Budget(queries=0, ms=1000)}):
+            with self.assertRaises(budgets.BudgetExceeded) as raised:
+                self.post("login", {"email": "alum@example.com", "password": "secret-pw"})
+            self.assertIn('FROM "users_customuser"', str(raised.exception))
+
+            with override_settings(METRICS={"BUDGETS": "log"}), self.assertLogs("users.metrics", "WARNING") as logs:
+                self.post("login", {"email": "alum@example.com", "password": "secret-pw"})
+            self.assertIn("login used 1 queries (budget 0)", logs.output[0])
@@ -1,10 +1,25 @@
+from django.conf import settings
 from django.urls import path
-from .views import RegisterView, LoginView, GoogleAuthView, LinkedInAuthView
+from rest_framework_simplejwt.views import TokenRefreshView
+from .views import RegisterView, LoginView, GoogleAuthView, LinkedInAuthView, LogoutView, LogoutAllView
+from .idempotency import idempotent
+
+# Under ASGI, serve the credential-checking endpoints from the async views
+if getattr(settings, "ASYNC_AUTH_VIEWS", False):
+    from .async_views import (
+        AsyncRegisterView as RegisterView, AsyncLoginView as LoginView,
+        AsyncGoogleAuthView as GoogleAuthView, AsyncLinkedInAuthView as LinkedInAuthView,
+    )
 
 # ✅ urlpatterns must be a list
+# Sign-up endpoints replay the first response to retries with the same
+# Idempotency-Key (see users.idempotency)
 urlpatterns = [
-    path('register/', RegisterView.as_view(), name='register'),
+    path('register/', idempotent(RegisterView.as_view()), name='register'),
     path('login/', LoginView.as_view(), name='login'),
-    path('social/google/', GoogleAuthView.as_view(), name='google-auth'),
-    path('social/linkedin/', LinkedInAuthView.as_view(), name='linkedin-auth'),
+    path('token/refresh/', TokenRefreshView.as_view(), name='token-refresh'),
+    path('logout/', LogoutView.as_view(), name='logout'),
+    path('logout/all/', LogoutAllView.as_view(), name='logout-all'),
+    path('social/google/', idempotent(GoogleAuthView.as_view()), name='google-auth'),
+    path('social/linkedin/', idempotent(LinkedInAuthView.as_view()), name='linkedin-auth'),
 ]
@@ -1,17 +1,30 @@
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status, permissions
-from .serializers import RegisterSerializer, LoginSerializer, get_tokens_for_user
-from .models import CustomUser, College
+from .serializers import (
+    RegisterSerializer, LoginSerializer, LogoutSerializer,
+    PendingUserSerializer, BulkApproveSerializer, ApprovalJobSerializer, DirectoryEntrySerializer,
+    RosterUploadSerializer,
+)
+from .models import CustomUser, ApprovalJob, ROLE_CHOICES
+from .authentication import invalidate_users
+from .revocation import revoke_token, revoke_college_sessions
+from django.core.handlers.asgi import ASGIRequest
+from django.db import router
+from django.db.models import F
+from django.http import StreamingHttpResponse
+from rest_framework_simplejwt.exceptions import TokenError
+from .permissions import IsCollegeAdmin, IsApprovedCollegeMember
+from .ratelimit import AuthRateThrottle
+from .routers import replica_reads
+from .approvals import pending_users, keyset_page, create_approval_job
+from .directory import directory_users, search, directory_page, decode_cursor
+from .export import CONTENT_TYPES, export_users, export_lines, aexport_lines
+from .rosters import read_roster_file, replace_roster
+from .accounts import registration_payload, login_payload, social_login, linkedin_identity
 from rest_framework_simplejwt.tokens import RefreshToken
-
-# Social verification imports
-from google.oauth2 import id_token
-from google.auth.transport import requests as google_requests
-import requests as http_requests
 import os
 
-GOOGLE_CLIENT_ID = os.getenv("GOOGLE_CLIENT_ID")
 LINKEDIN_CLIENT_ID = os.getenv("LINKEDIN_CLIENT_ID")
 LINKEDIN_CLIENT_SECRET = os.getenv("LINKEDIN_CLIENT_SECRET")
 
@@ -19,25 +32,17 @@ LINKEDIN_CLIENT_SECRET = os.getenv("LINKEDIN_CLIENT_SECRET")
 # ---------------- Register ----------------
 class RegisterView(APIView):
     permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+    throttle_classes = [AuthRateThrottle]
+    throttle_scope = "register"
 
     def post(self, request):
         serializer = RegisterSerializer(data=request.data)
         if serializer.is_valid():
             user = serializer.save()
-
             # Response message based on approval
-            if user.is_approved:
-                tokens = get_tokens_for_user(user)
-                return Response({
-                    "message": "Registration successful. You can log in now.",
-                    "user_id": user.id,
-                    "tokens": tokens
-                }, status=status.HTTP_201_CREATED)
-            else:
-                return Response({
-                    "message": "Registration successful. Please wait for admin approval before logging in.",
-                    "user_id": user.id
-                }, status=status.HTTP_201_CREATED)
+            data, code = registration_payload(user)
+            return Response(data, status=code)
 
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
@@ -45,34 +50,51 @@ class RegisterView(APIView):
 # ---------------- Login ----------------
 class LoginView(APIView):
     permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+    throttle_classes = [AuthRateThrottle]
+    throttle_scope = "login"
 
     def post(self, request):
         serializer = LoginSerializer(data=request.data)
         if serializer.is_valid():
-            user = serializer.validated_data['user']
-
             # Prevent login if not approved
-            if not user.is_approved:
-                return Response({"detail": "Your account is pending admin approval."}, status=status.HTTP_403_FORBIDDEN)
-
-            tokens = get_tokens_for_user(user)
-            return Response({
-                "user": {
-                    "id": user.id,
-                    "username": user.username,
-                    "email": user.email,
-                    "role": user.role,
-                    "college": user.college.code if user.college else None,
-                    "roll_number": getattr(user, "roll_number", None)
-                },
-                "tokens": tokens
-            })
+            data, code = login_payload(serializer.validated_data['user'])
+            return Response(data, status=code)
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
+# ---------------- Logout ----------------
+class LogoutView(APIView):
+    """Revoke one refresh token (this device)."""
+    permission_classes = [permissions.AllowAny]
+
+    def post(self, request):
+        serializer = LogoutSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            refresh = RefreshToken(serializer.validated_data['refresh'])
+        except TokenError as e:
+            return Response({"detail": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        revoke_token(refresh)
+        return Response(status=status.HTTP_205_RESET_CONTENT)
+
+
+class LogoutAllView(APIView):
+    """Log the current user out everywhere by invalidating every token they hold."""
+
+    def post(self, request):
+        CustomUser.objects.filter(pk=request.user.pk).update(auth_version=F('auth_version') + 1)
+        invalidate_users(request.user.pk)
+        return Response(status=status.HTTP_205_RESET_CONTENT)
+
+
 # ---------------- Google Auth ----------------
 class GoogleAuthView(APIView):
     permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+    throttle_classes = [AuthRateThrottle]
+    throttle_scope = "social"
 
     def post(self, request):
         token = request.data.get('id_token')
@@ -83,58 +105,16 @@ class GoogleAuthView(APIView):
         if not token:
             return Response({"detail": "No id_token provided"}, status=status.HTTP_400_BAD_REQUEST)
 
+        # Imported on first use: google-auth and requests would add ~100 ms to every worker's startup
+        from .google_auth import verify_google_id_token
         try:
-            idinfo = id_token.verify_oauth2_token(token, google_requests.Request(), GOOGLE_CLIENT_ID)
-            google_sub = idinfo.get('sub')
+            idinfo = verify_google_id_token(token)
             email = idinfo.get('email')
-            name = idinfo.get('name') or email.split('@')[0]
-
-            # find existing user
-            user = None
-            try:
-                user = CustomUser.objects.get(google_sub=google_sub)
-            except CustomUser.DoesNotExist:
-                try:
-                    user = CustomUser.objects.get(email=email)
-                except CustomUser.DoesNotExist:
-                    pass
-
-            if user is None:
-                username = email.split('@')[0]
-                user = CustomUser(username=username, email=email, role=role)
-                user.google_sub = google_sub
-                user.first_name = name
-
-                if college_code:
-                    try:
-                        user.college = College.objects.get(code=college_code)
-                        if user.college.domain and email.endswith(user.college.domain):
-                            user.verified = True
-                    except College.DoesNotExist:
-                        pass
-
-                if role in ["student", "alumni"]:
-                    user.roll_number = roll_number
-                    user.is_approved = False
-                    user.is_active = False
-                elif role == "admin":
-                    if not user.college or not user.college.domain or not email.endswith(f"@{user.college.domain}"):
-                        return Response({"detail": "Admins must register with official college email."}, status=status.HTTP_400_BAD_REQUEST)
-                    user.verified = True
-                    user.is_approved = True
-
-                user.set_unusable_password()
-                user.save()
-            else:
-                if not user.google_sub:
-                    user.google_sub = google_sub
-                    user.save()
-
-            if not user.is_approved:
-                return Response({"message": "Account created. Please wait for admin approval."})
-
-            tokens = get_tokens_for_user(user)
-            return Response({"user": {"id": user.id, "email": user.email, "role": user.role}, "tokens": tokens})
+            data, code = social_login(
+                'google_sub', idinfo.get('sub'), email, role, college_code, roll_number,
+                first_name=idinfo.get('name') or email.split('@')[0],
+            )
+            return Response(data, status=code)
 
         except ValueError as e:
             return Response({"detail": "Invalid token", "error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
@@ -143,6 +123,9 @@ class GoogleAuthView(APIView):
 # ---------------- LinkedIn Auth ----------------
 class LinkedInAuthView(APIView):
     permission_classes = [permissions.AllowAny]
+    authentication_classes = []
+    throttle_classes = [AuthRateThrottle]
+    throttle_scope = "social"
 
     def post(self, request):
         access_token = request.data.get('access_token')
@@ -153,76 +136,165 @@ class LinkedInAuthView(APIView):
         if not access_token:
             return Response({"detail": "No access_token provided"}, status=status.HTTP_400_BAD_REQUEST)
 
-        headers = {"Authorization": f"Bearer {access_token}"}
-        profile_url = "https://api.linkedin.com/v2/me"
-        email_url = "https://api.linkedin.com/v2/emailAddress?q=members&projection=(elements*(handle~))"
-
+        from .linkedin import get_linkedin_client, LinkedInUnavailable   # on first use, as above
         try:
-            p_resp = http_requests.get(profile_url, headers=headers)
-            e_resp = http_requests.get(email_url, headers=headers)
+            p_resp, e_resp = get_linkedin_client().fetch_profile_and_email(access_token)
             if p_resp.status_code != 200:
                 return Response({"detail": "LinkedIn profile fetch failed", "status": p_resp.status_code, "text": p_resp.text}, status=status.HTTP_400_BAD_REQUEST)
 
-            p_json = p_resp.json()
-            e_json = e_resp.json()
-            linkedin_id = p_json.get('id')
-            firstName = p_json.get('localizedFirstName')
-            lastName = p_json.get('localizedLastName')
-            email = None
-            try:
-                email = e_json['elements'][0]['handle~']['emailAddress']
-            except:
-                pass
-
-            user = None
-            if linkedin_id:
-                try:
-                    user = CustomUser.objects.get(linkedin_id=linkedin_id)
-                except CustomUser.DoesNotExist:
-                    pass
-            if user is None and email:
-                try:
-                    user = CustomUser.objects.get(email=email)
-                except CustomUser.DoesNotExist:
-                    pass
-
-            if user is None:
-                username = (email.split('@')[0] if email else f"li_{linkedin_id}")
-                user = CustomUser(username=username, email=email, role=role)
-                user.linkedin_id = linkedin_id
-                user.first_name = firstName
-                user.last_name = lastName
-
-                if college_code:
-                    try:
-                        user.college = College.objects.get(code=college_code)
-                        if user.college.domain and email and email.endswith(user.college.domain):
-                            user.verified = True
-                    except College.DoesNotExist:
-                        pass
-
-                if role in ["student", "alumni"]:
-                    user.roll_number = roll_number
-                    user.is_approved = False
-                    user.is_active = False
-                elif role == "admin":
-                    if not user.college or not user.college.domain or not email.endswith(f"@{user.college.domain}"):
-                        return Response({"detail": "Admins must register with official college email."}, status=status.HTTP_400_BAD_REQUEST)
-                    user.verified = True
-                    user.is_approved = True
-
-                user.set_unusable_password()
-                user.save()
-            else:
-                if not user.linkedin_id:
-                    user.linkedin_id = linkedin_id
-                    user.save()
-
-            if not user.is_approved:
-                return Response({"message": "Account created. Please wait for admin approval."})
-
-            tokens = get_tokens_for_user(user)
-            return Response({"user": {"id": user.id, "email": user.email, "role": user.role}, "tokens": tokens})
+            linkedin_id, first_name, last_name, email = linkedin_identity(p_resp.json(), e_resp.json())
+            data, code = social_login(
+                'linkedin_id', linkedin_id, email, role, college_code, roll_number,
+                first_name=first_name, last_name=last_name, fallback_username=f"li_{linkedin_id}",
+            )
+            return Response(data, status=code)
 
+        except LinkedInUnavailable as e:
+            return Response({"detail": "LinkedIn unavailable", "error": str(e)}, status=status.HTTP_503_SERVICE_UNAVAILABLE)
         except Exception as e:
             return Response({"detail": "LinkedIn error", "error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
+# ---------------- Approvals (college admins) ----------------
+class PendingApprovalsView(APIView):
+    permission_classes = [IsCollegeAdmin]
+    max_limit = 200
+
+    @replica_reads
+    def get(self, request):
+        try:
+            after = int(request.query_params.get('cursor') or 0)
+            limit = min(max(int(request.query_params.get('limit') or 50), 1), self.max_limit)
+        except ValueError:
+            return Response({"detail": "cursor and limit must be integers."}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = pending_users(request.user.college_id)
+        role = request.query_params.get('role')
+        if role in ("student", "alumni"):
+            queryset = queryset.filter(role=role)
+
+        rows, next_cursor = keyset_page(queryset, after=after, limit=limit)
+        return Response({
+            "results": PendingUserSerializer(rows, many=True).data,
+            "next_cursor": next_cursor,
+        })
+
+
+class BulkApproveView(APIView):
+    permission_classes = [IsCollegeAdmin]
+
+    def post(self, request):
+        serializer = BulkApproveSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        job = create_approval_job(
+            request.user.college, request.user, serializer.validated_data.get('user_ids'),
+        )
+        return Response(ApprovalJobSerializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+
+class ApprovalJobView(APIView):
+    permission_classes = [IsCollegeAdmin]
+
+    def get(self, request, pk):
+        try:
+            job = ApprovalJob.objects.get(pk=pk, college_id=request.user.college_id)
+        except ApprovalJob.DoesNotExist:
+            return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(ApprovalJobSerializer(job).data)
+
+
+# ---------------- Roster (college admins) ----------------
+class RosterUploadView(APIView):
+    """
+    Replace the college's roster. Students and alumni who register with a
+    listed roll number are approved at once; those already pending are
+    approved by the returned job.
+    """
+    permission_classes = [IsCollegeAdmin]
+
+    def post(self, request):
+        serializer = RosterUploadSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        data = serializer.validated_data
+        try:
+            roll_numbers = data['roll_numbers'] if 'roll_numbers' in data else read_roster_file(data['file'])
+        except ValueError as e:
+            return Response({"file": [f"Unreadable roster: {e}"]}, status=status.HTTP_400_BAD_REQUEST)
+        if any(len(roll_number.strip()) > 50 for roll_number in roll_numbers):
+            return Response({"file": ["Roll numbers are at most 50 characters."]}, status=status.HTTP_400_BAD_REQUEST)
+
+        size, job = replace_roster(request.user.college, roll_numbers, requested_by=request.user)
+        return Response({
+            "roll_numbers": size,
+            "approval_job": ApprovalJobSerializer(job).data if job else None,
+        }, status=status.HTTP_201_CREATED)
+
+
+# ---------------- Alumni directory ----------------
+class DirectoryView(APIView):
+    """Approved alumni of the caller's college; ?q= name words, ?roll= prefix, ?linkedin=true/false."""
+    permission_classes = [IsApprovedCollegeMember]
+    max_limit = 50
+
+    @replica_reads
+    def get(self, request):
+        params = request.query_params
+        try:
+            cursor = decode_cursor(params.get('cursor'))
+            limit = min(max(int(params.get('limit') or 20), 1), self.max_limit)
+        except ValueError:
+            return Response({"detail": "Invalid cursor or limit."}, status=status.HTTP_400_BAD_REQUEST)
+
+        linkedin = params.get('linkedin')
+        queryset = search(
+            directory_users(request.user.college_id), q=params.get('q'), roll=params.get('roll'),
+            linkedin=None if linkedin in (None, "") else linkedin.lower() in ("1", "true", "yes"),
+        )
+        rows, next_cursor = directory_page(queryset, cursor, limit)
+        return Response({
+            "results": DirectoryEntrySerializer(rows, many=True).data,
+            "next_cursor": next_cursor,
+        })
+
+
+# ---------------- User export (college admins) ----------------
+class UserExportView(APIView):
+    """
+    Stream every user of the admin's college as .ndjson or .csv;
+    ?role= and ?approved=true/false narrow it.
+    """
+    permission_classes = [IsCollegeAdmin]
+
+    @replica_reads
+    def get(self, request, fmt):
+        if fmt not in CONTENT_TYPES:
+            return Response({"detail": "Export as .ndjson or .csv."}, status=status.HTTP_404_NOT_FOUND)
+        role = request.query_params.get('role') or None
+        approved = request.query_params.get('approved') or None
+        if role not in (None, *dict(ROLE_CHOICES)) or approved not in (None, "true", "false"):
+            return Response({"detail": "Invalid role or approved filter."}, status=status.HTTP_400_BAD_REQUEST)
+
+        queryset = export_users(
+            request.user.college_id, role=role, approved=None if approved is None else approved == "true",
+        )
+        # Rows are read after this returns: keep the replica chosen for this request
+        queryset = queryset.using(router.db_for_read(CustomUser))
+        # Under ASGI a sync iterator would be read whole before the first byte is sent
+        lines = aexport_lines(queryset, fmt) if isinstance(request._request, ASGIRequest) else export_lines(queryset, fmt)
+        response = StreamingHttpResponse(lines, content_type=CONTENT_TYPES[fmt])
+        response['Content-Disposition'] = f'attachment; filename="college-{request.user.college_id}-users.{fmt}"'
+        return response
+
+
+# ---------------- Sessions (college admins) ----------------
+class CollegeSessionsRevokeView(APIView):
+    """Log out every user of the admin's college, the admin included."""
+    permission_classes = [IsCollegeAdmin]
+
+    def post(self, request):
+        revoke_college_sessions(request.user.college)
+        return Response(status=status.HTTP_205_RESET_CONTENT)